@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict, namedtuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+ApiResponse = namedtuple('ApiResponse', ['status', 'data', 'headers'])
+CachedResponse = namedtuple('CachedResponse', ['etag', 'data', 'headers'])
+
+# Методы, которые можно безопасно повторить после любой сетевой ошибки
+IDEMPOTENT_METHODS = {'GET', 'PUT', 'DELETE', 'HEAD'}
+RETRY_STATUSES = {502, 503, 504}
+
+
+class ApiClient:
+    # Одна долгоживущая сессия на весь процесс бота: пул соединений с keep-alive,
+    # таймауты на запрос и повторы с экспоненциальной задержкой. Ответы GET с ETag
+    # запоминаются и перепроверяются через If-None-Match: на 304 отдаём сохранённое тело
+
+    def __init__(self, base_url, pool_size=20, timeout=10.0, retries=3, backoff=0.2, keepalive=30.0, observe=None,
+                 cache_size=512):
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.keepalive = keepalive
+        # observe(method, path, status, elapsed) — для метрик; status 'error' при исключении
+        self.observe = observe
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._session = None
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(self, method, path, params=None, json=None):
+        method = method.upper()
+        key = (path, tuple(sorted((name, str(value)) for name, value in (params or {}).items())))
+        cached = self._cache.get(key) if method == 'GET' else None
+        headers = {'If-None-Match': cached.etag} if cached else None
+        resp = await self._observed(method, path, params, json, headers)
+        if method != 'GET' or not self.cache_size:
+            return resp
+        if resp.status == 304 and cached:
+            self._cache.move_to_end(key)
+            return ApiResponse(200, cached.data, cached.headers)
+        etag = resp.headers.get('ETag')
+        if resp.status == 200 and etag:
+            self._cache[key] = CachedResponse(etag, resp.data, resp.headers)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.pop(key, None)
+        return resp
+
+    async def _observed(self, method, path, params, json, headers):
+        if self.observe is None:
+            return await self._request(method, path, params, json, headers)
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            resp = await self._request(method, path, params, json, headers)
+            status = resp.status
+            return resp
+        finally:
+            self.observe(method, path, status, time.perf_counter() - started)
+
+    async def _request(self, method, path, params, json, headers=None):
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            try:
+                async with self._session.request(method, url, params=params, json=json, headers=headers) as resp:
+                    if resp.status in RETRY_STATUSES and method in IDEMPOTENT_METHODS and attempt < self.retries:
+                        raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                    data = await resp.json() if resp.content_type == 'application/json' else None
+                    return ApiResponse(resp.status, data, resp.headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # POST повторяем, только если соединение так и не было установлено
+                retryable = method in IDEMPOTENT_METHODS or isinstance(e, aiohttp.ClientConnectorError)
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning("API %s %s: %r, повтор через %.2f с", method, path, e, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def get(self, path, params=None):
+        return await self.request('GET', path, params=params)
+
+    async def post(self, path, json=None, params=None):
+        return await self.request('POST', path, params=params, json=json)
+
+    async def put(self, path, json=None, params=None):
+        return await self.request('PUT', path, params=params, json=json)
+
+    async def delete(self, path, params=None):
+        return await self.request('DELETE', path, params=params)
@@ -1,7 +1,10 @@
-from flask import Flask
+from flask import Flask, jsonify
+from marshmallow import ValidationError
 from config import Config
 from models import db
 from routes import users, reminders, tags
+from instrumentation import init_query_counter, init_metrics
+from commands import register_commands
 
 def create_app(config_object=None):
     app = Flask(__name__)
@@ -12,12 +15,19 @@ def create_app(config_object=None):
     db.init_app(app)
     with app.app_context():
         db.create_all()
+    init_query_counter(app)
+    init_metrics(app)
+    register_commands(app)
 
     # Регистрация блюпринтов
     app.register_blueprint(users.bp)
     app.register_blueprint(reminders.bp)
     app.register_blueprint(tags.bp)
 
+    @app.errorhandler(ValidationError)
+    def handle_validation_error(error):
+        return jsonify({"error": error.messages}), 400
+
     return app
 
 if __name__ == '__main__':
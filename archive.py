@@ -0,0 +1,80 @@
+import logging
+import time
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy import and_, delete, insert, or_
+from models import db, Reminder, ReminderArchive, ReminderTag, Tag
+from versions import reminder_scopes, touch
+from zones import utc_now
+
+logger = logging.getLogger(__name__)
+
+# Перенос сработавших разовых напоминаний из Reminder в ReminderArchive. Пачками:
+# каждая — своя короткая транзакция (выбрать, скопировать, удалить), так что
+# горячая таблица не блокируется надолго, а прерванный прогон продолжится со следующего.
+
+ArchiveReport = namedtuple('ArchiveReport', ['moved', 'batches', 'seconds'])
+
+ARCHIVED_COLUMNS = (
+    Reminder.id.label('reminder_id'), Reminder.user_id, Reminder.chat_id, Reminder.title, Reminder.description, Reminder.event_time,
+    Reminder.notification_time, Reminder.delivered_at, Reminder.timezone, Reminder.created_at,
+)
+
+
+def expired(cutoff):
+    # Разовые, доставленные до cutoff, и неотправленные, чьё время прошло раньше cutoff
+    # (окно планировщика их уже не догонит). Оба условия — диапазоны по индексам.
+    return and_(
+        Reminder.repeat_type.is_(None),
+        or_(Reminder.delivered_at < cutoff, Reminder.next_fire_at < cutoff),
+    )
+
+
+def archive_batch(cutoff, batch_size):
+    # Одна пачка в одной транзакции; возвращает число перенесённых напоминаний
+    ids = list(db.session.scalars(
+        db.select(Reminder.id).where(expired(cutoff)).order_by(Reminder.id).limit(batch_size)
+        # Строки, которые сейчас обновляет API, пропускаем до следующего прогона
+        .with_for_update(skip_locked=True)
+    ))
+    if not ids:
+        db.session.commit()
+        return 0
+    tags = {}
+    for reminder_id, tag_id, name, chat_id in db.session.execute(
+        db.select(ReminderTag.reminder_id, Tag.id, Tag.name, Tag.chat_id)
+        .join(Tag, Tag.id == ReminderTag.tag_id)
+        .where(ReminderTag.reminder_id.in_(ids))
+        .order_by(ReminderTag.reminder_id, Tag.id)
+    ):
+        tags.setdefault(reminder_id, []).append({'id': tag_id, 'name': name, 'chat_id': chat_id})
+    archived_at = utc_now()
+    rows = [
+        dict(row._asdict(), tags=tags.get(row.reminder_id, []), archived_at=archived_at)
+        for row in db.session.execute(db.select(*ARCHIVED_COLUMNS).where(Reminder.id.in_(ids)))
+    ]
+    db.session.execute(insert(ReminderArchive), rows)
+    db.session.execute(delete(ReminderTag).where(ReminderTag.reminder_id.in_(ids)))
+    db.session.execute(delete(Reminder).where(Reminder.id.in_(ids)))
+    touch(db.session, reminder_scopes({row['user_id'] for row in rows}, {row['chat_id'] for row in rows}))
+    db.session.commit()
+    return len(rows)
+
+
+def archive_reminders(retention_days, batch_size, pause=0.0, max_batches=None):
+    # Пачки до первой неполной; pause — пауза между ними, чтобы не мешать API
+    started = time.perf_counter()
+    cutoff = utc_now() - timedelta(days=retention_days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(cutoff, batch_size)
+        moved += count
+        if count:
+            batches += 1
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    report = ArchiveReport(moved, batches, time.perf_counter() - started)
+    logger.info("Архив: перенесено %d напоминаний пачками: %d за %.1f с", report.moved, report.batches, report.seconds)
+    return report
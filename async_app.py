@@ -0,0 +1,69 @@
+import os
+
+from aiohttp import web
+from marshmallow import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from config import Config
+from models import db
+from async_routes import users, reminders, tags
+from async_routes.common import SESSION_KEY, error
+
+# Тот же REST API, что и app.py, но на aiohttp и асинхронном движке SQLAlchemy:
+# запрос, ожидающий базу, не держит поток, а число соединений ограничено пулом.
+
+ENGINE_KEY = web.AppKey('engine', object)
+
+
+@web.middleware
+async def session_middleware(request, handler):
+    # Сессия на запрос; соединение берётся из пула только при первом обращении к базе
+    async with AsyncSession(request.app[ENGINE_KEY], expire_on_commit=False) as db_session:
+        request[SESSION_KEY] = db_session
+        try:
+            return await handler(request)
+        except ValidationError as e:
+            return error(e.messages, 400)
+
+
+def make_engine(config):
+    url = config['ASYNC_DATABASE_URI']
+    if url.endswith(':memory:'):
+        # Одна общая база в памяти на все соединения — для тестов
+        return create_async_engine(url, poolclass=StaticPool, connect_args={'check_same_thread': False})
+    return create_async_engine(
+        url,
+        pool_size=config['ASYNC_POOL_SIZE'],
+        max_overflow=config['ASYNC_MAX_OVERFLOW'],
+        pool_timeout=config['ASYNC_POOL_TIMEOUT'],
+        pool_pre_ping=True,
+    )
+
+
+def load_config(config_object):
+    return {name: getattr(config_object, name) for name in dir(config_object) if name.isupper()}
+
+
+def create_async_app(config_object=None):
+    config = load_config(config_object or Config)
+    app = web.Application(middlewares=[session_middleware])
+    app[ENGINE_KEY] = make_engine(config)
+
+    async def on_startup(app):
+        async with app[ENGINE_KEY].begin() as conn:
+            await conn.run_sync(db.metadata.create_all)
+
+    async def on_cleanup(app):
+        await app[ENGINE_KEY].dispose()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_routes(users.routes)
+    app.router.add_routes(reminders.routes)
+    app.router.add_routes(tags.routes)
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_async_app(), host=os.environ.get('ASYNC_HOST', '127.0.0.1'), port=int(os.environ.get('ASYNC_PORT', 5001)))
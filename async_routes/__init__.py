@@ -0,0 +1,5 @@
+from .users import routes as users_routes
+from .reminders import routes as reminders_routes
+from .tags import routes as tags_routes
+
+__all__ = ['users_routes', 'reminders_routes', 'tags_routes']
@@ -0,0 +1,42 @@
+import json
+from functools import partial
+
+from aiohttp import web
+
+SESSION_KEY = web.RequestKey('session', object)
+
+# Как jsonify во Flask: ключи по алфавиту, не-ASCII экранируется
+dumps = partial(json.dumps, sort_keys=True)
+
+
+def json_response(data, status=200, headers=None):
+    return web.json_response(data, status=status, headers=headers, dumps=dumps)
+
+
+def error(message, status):
+    return json_response({"error": message}, status)
+
+
+def not_found():
+    return web.HTTPNotFound(text=dumps({"error": "not found"}), content_type='application/json')
+
+
+def session(request):
+    return request[SESSION_KEY]
+
+
+async def read_json(request, silent=False):
+    # Как request.get_json(silent=...) во Flask
+    try:
+        return await request.json()
+    except ValueError:
+        if silent:
+            return None
+        raise web.HTTPBadRequest(text=dumps({"error": "invalid JSON"}), content_type='application/json')
+
+
+async def get_or_404(request, model, id, *options):
+    instance = await session(request).get(model, id, options=list(options))
+    if instance is None:
+        raise not_found()
+    return instance
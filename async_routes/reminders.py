@@ -0,0 +1,289 @@
+from datetime import timedelta
+from aiohttp import web
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import selectinload
+from models import Reminder, ReminderTag, User
+from schemas import ArchivedReminderSchema, ReminderSchema
+from routes.args import int_arg
+from routes.reminders import (
+    MAX_BULK_SIZE, bulk_result, check_bulk_items, claim_options, claim_query, claimed_query, created_scopes, delete_all_statements,
+    due_query, history_page, history_query, insert_rows, lease_statements, list_query, load_bulk, mark_delivered, owned_ids,
+    owned_updates, page_cursors, parse_fields,
+    project, refire_query, refire_rows, search_page, search_query, tag_links, tag_pairs, update_candidates, updated_scopes,
+)
+from versions import reminder_scopes, touch
+from zones import utc_now
+from async_routes.common import error, get_or_404, json_response, not_found, read_json, session
+from async_routes.tags import resolve_tags
+
+# Те же контракты, что у routes/reminders.py; запросы строятся теми же функциями,
+# здесь только их асинхронное исполнение
+
+routes = web.RouteTableDef()
+
+def reminder_id(request):
+    return int(request.match_info['id'])
+
+async def link_tags(db_session, links):
+    links = list(links)
+    resolved = await resolve_tags(db_session, (pair for _, pairs in links for pair in pairs))
+    rows = tag_links(links, resolved)
+    if rows:
+        await db_session.execute(insert(ReminderTag), rows)
+
+async def load_reminders(db_session, ids):
+    return (await db_session.scalars(
+        claimed_query(ids).execution_options(populate_existing=True)
+    )).all()
+
+async def page_response(request, query, limit, fields):
+    reminders, headers = page_cursors((await session(request).scalars(query)).all(), limit, request.query)
+    return json_response(ReminderSchema(many=True, only=fields).dump(reminders), headers=headers or None)
+
+@routes.get('/reminders/')
+async def get_reminders(request):
+    try:
+        query, limit, fields = list_query(request.query)
+    except ValueError as e:
+        return error(str(e), 400)
+    return await page_response(request, query, limit, fields)
+
+@routes.get('/reminders/search')
+async def search_reminders(request):
+    db_session = session(request)
+    try:
+        query, limit, offset, fields = search_query(request.query, db_session.bind.dialect.name)
+    except ValueError as e:
+        return error(str(e), 400)
+    reminders, headers = search_page((await db_session.scalars(query)).all(), limit, offset)
+    return json_response(ReminderSchema(many=True, only=fields).dump(reminders), headers=headers or None)
+
+@routes.get('/reminders/history')
+async def get_history(request):
+    try:
+        query, limit = history_query(request.query)
+    except ValueError as e:
+        return error(str(e), 400)
+    rows, headers = history_page((await session(request).scalars(query)).all(), limit)
+    return json_response(ArchivedReminderSchema(many=True).dump(rows), headers=headers or None)
+
+@routes.get('/reminders/due')
+async def get_due_reminders(request):
+    try:
+        query = due_query(request.query)
+    except ValueError as e:
+        return error(str(e), 400)
+    reminders = (await session(request).scalars(query)).all()
+    return json_response(ReminderSchema(many=True).dump(reminders))
+
+@routes.post('/reminders/claim')
+async def claim_reminders(request):
+    try:
+        options = claim_options(await read_json(request, silent=True) or {})
+    except ValueError as e:
+        return error(str(e), 400)
+    db_session = session(request)
+    now = utc_now()
+    lease_until = max(options['end'], now) + timedelta(seconds=options['lease'])
+    ids = list(await db_session.scalars(claim_query(
+        options['start'], options['end'], now, options['partition'], options['partitions'], options['limit'],
+    )))
+    claimed = []
+    if ids:
+        lease, won = lease_statements(ids, options['worker'], lease_until, now)
+        await db_session.execute(lease)
+        claimed = list(await db_session.scalars(won))
+    await db_session.commit()
+    if not claimed:
+        return json_response([])
+    return json_response(ReminderSchema(many=True).dump(await load_reminders(db_session, claimed)))
+
+@routes.post('/reminders/')
+async def create_reminder(request):
+    schema = ReminderSchema()
+    reminder_data = schema.load(await read_json(request))
+    db_session = session(request)
+    user = await db_session.get(User, reminder_data['user_id'])
+    if user is None:
+        return error("user not found", 404)
+    tags = reminder_data.pop('tags', None)
+    reminder = Reminder(**reminder_data, timezone=user.timezone)
+    db_session.add(reminder)
+    await db_session.flush()
+    await link_tags(db_session, [(reminder.id, tag_pairs(dict(reminder_data, tags=tags)))])
+    await db_session.commit()
+    await db_session.refresh(reminder, ['tags'])
+    return json_response(schema.dump(reminder), 201)
+
+@routes.get(r'/reminders/{id:\d+}')
+async def get_reminder(request):
+    try:
+        fields = parse_fields(request.query.get('fields'))
+    except ValueError as e:
+        return error(str(e), 400)
+    reminder = await session(request).scalar(project(select(Reminder).where(Reminder.id == reminder_id(request)), fields))
+    if reminder is None:
+        raise not_found()
+    return json_response(ReminderSchema(only=fields).dump(reminder))
+
+@routes.put(r'/reminders/{id:\d+}')
+async def update_reminder(request):
+    reminder = await get_or_404(request, Reminder, reminder_id(request), selectinload(Reminder.tags))
+    data = await read_json(request)
+    schema = ReminderSchema()
+    reminder_data = schema.load(data, partial=True)
+    tags = reminder_data.pop('tags', None)
+    for key, value in reminder_data.items():
+        setattr(reminder, key, value)
+    db_session = session(request)
+    if 'tags' in data:
+        await db_session.execute(delete(ReminderTag).where(ReminderTag.reminder_id == reminder.id))
+        await link_tags(db_session, [(reminder.id, tag_pairs({'chat_id': reminder.chat_id, 'tags': tags}))])
+        await db_session.run_sync(touch, reminder_scopes([reminder.user_id], [reminder.chat_id]))
+    await db_session.commit()
+    if 'tags' in data:
+        await db_session.refresh(reminder, ['tags'])
+    return json_response(schema.dump(reminder))
+
+@routes.post(r'/reminders/{id:\d+}/delivered')
+async def mark_reminder_delivered(request):
+    reminder = await get_or_404(request, Reminder, reminder_id(request), selectinload(Reminder.tags))
+    if not mark_delivered(reminder, request.query.get('worker')):
+        return error("lease lost", 409)
+    await session(request).commit()
+    return json_response(ReminderSchema().dump(reminder))
+
+@routes.delete(r'/reminders/{id:\d+}')
+async def delete_reminder(request):
+    user_id = int_arg(request.query, 'user_id')
+    if user_id is None:
+        return error("user_id is required", 400)
+    page = None
+    if request.query.get('return_page') == '1':
+        try:
+            page = list_query(request.query)
+        except ValueError as e:
+            return error(str(e), 400)
+    reminder = await get_or_404(request, Reminder, reminder_id(request))
+    if reminder.user_id != user_id:
+        return error("Вы не владелец этого напоминания", 403)
+    db_session = session(request)
+    await db_session.execute(delete(ReminderTag).where(ReminderTag.reminder_id == reminder.id))
+    await db_session.execute(delete(Reminder).where(Reminder.id == reminder.id))
+    await db_session.run_sync(touch, reminder_scopes([reminder.user_id], [reminder.chat_id]))
+    await db_session.commit()
+    if page is not None:
+        return await page_response(request, *page)
+    return web.Response(status=204)
+
+async def bulk_items(request):
+    return check_bulk_items(await read_json(request, silent=True))
+
+def bulk_response(key, done, errors, status=200):
+    payload, status = bulk_result(key, done, errors, status)
+    return json_response(payload, status)
+
+@routes.post('/reminders/bulk')
+async def bulk_create_reminders(request):
+    try:
+        items = await bulk_items(request)
+    except ValueError as e:
+        return error(str(e), 400)
+    loaded, errors = load_bulk(items)
+    candidates = [(index, data) for index, data in enumerate(loaded) if index not in errors]
+
+    db_session = session(request)
+    user_ids = {data['user_id'] for _, data in candidates}
+    existing = dict((await db_session.execute(select(User.id, User.timezone).where(User.id.in_(user_ids)))).all()) if user_ids else {}
+    valid = []
+    for index, data in candidates:
+        if data['user_id'] in existing:
+            valid.append(dict(data, timezone=existing[data['user_id']]))
+        else:
+            errors[index] = {"user_id": ["user not found"]}
+    if not valid:
+        return bulk_response("created", [], errors, 201)
+
+    ids = list(await db_session.scalars(
+        insert(Reminder).returning(Reminder.id, sort_by_parameter_order=True), insert_rows(valid),
+    ))
+    await link_tags(db_session, ((reminder_id, tag_pairs(data)) for reminder_id, data in zip(ids, valid)))
+    await db_session.run_sync(touch, created_scopes(valid))
+    await db_session.commit()
+    reminders = await load_reminders(db_session, ids)
+    return bulk_response("created", ReminderSchema(many=True).dump(reminders), errors, 201)
+
+@routes.put('/reminders/bulk')
+async def bulk_update_reminders(request):
+    user_id = int_arg(request.query, 'user_id')
+    if user_id is None:
+        return error("user_id is required", 400)
+    try:
+        items = await bulk_items(request)
+    except ValueError as e:
+        return error(str(e), 400)
+    candidates, errors = update_candidates(items)
+
+    db_session = session(request)
+    ids = [reminder_id for _, reminder_id, _ in candidates]
+    current = {
+        reminder_id: (user_id, chat_id)
+        for reminder_id, user_id, chat_id in await db_session.execute(
+            select(Reminder.id, Reminder.user_id, Reminder.chat_id).where(Reminder.id.in_(ids))
+        )
+    } if ids else {}
+    valid = owned_updates(candidates, current, user_id, errors)
+    if not valid:
+        return bulk_response("updated", [], errors)
+
+    rows = [
+        dict({key: value for key, value in data.items() if key != 'tags'}, id=reminder_id)
+        for reminder_id, data in valid
+    ]
+    if any(len(row) > 1 for row in rows):
+        await db_session.execute(update(Reminder), [row for row in rows if len(row) > 1])
+    refire = refire_query(valid)
+    if refire is not None:
+        await db_session.execute(update(Reminder), refire_rows(await db_session.execute(refire)))
+    retagged = [(reminder_id, data) for reminder_id, data in valid if 'tags' in data]
+    if retagged:
+        await db_session.execute(delete(ReminderTag).where(ReminderTag.reminder_id.in_([rid for rid, _ in retagged])))
+        await link_tags(db_session, (
+            (reminder_id, tag_pairs(dict(data, chat_id=data.get('chat_id', current[reminder_id][1]))))
+            for reminder_id, data in retagged
+        ))
+    await db_session.run_sync(touch, updated_scopes(valid, current))
+    await db_session.commit()
+    reminders = await load_reminders(db_session, [reminder_id for reminder_id, _ in valid])
+    return bulk_response("updated", ReminderSchema(many=True).dump(reminders), errors)
+
+@routes.delete('/reminders/bulk')
+async def bulk_delete_reminders(request):
+    user_id = int_arg(request.query, 'user_id')
+    if user_id is None:
+        return error("user_id is required", 400)
+    data = await read_json(request, silent=True) or {}
+    ids = data.get('ids')
+    errors = {}
+    db_session = session(request)
+    if ids is None:
+        unlink, remove = delete_all_statements(user_id)
+        await db_session.execute(unlink)
+        chats = dict((await db_session.execute(remove)).all())
+        ids = sorted(chats)
+        await db_session.run_sync(touch, reminder_scopes([user_id], set(chats.values())))
+        await db_session.commit()
+        return bulk_response("deleted", ids, errors)
+    if not isinstance(ids, list) or len(ids) > MAX_BULK_SIZE:
+        return error(f"ids must be an array of at most {MAX_BULK_SIZE} items", 400)
+    rows = (await db_session.execute(
+        select(Reminder.id, Reminder.user_id, Reminder.chat_id).where(Reminder.id.in_([i for i in ids if isinstance(i, int)]))
+    )).all()
+    chats = {reminder_id: chat_id for reminder_id, _, chat_id in rows}
+    ids, errors = owned_ids(ids, {reminder_id: owner for reminder_id, owner, _ in rows}, user_id)
+    if ids:
+        await db_session.execute(delete(ReminderTag).where(ReminderTag.reminder_id.in_(ids)))
+        await db_session.execute(delete(Reminder).where(Reminder.id.in_(ids)))
+        await db_session.run_sync(touch, reminder_scopes([user_id], {chats[reminder_id] for reminder_id in ids}))
+        await db_session.commit()
+    return bulk_response("deleted", ids, errors)
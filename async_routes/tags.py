@@ -0,0 +1,79 @@
+from aiohttp import web
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from models import Tag, ReminderTag
+from schemas import TagSchema
+from routes.tags import tag_lookup, tags_query
+from versions import tag_scopes, touch
+from async_routes.common import error, get_or_404, json_response, read_json, session
+
+routes = web.RouteTableDef()
+
+async def resolve_tags(db_session, pairs):
+    # Асинхронный двойник routes.tags.resolve_tags
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    query = tag_lookup(pairs)
+    resolved = {(chat_id, name): tag_id for chat_id, name, tag_id in await db_session.execute(query)}
+    missing = [{'chat_id': chat_id, 'name': name} for chat_id, name in pairs - resolved.keys()]
+    if missing:
+        try:
+            async with db_session.begin_nested():
+                rows = (await db_session.execute(insert(Tag).returning(Tag.chat_id, Tag.name, Tag.id), missing)).all()
+            resolved.update({(chat_id, name): tag_id for chat_id, name, tag_id in rows})
+        except IntegrityError:
+            resolved = {(chat_id, name): tag_id for chat_id, name, tag_id in await db_session.execute(query)}
+    return resolved
+
+@routes.get('/tags/')
+async def get_tags(request):
+    try:
+        query = tags_query(request.query)
+    except ValueError as e:
+        return error(str(e), 400)
+    return json_response([row._asdict() for row in await session(request).execute(query)])
+
+@routes.post('/tags/')
+async def create_tag(request):
+    schema = TagSchema()
+    tag = Tag(**schema.load(await read_json(request)))
+    db_session = session(request)
+    db_session.add(tag)
+    try:
+        await db_session.commit()
+    except IntegrityError:
+        await db_session.rollback()
+        return error("tag already exists", 409)
+    return json_response(schema.dump(tag), 201)
+
+@routes.get(r'/tags/{id:\d+}')
+async def get_tag(request):
+    tag = await get_or_404(request, Tag, int(request.match_info['id']))
+    return json_response(TagSchema().dump(tag))
+
+@routes.put(r'/tags/{id:\d+}')
+async def update_tag(request):
+    tag = await get_or_404(request, Tag, int(request.match_info['id']))
+    schema = TagSchema()
+    for key, value in schema.load(await read_json(request), partial=True).items():
+        setattr(tag, key, value)
+    db_session = session(request)
+    try:
+        await db_session.commit()
+    except IntegrityError:
+        await db_session.rollback()
+        return error("tag already exists", 409)
+    return json_response(schema.dump(tag))
+
+@routes.delete(r'/tags/{id:\d+}')
+async def delete_tag(request):
+    tag = await get_or_404(request, Tag, int(request.match_info['id']))
+    db_session = session(request)
+    # Владельцев напоминаний с этим тегом — до того, как связи удалены
+    scopes = await db_session.run_sync(tag_scopes, [tag.id])
+    await db_session.execute(delete(ReminderTag).where(ReminderTag.tag_id == tag.id))
+    await db_session.execute(delete(Tag).where(Tag.id == tag.id))
+    await db_session.run_sync(touch, scopes | {('chat', tag.chat_id)})
+    await db_session.commit()
+    return web.Response(status=204)
@@ -0,0 +1,97 @@
+from aiohttp import web
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from models import Reminder, User
+from schemas import UserSchema
+from routes.reminders import pending_query, refire_rows, retime_statement
+from versions import reminder_scopes, touch
+from async_routes.common import error, get_or_404, json_response, not_found, read_json, session
+
+routes = web.RouteTableDef()
+
+@routes.get('/users/')
+async def get_users(request):
+    users = (await session(request).scalars(select(User))).all()
+    schema = UserSchema(many=True)
+    return json_response(schema.dump(users))
+
+@routes.post('/users/')
+async def create_user(request):
+    schema = UserSchema()
+    user_data = schema.load(await read_json(request))
+    user = User(**user_data)
+    db_session = session(request)
+    db_session.add(user)
+    try:
+        await db_session.commit()
+    except IntegrityError:
+        await db_session.rollback()
+        return error("user with this telegram_id already exists", 409)
+    return json_response(schema.dump(user), 201)
+
+@routes.get(r'/users/telegram/{telegram_id:\d+}')
+async def get_user_by_telegram_id(request):
+    telegram_id = int(request.match_info['telegram_id'])
+    user = await session(request).scalar(select(User).where(User.telegram_id == telegram_id))
+    if user is None:
+        raise not_found()
+    return json_response(UserSchema().dump(user))
+
+@routes.put(r'/users/telegram/{telegram_id:\d+}')
+async def get_or_create_user_by_telegram_id(request):
+    telegram_id = int(request.match_info['telegram_id'])
+    schema = UserSchema()
+    user_data = schema.load(await read_json(request, silent=True) or {}, partial=True)
+    username = user_data.get('username')
+    db_session = session(request)
+    query = select(User).where(User.telegram_id == telegram_id)
+    user = await db_session.scalar(query)
+    if user is None:
+        # Гонку двух одновременных /start разрешает уникальный индекс по telegram_id
+        user = User(telegram_id=telegram_id, username=username)
+        db_session.add(user)
+        try:
+            await db_session.commit()
+            return json_response(schema.dump(user), 201)
+        except IntegrityError:
+            await db_session.rollback()
+            user = (await db_session.scalars(query)).one()
+    if username is not None and user.username != username:
+        user.username = username
+        await db_session.commit()
+    return json_response(schema.dump(user))
+
+@routes.get(r'/users/{id:\d+}')
+async def get_user(request):
+    user = await get_or_404(request, User, int(request.match_info['id']))
+    return json_response(UserSchema().dump(user))
+
+@routes.put(r'/users/{id:\d+}')
+async def update_user(request):
+    user = await get_or_404(request, User, int(request.match_info['id']))
+    schema = UserSchema()
+    user_data = schema.load(await read_json(request), partial=True)
+    for key, value in user_data.items():
+        setattr(user, key, value)
+    db_session = session(request)
+    if 'timezone' in user_data:
+        await retime_reminders(db_session, user)
+    await db_session.commit()
+    return json_response(schema.dump(user))
+
+async def retime_reminders(db_session, user):
+    # Асинхронный двойник routes.users.retime_reminders
+    await db_session.execute(retime_statement(user.id, user.timezone))
+    rows = (await db_session.execute(pending_query(user.id))).all()
+    if rows:
+        await db_session.execute(update(Reminder), refire_rows(rows))
+    await db_session.run_sync(touch, reminder_scopes([user.id], {row.chat_id for row in rows}))
+
+@routes.delete(r'/users/{id:\d+}')
+async def delete_user(request):
+    user = await get_or_404(request, User, int(request.match_info['id']))
+    db_session = session(request)
+    await db_session.execute(delete(User).where(User.id == user.id))
+    await db_session.run_sync(touch, [('user', user.id), ('telegram', user.telegram_id)])
+    await db_session.commit()
+    return web.Response(status=204)
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Нагрузочное сравнение WSGI (app.py) и async (async_app.py) API на одной базе.
+# Серверы запускаются отдельными процессами, нагрузку даёт этот процесс: C
+# параллельных «пользователей бота», каждый повторяет /start, список и создание.
+# На SQLite записи сериализуются блокировкой файла, так что честное сравнение —
+# на MariaDB (--database-url/--async-database-url).
+
+
+def bench_config(database_url, async_database_url):
+    from config import Config
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'ASYNC_DATABASE_URI': async_database_url,
+    })
+
+
+def serve(mode, port, database_url, async_database_url):
+    config = bench_config(database_url, async_database_url)
+    if mode == 'wsgi':
+        from werkzeug.serving import make_server
+        from app import create_app
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        # Поток на запрос — как у многопоточного WSGI-сервера в проде
+        make_server('127.0.0.1', port, create_app(config), threaded=True).serve_forever()
+    else:
+        from aiohttp import web
+        from async_app import create_async_app
+        web.run_app(create_async_app(config), host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def seed(database_url, users):
+    from app import create_app
+    from models import db, User
+    app = create_app(bench_config(database_url, None))
+    with app.app_context():
+        # Общая внешняя база засевается один раз на все режимы
+        if db.session.scalar(db.select(User.id).where(User.telegram_id == 1)) is not None:
+            return
+        db.session.execute(db.insert(User), [{'telegram_id': i, 'username': f'user{i}'} for i in range(1, users + 1)])
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(session, base_url, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f'{base_url}/users/telegram/1') as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f'server at {base_url} did not start')
+
+
+async def bot_user(session, base_url, users, deadline, samples, errors):
+    # Один пользователь бота: /start (upsert), /reminders (страница), новое напоминание
+    rng = random.Random()
+    while time.monotonic() < deadline:
+        telegram_id = rng.randint(1, users)
+        requests = [
+            ('PUT', f'/users/telegram/{telegram_id}', None, {'username': f'user{telegram_id}'}),
+            ('GET', '/reminders/', {'user_id': telegram_id, 'limit': 20, 'fields': 'id,title,event_time'}, None),
+            ('POST', '/reminders/', None, {
+                'user_id': telegram_id, 'chat_id': telegram_id, 'title': 'Бенчмарк',
+                'event_time': '2030-01-01T09:00:00', 'tags': ['работа'],
+            }),
+        ]
+        for method, path, params, body in requests:
+            started = time.perf_counter()
+            try:
+                async with session.request(method, base_url + path, params=params, json=body) as resp:
+                    await resp.read()
+                    ok = resp.status < 400
+            except aiohttp.ClientError:
+                ok = False
+            samples.append(time.perf_counter() - started)
+            if not ok:
+                errors.append(path)
+
+
+async def load(base_url, users, concurrency, duration):
+    samples, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await wait_ready(session, base_url)
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        await asyncio.gather(*(bot_user(session, base_url, users, deadline, samples, errors) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    samples.sort()
+    return {
+        'requests': len(samples),
+        'errors': len(errors),
+        'rps': len(samples) / elapsed,
+        'p50_ms': samples[len(samples) // 2] * 1000 if samples else 0.0,
+        'p99_ms': samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000 if samples else 0.0,
+    }
+
+
+def run_mode(mode, args, database_url, async_database_url):
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port),
+        '--database-url', database_url, '--async-database-url', async_database_url,
+    ], cwd=ROOT)
+    try:
+        return asyncio.run(load(f'http://127.0.0.1:{port}', args.users, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение пропускной способности WSGI и async API')
+    parser.add_argument('--modes', default='wsgi,async')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--database-url', help='по умолчанию — временный файл SQLite')
+    parser.add_argument('--async-database-url')
+    parser.add_argument('--serve', choices=['wsgi', 'async'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.database_url, args.async_database_url)
+        return
+
+    report = {'users': args.users, 'concurrency': args.concurrency, 'duration': args.duration}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes.split(','):
+            database_url = args.database_url
+            async_database_url = args.async_database_url
+            if database_url is None:
+                # Каждому режиму — своя свежая база
+                path = os.path.join(tmp, f'{mode}.db')
+                database_url, async_database_url = f'sqlite:///{path}', f'sqlite+aiosqlite:///{path}'
+            seed(database_url, args.users)
+            report[mode] = run_mode(mode, args, database_url, async_database_url)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
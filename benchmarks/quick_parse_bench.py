@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quick_parse import quick_parse
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quick_parse_corpus.json')
+FIELDS = ('title', 'event_time', 'repeat_type')
+
+
+def evaluate(corpus):
+    now = datetime.fromisoformat(corpus['now'])
+    report = {'total': 0, 'accepted': 0, 'correct': 0, 'false_accepts': [], 'mismatches': []}
+    for case in corpus['cases']:
+        report['total'] += 1
+        parsed = quick_parse(case['text'], now)
+        expected = case['expected']
+        if parsed is None:
+            continue
+        report['accepted'] += 1
+        if expected is None:
+            report['false_accepts'].append(case['text'])
+        elif all(parsed[field] == expected[field] for field in FIELDS):
+            report['correct'] += 1
+        else:
+            report['mismatches'].append({'text': case['text'], 'parsed': {f: parsed[f] for f in FIELDS}})
+    report['coverage'] = report['accepted'] / report['total']
+    report['precision'] = report['correct'] / report['accepted'] if report['accepted'] else 1.0
+    return report
+
+
+def measure_latency(corpus, rounds):
+    now = datetime.fromisoformat(corpus['now'])
+    samples = []
+    for _ in range(rounds):
+        for case in corpus['cases']:
+            started = time.perf_counter()
+            quick_parse(case['text'], now)
+            samples.append(time.perf_counter() - started)
+    samples.sort()
+    return {
+        'calls': len(samples),
+        'p50_us': statistics.median(samples) * 1e6,
+        'p99_us': samples[int(len(samples) * 0.99) - 1] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Точность и задержка быстрого парсера на корпусе фраз')
+    parser.add_argument('--corpus', default=CORPUS)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--min-precision', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding='utf-8') as f:
+        corpus = json.load(f)
+    report = evaluate(corpus)
+    report['latency'] = measure_latency(corpus, args.rounds)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report['precision'] < args.min_precision or report['false_accepts']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
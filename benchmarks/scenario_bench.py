@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import itertools
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Сценарии бота на реалистичном объёме данных. API (create_app) поднимается в этом
+# же процессе на файле SQLite, обработчики bot.py вызываются напрямую с поддельными
+# сообщениями Telegram и поддельным OpenAI. Для каждого сценария — пропускная
+# способность, p50/p99 и число SQL-запросов на операцию (из X-Query-Count).
+# --save пишет baseline, --compare сверяет с ним и завершается с кодом 1 при регрессии.
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench.db')
+SCENARIOS = ('start', 'list', 'create', 'delete_refresh')
+TAGS = ['работа', 'дом', 'спорт', 'здоровье', 'учёба', 'покупки', 'семья', 'финансы']
+TITLES = ['Позвонить маме', 'Оплатить счёт', 'Спортзал', 'Купить продукты', 'Встреча', 'Выпить таблетку']
+QUICK_PHRASES = ['завтра в 9 спортзал {n}', 'через 15 минут позвонить {n}', 'каждый день в 8 пить воду {n}']
+MESSAGE_IDS = itertools.count(1)
+LLM_PHRASES = ['не забудь про отчёт к концу недели {n}', 'напомни о дне рождения Оли 12 марта {n}']
+
+
+def bench_config(path):
+    from config import Config
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'QUERY_COUNT_HEADER': True,
+    })
+
+
+def seed(app, users, reminders, seed_value=42):
+    # Пользователь i — telegram_id i и чат i; теги чата из словаря; напоминания
+    # раскиданы на ±30 дней, часть повторяющихся, у части 1–2 тега
+    from models import db, User, Reminder, Tag, ReminderTag
+    rng = random.Random(seed_value)
+    now = datetime.now().replace(second=0, microsecond=0)
+    chunk = 10000
+    with app.app_context():
+        for start in range(1, users + 1, chunk):
+            db.session.execute(db.insert(User), [
+                {'telegram_id': i, 'username': f'user{i}'} for i in range(start, min(start + chunk, users + 1))
+            ])
+            db.session.execute(db.insert(Tag), [
+                {'chat_id': i, 'name': name} for i in range(start, min(start + chunk, users + 1)) for name in TAGS[:3]
+            ])
+        db.session.commit()
+        tag_ids = {(chat_id, name): tag_id for tag_id, chat_id, name in db.session.execute(db.select(Tag.id, Tag.chat_id, Tag.name))}
+        next_id = 1
+        for start in range(0, reminders, chunk):
+            rows, links = [], []
+            for _ in range(start, min(start + chunk, reminders)):
+                user_id = rng.randint(1, users)
+                event_time = now + timedelta(minutes=rng.randint(-30 * 24 * 60, 30 * 24 * 60))
+                recurring = rng.random() < 0.2
+                notification_time = event_time - timedelta(minutes=10) if rng.random() < 0.3 else None
+                rows.append({
+                    'id': next_id,
+                    'user_id': user_id,
+                    'chat_id': user_id,
+                    'title': rng.choice(TITLES),
+                    'event_time': event_time,
+                    'repeat_type': f'{event_time.minute} {event_time.hour} * * *' if recurring else None,
+                    'notification_time': notification_time,
+                    'next_fire_at': notification_time or event_time,
+                })
+                for name in rng.sample(TAGS[:3], rng.choice((0, 0, 1, 2))):
+                    links.append({'reminder_id': next_id, 'tag_id': tag_ids[(user_id, name)]})
+                next_id += 1
+            db.session.execute(db.insert(Reminder), rows)
+            if links:
+                db.session.execute(db.insert(ReminderTag), links)
+            db.session.commit()
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeCompletions:
+    # Ответ в формате OpenAI с заданной задержкой вместо сети
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        prompt = kwargs['messages'][-1]['content']
+        text = prompt.split('Текст: ', 1)[1].split('\n', 1)[0]
+        content = json.dumps({
+            'title': text[:50], 'description': None,
+            'event_time': (datetime.now() + timedelta(days=1)).isoformat(timespec='seconds'),
+            'repeat_type': None, 'notification_time': None, 'tags': ['работа'],
+        }, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+class FakeMessage:
+    # Достаточно для обработчиков bot.py: from_user, chat, text, answer, edit_text
+    def __init__(self, telegram_id, text=''):
+        self.from_user = SimpleNamespace(id=telegram_id, username=f'user{telegram_id}')
+        self.chat = SimpleNamespace(id=telegram_id)
+        self.message_id = next(MESSAGE_IDS)
+        self.text = text
+        self.replies = 0
+
+    async def answer(self, text, **kwargs):
+        self.replies += 1
+
+    async def edit_text(self, text, **kwargs):
+        self.replies += 1
+
+
+class FakeCallback:
+    def __init__(self, telegram_id, data):
+        self.from_user = SimpleNamespace(id=telegram_id, username=f'user{telegram_id}')
+        self.data = data
+        self.message = FakeMessage(telegram_id)
+
+    async def answer(self, text=None, **kwargs):
+        pass
+
+
+def load_bot(api_url, llm_latency):
+    os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:ABCdefGhIJKlmnoPQRstuVWXyz012345678')
+    os.environ.setdefault('OPENAI_API_KEY', 'bench')
+    os.environ['API_URL'] = api_url
+    os.environ['RUN_SCHEDULER'] = '0'
+    os.environ.pop('PARSE_CACHE_PATH', None)
+    import bot
+    bot.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(llm_latency)))
+    # Считаем SQL-запросы по заголовку X-Query-Count каждого ответа API
+    counter = SimpleNamespace(queries=0, calls=0)
+    request = bot.api.request
+
+    async def counted(*args, **kwargs):
+        resp = await request(*args, **kwargs)
+        counter.queries += int(resp.headers.get('X-Query-Count', 0))
+        counter.calls += 1
+        return resp
+
+    bot.api.request = counted
+    return bot, counter
+
+
+def make_operations(name, bot, users, owned, ops, rng):
+    # Список корутин-фабрик одной операции сценария
+    if name == 'start':
+        return [lambda t=rng.randint(1, users): bot.cmd_start(FakeMessage(t)) for _ in range(ops)]
+    if name == 'list':
+        return [lambda t=rng.randint(1, users): bot.cmd_reminders(FakeMessage(t)) for _ in range(ops)]
+    if name == 'create':
+        phrases = [rng.choice(QUICK_PHRASES if rng.random() < 0.7 else LLM_PHRASES).format(n=n) for n in range(ops)]
+        return [
+            lambda t=rng.randint(1, users), text=text: bot.handle_freeform(FakeMessage(t, text))
+            for text in phrases
+        ]
+    if name == 'delete_refresh':
+        return [
+            lambda t=telegram_id, r=reminder_id: bot.delete_reminder_callback(FakeCallback(t, f'delete_reminder:{r}'))
+            for telegram_id, reminder_id in owned[:ops]
+        ]
+    raise ValueError(name)
+
+
+async def run_scenario(operations, concurrency, counter):
+    samples = []
+    queue = list(reversed(operations))
+    queries_before, calls_before = counter.queries, counter.calls
+
+    async def worker():
+        while queue:
+            operation = queue.pop()
+            started = time.perf_counter()
+            await operation()
+            samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    count = len(samples)
+    return {
+        'ops': count,
+        'ops_per_sec': count / elapsed if elapsed else 0.0,
+        'p50_ms': samples[count // 2] * 1000 if samples else 0.0,
+        'p99_ms': samples[min(int(count * 0.99), count - 1)] * 1000 if samples else 0.0,
+        'api_calls_per_op': (counter.calls - calls_before) / count if count else 0.0,
+        'queries_per_op': (counter.queries - queries_before) / count if count else 0.0,
+    }
+
+
+async def run_all(bot, counter, args, owned):
+    rng = random.Random(7)
+    await bot.on_startup()
+    try:
+        # Прогрев: соединения, кэши SQLite, импорт ленивых модулей
+        for operation in make_operations('list', bot, args.users, owned, 10, rng):
+            await operation()
+        results = {}
+        for name in args.scenarios.split(','):
+            operations = make_operations(name, bot, args.users, owned, args.ops, rng)
+            results[name] = await run_scenario(operations, args.concurrency, counter)
+        return results
+    finally:
+        await bot.on_shutdown()
+
+
+def compare(results, baseline, tolerance):
+    # Регрессия: время выросло или пропускная способность упала больше чем на
+    # tolerance, либо стало больше SQL-запросов на операцию (они детерминированы)
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {previous[metric]:.2f} -> {current[metric]:.2f}")
+        if current['ops_per_sec'] < previous['ops_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}.ops_per_sec: {previous['ops_per_sec']:.1f} -> {current['ops_per_sec']:.1f}")
+        if current['queries_per_op'] > previous['queries_per_op'] + 0.01:
+            regressions.append(f"{name}.queries_per_op: {previous['queries_per_op']:.2f} -> {current['queries_per_op']:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сценарии бота и API на реалистичном объёме данных')
+    parser.add_argument('--scale', type=float, default=1.0, help='1.0 — 100k пользователей и 1M напоминаний')
+    parser.add_argument('--db', default=DEFAULT_DB)
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--ops', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='задержка поддельного OpenAI, с')
+    parser.add_argument('--save', nargs='?', const=BASELINE)
+    parser.add_argument('--compare', nargs='?', const=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    args.users = max(int(100_000 * args.scale), 10)
+    reminders = max(int(1_000_000 * args.scale), 100)
+
+    from app import create_app
+    from models import db, Reminder
+    if args.reseed and os.path.exists(args.db):
+        os.remove(args.db)
+    fresh = not os.path.exists(args.db)
+    app = create_app(bench_config(args.db))
+    if fresh:
+        started = time.perf_counter()
+        seed(app, args.users, reminders)
+        print(f"Засеяно за {time.perf_counter() - started:.1f} с", file=sys.stderr)
+    with app.app_context():
+        # Пары (telegram_id, reminder_id) для удаления — у seed они совпадают с user_id
+        owned = [tuple(row) for row in db.session.execute(
+            db.select(Reminder.user_id, Reminder.id).order_by(Reminder.id.desc()).limit(args.ops)
+        )]
+
+    server = serve(app)
+    bot, counter = load_bot(f'http://127.0.0.1:{server.server_port}', args.llm_latency)
+    try:
+        results = asyncio.run(run_all(bot, counter, args, owned))
+    finally:
+        server.shutdown()
+
+    report = {
+        'users': args.users,
+        'reminders': reminders,
+        'ops': args.ops,
+        'concurrency': args.concurrency,
+        'scenarios': results,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"РЕГРЕССИЯ {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
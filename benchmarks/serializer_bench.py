@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+from app import create_app
+from config import TestConfig
+from models import Reminder, Tag
+from schemas import ReminderSchema
+from serializers import reminders_json
+
+# marshmallow + jsonify против serializers.py на странице напоминаний с тегами.
+# Объекты собираются в памяти, без базы: меряется только сериализация.
+
+PROJECTION = ['id', 'title', 'event_time']
+
+
+def make_reminders(count):
+    start = datetime(2030, 1, 1, 9, 0)
+    tags = [Tag(id=i, name=name, chat_id=1) for i, name in enumerate(['работа', 'дом', 'здоровье'], 1)]
+    return [
+        Reminder(
+            id=i, user_id=1, chat_id=1, title=f'Напоминание {i}', description='Описание' if i % 2 else None,
+            event_time=start + timedelta(minutes=i), repeat_type='0 9 * * *' if i % 5 == 0 else None,
+            notification_time=None, next_fire_at=start + timedelta(minutes=i), created_at=start,
+            tags=tags[:i % 3],
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Скорость сериализации списков напоминаний')
+    parser.add_argument('--sizes', default='20,200,1000')
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app(type('BenchConfig', (TestConfig,), {'JSON_STREAM_THRESHOLD': 0}))
+    report = []
+    with app.app_context():
+        for size in map(int, args.sizes.split(',')):
+            reminders = make_reminders(size)
+            for only in (None, PROJECTION):
+                def marshmallow():
+                    return jsonify(ReminderSchema(many=True, only=only).dump(reminders)).get_data()
+
+                def fast():
+                    return reminders_json(reminders, only).get_data()
+
+                assert marshmallow() == fast(), 'вывод разошёлся'
+                before, after = timed(marshmallow, args.rounds), timed(fast, args.rounds)
+                report.append({
+                    'size': size,
+                    'fields': ','.join(only) if only else 'all',
+                    'marshmallow_ms': round(before, 3),
+                    'fast_ms': round(after, 3),
+                    'speedup': round(before / after, 1),
+                })
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
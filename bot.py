@@ -1,37 +1,135 @@
 import os
 import asyncio
 import logging
+import time
+from aiohttp import web
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-import aiohttp
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
-from datetime import datetime
+from api_client import ApiClient
+from scheduler import ApiReminderSource, ReminderScheduler
+from user_cache import UserCache
+from parse_cache import ParseCache
+from quick_parse import quick_parse
+from llm_pipeline import ParsePipeline, PipelineOverloaded
+from webhook import UpdateWorkers, make_app
+from send_queue import SendQueue
+from ratelimit import TapDebouncer
+from metrics import Registry, api_metrics, handler_middleware, llm_metrics, serve_metrics
+from zones import is_valid_timezone, local_now, zone
 
 load_dotenv()
 
 API_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 API_URL = os.getenv("API_URL", "http://localhost:5000")
+# Страница /reminders: текст сообщения ограничен 4096 символами, а клавиатура — рядами
+REMINDERS_PAGE_SIZE = 10
+CALLBACK_DATA_LIMIT = 64
+PARSE_CACHE_PATH = os.getenv("PARSE_CACHE_PATH")
+# polling или webhook; в режиме webhook несколько процессов могут стоять за одним прокси
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+# Процессы, которые только принимают апдейты, могут не запускать планировщик
+RUN_SCHEDULER = os.getenv("RUN_SCHEDULER", "1") == "1"
+# Несколько узлов с планировщиком делят чаты: abs(chat_id) % PARTITIONS == PARTITION
+SCHEDULER_PARTITION = int(os.getenv("SCHEDULER_PARTITION", "0"))
+SCHEDULER_PARTITIONS = int(os.getenv("SCHEDULER_PARTITIONS", "1"))
+# /metrics бота; при METRICS_PORT=0 метрики не собираются вовсе
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
 logging.basicConfig(level=logging.INFO)
 
 bot = Bot(token=API_TOKEN)
 dp = Dispatcher()
 
-openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+# Повторы на 429/5xx делает llm_pipeline, со своим ограничением частоты
+openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+metrics = Registry() if METRICS_PORT else None
+metrics_runner = None
+observe_llm = llm_metrics(metrics) if metrics is not None else None
+if metrics is not None:
+    dp.message.middleware(handler_middleware(metrics))
+    dp.callback_query.middleware(handler_middleware(metrics))
+
+api = ApiClient(API_URL, observe=api_metrics(metrics) if metrics is not None else None)
+user_cache = UserCache()
+taps = TapDebouncer()
+parse_cache = ParseCache(path=PARSE_CACHE_PATH)
+# Напоминания уходят через очередь с лимитами Telegram, а не напрямую
+send_queue = SendQueue(bot.send_message)
+scheduler = ReminderScheduler(
+    ApiReminderSource(api, partition=SCHEDULER_PARTITION, partitions=SCHEDULER_PARTITIONS),
+    send_queue.send_message,
+)
+
+def track_queue(name, depth):
+    if metrics is not None:
+        metrics.gauge("bot_queue_depth", "Глубина очередей бота", ("queue",)).track(depth, name)
+
+@dp.startup()
+async def on_startup():
+    global metrics_runner
+    if metrics is not None:
+        metrics_runner = await serve_metrics(metrics, METRICS_HOST, METRICS_PORT)
+    await api.start()
+    await llm_pipeline.start()
+    if RUN_SCHEDULER:
+        await send_queue.start()
+        await scheduler.start()
+
+@dp.shutdown()
+async def on_shutdown():
+    if RUN_SCHEDULER:
+        await scheduler.stop()
+        await send_queue.stop()
+    await llm_pipeline.stop()
+    await api.close()
+    parse_cache.close()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
 
 async def get_or_create_user(telegram_id, username):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{API_URL}/users/") as resp:
-            users = await resp.json()
-            user = next((u for u in users if u["telegram_id"] == telegram_id), None)
-            if user:
-                return user
-        payload = {"telegram_id": telegram_id, "username": username}
-        async with session.post(f"{API_URL}/users/", json=payload) as resp:
-            return await resp.json()
+    user = user_cache.get(telegram_id)
+    if user is not None and user.get("username") == username:
+        return user
+    resp = await api.put(f"/users/telegram/{telegram_id}", json={"username": username})
+    # В кэш — только пользователя, а не тело ошибки
+    if resp.status not in (200, 201):
+        raise RuntimeError(f"PUT /users/telegram/{telegram_id}: HTTP {resp.status}")
+    user_cache.put(telegram_id, resp.data)
+    return resp.data
+
+async def find_user(telegram_id):
+    user = user_cache.get(telegram_id)
+    if user is not None:
+        return user
+    resp = await api.get(f"/users/telegram/{telegram_id}")
+    if resp.status == 404:
+        return None
+    if resp.status != 200:
+        raise RuntimeError(f"GET /users/telegram/{telegram_id}: HTTP {resp.status}")
+    user_cache.put(telegram_id, resp.data)
+    return resp.data
+
+class UserNotFound(Exception):
+    pass
+
+class ReminderRejected(Exception):
+    # API отклонил поля напоминания (400); errors — {поле: [сообщения]}
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors if isinstance(errors, dict) else {}
 
 async def create_reminder(user_id, chat_id, title, description, event_time, repeat_type, notification_time, tags=None):
     data = {
@@ -44,14 +142,27 @@ async def create_reminder(user_id, chat_id, title, description, event_time, repe
         "notification_time": notification_time,
         "tags": tags or []
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.post(f"{API_URL}/reminders/", json=data) as resp:
-            return await resp.json()
+    resp = await api.post("/reminders/", json=data)
+    if resp.status == 404:
+        raise UserNotFound(user_id)
+    if resp.status == 400:
+        raise ReminderRejected((resp.data or {}).get("error"))
+    if resp.status != 201:
+        raise RuntimeError(f"POST /reminders/: HTTP {resp.status}")
+    return resp.data
 
-async def parse_reminder_with_gpt(text):
-    now = datetime.now().isoformat(sep='T', timespec='seconds')
+async def save_reminder(message, user, fields):
+    try:
+        return await create_reminder(user_id=user["id"], **fields)
+    except UserNotFound:
+        # Пользователь удалён в API, а в кэше бота остался — пересоздаём
+        user_cache.invalidate(message.from_user.id)
+        user = await get_or_create_user(message.from_user.id, message.from_user.username)
+        return await create_reminder(user_id=user["id"], **fields)
+
+async def request_gpt_parse(text, now):
     prompt = (
-        f"Сегодня: {now} (текущее время сервера). "
+        f"Сегодня: {now.isoformat(sep='T', timespec='seconds')} (текущее местное время пользователя). "
         "Ты помощник, который извлекает параметры напоминания из текста пользователя. "
         "Верни результат в JSON с ключами: "
         "title (строка), description (строка или null), event_time (строка в формате ISO 8601, например 2024-06-01T18:00:00), "
@@ -64,6 +175,7 @@ async def parse_reminder_with_gpt(text):
         f"Текст: {text}\n"
         "Ответ (только JSON):"
     )
+    started = time.perf_counter()
     response = await openai_client.chat.completions.create(
         model="gpt-4.1",
         messages=[
@@ -73,6 +185,8 @@ async def parse_reminder_with_gpt(text):
         max_tokens=300,
         temperature=0.1,
     )
+    if observe_llm is not None:
+        observe_llm(time.perf_counter() - started, response.usage)
     import json, re
     match = re.search(r'\{.*\}', response.choices[0].message.content, re.DOTALL)
     if match:
@@ -80,102 +194,214 @@ async def parse_reminder_with_gpt(text):
     else:
         raise ValueError("Не удалось распознать параметры напоминания.")
 
+llm_pipeline = ParsePipeline(request_gpt_parse)
+track_queue("send_queue", lambda: send_queue.depth)
+track_queue("scheduler", lambda: scheduler.depth)
+track_queue("llm_pipeline", lambda: llm_pipeline.depth)
+
+async def parse_reminder_with_gpt(text, on_queued=None, timezone=None):
+    # «Завтра в 9» — по часам пользователя; в UTC время переводит API
+    now = local_now(timezone)
+    # Типовые фразы разбираем локально, LLM — только для остального
+    params = quick_parse(text, now)
+    if params is not None:
+        return params
+    params = parse_cache.get(text, now)
+    report_parse_cache()
+    if params is not None:
+        return params
+    if on_queued is not None and llm_pipeline.busy:
+        await on_queued()
+    started = time.monotonic()
+    params = await llm_pipeline.submit(parse_cache.inflight_key(text, now), text, now)
+    parse_cache.put(text, now, params, latency=time.monotonic() - started)
+    return params
+
+def report_parse_cache():
+    stats = parse_cache.stats()
+    if (stats["hits"] + stats["misses"]) % 100 == 0:
+        logging.info(
+            "Кэш разбора: hit rate %.1f%%, сэкономлено %.1f с",
+            stats["hit_rate"] * 100, stats["saved_seconds"],
+        )
+
 @dp.message(Command("start"))
 async def cmd_start(message: types.Message):
     user = await get_or_create_user(message.from_user.id, message.from_user.username)
     await message.answer("Привет! Просто напиши мне напоминание в свободной форме, например: 'Завтра в 19:00 позвонить маме'. Я всё пойму!")
 
+def reminders_params(user_id, anchor=""):
+    # anchor — с какого места показана страница: "a<курсор>" — после курсора,
+    # "b<курсор>" — перед ним, "" — первая страница
+    params = {"user_id": user_id, "limit": REMINDERS_PAGE_SIZE, "fields": "id,title,event_time"}
+    if anchor:
+        params["cursor" if anchor[0] == "a" else "before"] = anchor[1:]
+    return params
+
+def callback_data(prefix, anchor, *values):
+    # Telegram ограничивает callback_data 64 байтами; не влезает — без якоря (первая страница)
+    data = ":".join((prefix, *map(str, values), anchor))
+    if len(data.encode()) > CALLBACK_DATA_LIMIT:
+        data = ":".join((prefix, *map(str, values), ""))
+    return data
+
+def short(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def render_reminders(reminders, headers, anchor):
+    text = "\n\n".join(
+        f"{i+1}. {short(rem['title'], 100)} — {rem.get('event_time', '') or ''}"
+        for i, rem in enumerate(reminders)
+    )
+    rows = [
+        [
+            InlineKeyboardButton(
+                text=f"❌ Удалить: {short(rem['title'], 40)}",
+                callback_data=callback_data("delete_reminder", anchor, rem["id"]),
+            )
+        ]
+        for rem in reminders
+    ]
+    navigation = []
+    if headers.get("X-Prev-Cursor"):
+        navigation.append(InlineKeyboardButton(text="◀️ Назад", callback_data=callback_data("reminders_page", "b" + headers["X-Prev-Cursor"])))
+    if headers.get("X-Next-Cursor"):
+        navigation.append(InlineKeyboardButton(text="Дальше ▶️", callback_data=callback_data("reminders_page", "a" + headers["X-Next-Cursor"])))
+    if navigation:
+        rows.append(navigation)
+    return text, InlineKeyboardMarkup(inline_keyboard=rows)
+
+async def show_reminders(edit, user, anchor="", resp=None):
+    # Страница из уже полученного ответа API или одним GET; опустевшая страница
+    # (удалили последнее на ней) — откатываемся на первую
+    if resp is None:
+        resp = await api.get("/reminders/", params=reminders_params(user["id"], anchor))
+    if not resp.data and anchor:
+        anchor = ""
+        resp = await api.get("/reminders/", params=reminders_params(user["id"]))
+    if not resp.data:
+        await edit("У вас нет напоминаний.", reply_markup=None)
+        return
+    text, keyboard = render_reminders(resp.data, resp.headers, anchor)
+    await edit(text, reply_markup=keyboard)
+
 @dp.message(Command("reminders"))
 async def cmd_reminders(message: types.Message):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{API_URL}/users/") as resp:
-            users = await resp.json()
-            user = next((u for u in users if u["telegram_id"] == message.from_user.id), None)
-            if not user:
-                await message.answer("Сначала напишите /start.")
-                return
-            async with session.get(f"{API_URL}/reminders/") as r2:
-                reminders = await r2.json()
-                user_reminders = [r for r in reminders if r["user_id"] == user["id"]]
-                if not user_reminders:
-                    await message.answer("У вас нет напоминаний.")
-                    return
-                # Формируем текст списка
-                text = "\n\n".join(
-                    f"{i+1}. {rem['title']} — {rem.get('event_time', '') or ''}"
-                    for i, rem in enumerate(user_reminders)
-                )
-                # Формируем inline-кнопки для удаления
-                keyboard = InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [
-                            InlineKeyboardButton(
-                                text=f"❌ Удалить: {rem['title']}",
-                                callback_data=f"delete_reminder:{rem['id']}"
-                            )
-                        ]
-                        for rem in user_reminders
-                    ]
-                )
-                await message.answer(
-                    text or "У вас нет напоминаний.",
-                    reply_markup=keyboard
-                )
+    user = await find_user(message.from_user.id)
+    if not user:
+        await message.answer("Сначала напишите /start.")
+        return
+    await show_reminders(message.answer, user)
+
+def tap_key(callback):
+    message = callback.message
+    return (message.chat.id, message.message_id) if message is not None else callback.from_user.id
+
+@dp.callback_query(F.data.startswith("reminders_page:"))
+async def reminders_page_callback(callback: CallbackQuery):
+    key = tap_key(callback)
+    if not taps.begin(key):
+        await callback.answer()
+        return
+    try:
+        user = await find_user(callback.from_user.id)
+        if not user:
+            await callback.answer("Ошибка пользователя. Напишите /start.", show_alert=True)
+            return
+        await callback.answer()
+        await show_reminders(callback.message.edit_text, user, callback.data.split(":", 1)[1])
+    finally:
+        taps.end(key)
 
 @dp.callback_query(F.data.startswith("delete_reminder:"))
 async def delete_reminder_callback(callback: CallbackQuery):
-    reminder_id = int(callback.data.split(":")[1])
-    user_id = callback.from_user.id
-    # Получим id пользователя в базе
-    async with aiohttp.ClientSession() as session:
-        async with session.get(f"{API_URL}/users/") as resp:
-            users = await resp.json()
-            user = next((u for u in users if u["telegram_id"] == user_id), None)
-            if not user:
-                await callback.answer("Ошибка пользователя. Напишите /start.", show_alert=True)
-                return
-            async with session.delete(f"{API_URL}/reminders/{reminder_id}?user_id={user['id']}") as resp2:
-                if resp2.status == 204:
-                    await callback.answer("Напоминание удалено!", show_alert=False)
-                    # Обновим список
-                    # Получаем оставшиеся напоминания
-                    async with session.get(f"{API_URL}/reminders/") as r2:
-                        reminders = await r2.json()
-                        user_reminders = [r for r in reminders if r["user_id"] == user["id"]]
-                        if not user_reminders:
-                            await callback.message.edit_text("У вас нет напоминаний.", reply_markup=None)
-                            return
-                        text = "\n\n".join(
-                            f"{i+1}. {rem['title']} — {rem.get('event_time', '') or ''}"
-                            for i, rem in enumerate(user_reminders)
-                        )
-                        keyboard = InlineKeyboardMarkup(
-                            inline_keyboard=[
-                                [
-                                    InlineKeyboardButton(
-                                        text=f"❌ Удалить: {rem['title']}",
-                                        callback_data=f"delete_reminder:{rem['id']}"
-                                    )
-                                ]
-                                for rem in user_reminders
-                            ]
-                        )
-                        await callback.message.edit_text(text, reply_markup=keyboard)
-                else:
-                    data = await resp2.json()
-                    msg = data.get("error", "Ошибка удаления.")
-                    await callback.answer(msg, show_alert=True)
+    # Быстрые повторные нажатия (двойной тап по одной кнопке) не шлют лишних DELETE
+    key = tap_key(callback)
+    if not taps.begin(key):
+        await callback.answer("⏳ Уже удаляю…")
+        return
+    try:
+        _, reminder_id, *rest = callback.data.split(":")
+        anchor = rest[0] if rest else ""
+        # Получим id пользователя в базе
+        user = await find_user(callback.from_user.id)
+        if not user:
+            await callback.answer("Ошибка пользователя. Напишите /start.", show_alert=True)
+            return
+        # API сразу возвращает обновлённую страницу — отдельный GET не нужен
+        params = dict(reminders_params(user["id"], anchor), return_page=1)
+        resp = await api.delete(f"/reminders/{int(reminder_id)}", params=params)
+        if resp.status == 200:
+            await callback.answer("Напоминание удалено!", show_alert=False)
+            await show_reminders(callback.message.edit_text, user, anchor, resp)
+        else:
+            msg = (resp.data or {}).get("error", "Ошибка удаления.")
+            await callback.answer(msg, show_alert=True)
+    finally:
+        taps.end(key)
+
+@dp.message(Command("find"))
+async def cmd_find(message: types.Message, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer("Что ищем? Например: /find стоматолог")
+        return
+    user = await find_user(message.from_user.id)
+    if not user:
+        await message.answer("Сначала напишите /start.")
+        return
+    params = {"user_id": user["id"], "q": query, "limit": REMINDERS_PAGE_SIZE, "fields": "id,title,event_time"}
+    resp = await api.get("/reminders/search", params=params)
+    if resp.status != 200 or not resp.data:
+        await message.answer("Ничего не нашлось.")
+        return
+    text = "\n\n".join(
+        f"{i+1}. {short(rem['title'], 100)} — {rem.get('event_time', '') or ''}"
+        for i, rem in enumerate(resp.data)
+    )
+    if resp.headers.get("X-Next-Offset"):
+        text += f"\n\nПоказаны {len(resp.data)} самых подходящих — уточните запрос."
+    await message.answer(text)
+
+@dp.message(Command("timezone"))
+async def cmd_timezone(message: types.Message, command: CommandObject):
+    user = await get_or_create_user(message.from_user.id, message.from_user.username)
+    name = (command.args or "").strip()
+    if not name:
+        await message.answer(
+            f"Ваш часовой пояс: {user.get('timezone') or zone().key}. "
+            "Сменить: /timezone Europe/Moscow"
+        )
+        return
+    if not is_valid_timezone(name):
+        await message.answer("Не знаю такого часового пояса. Пример: /timezone Asia/Yekaterinburg")
+        return
+    resp = await api.put(f"/users/{user['id']}", json={"timezone": name})
+    if resp.status != 200:
+        await message.answer("Не удалось сменить часовой пояс, попробуйте позже.")
+        return
+    user_cache.put(message.from_user.id, resp.data)
+    await message.answer(
+        f"Часовой пояс: {name}, сейчас у вас {local_now(name):%H:%M}. "
+        "Напоминания сработают по этому времени."
+    )
 
 @dp.message()
 async def handle_freeform(message: types.Message):
     user = await get_or_create_user(message.from_user.id, message.from_user.username)
     try:
-        params = await parse_reminder_with_gpt(message.text)
+        params = await parse_reminder_with_gpt(
+            message.text,
+            on_queued=lambda: message.answer("⏳ Распознаю напоминание, это займёт несколько секунд…"),
+            timezone=user.get("timezone"),
+        )
+    except PipelineOverloaded:
+        await message.answer("Сейчас слишком много запросов. Попробуйте ещё раз через минуту.")
+        return
     except Exception as e:
         await message.answer("Не удалось распознать напоминание. Попробуйте переформулировать фразу, например: 'Завтра в 19:00 позвонить маме'.")
         return
-    reminder = await create_reminder(
-        user_id=user["id"],
+    fields = dict(
         chat_id=message.chat.id,
         title=params.get("title", "Без названия"),
         description=params.get("description"),
@@ -184,8 +410,53 @@ async def handle_freeform(message: types.Message):
         notification_time=params.get("notification_time"),
         tags=params.get("tags"),
     )
-    await message.answer(f"Напоминание создано: {reminder['title']} на {reminder.get('event_time', '')}")
+    rejected = "Не удалось создать напоминание. Проверьте дату и время и попробуйте ещё раз."
+    note = ""
+    try:
+        reminder = await save_reminder(message, user, fields)
+    except ReminderRejected as e:
+        # GPT иногда кладёт в repeat_type не cron, а текст — тогда создаём разовое
+        if not (fields["repeat_type"] and "repeat_type" in e.errors):
+            await message.answer(rejected)
+            return
+        fields["repeat_type"] = None
+        try:
+            reminder = await save_reminder(message, user, fields)
+        except ReminderRejected:
+            await message.answer(rejected)
+            return
+        note = "\nПовтор распознать не удалось — напоминание разовое."
+    scheduler.add(reminder)
+    await message.answer(f"Напоминание создано: {reminder['title']} на {reminder.get('event_time', '')}{note}")
+
+async def run_webhook():
+    if not WEBHOOK_SECRET:
+        raise SystemExit("WEBHOOK_SECRET обязателен в режиме webhook")
+    workers = UpdateWorkers(
+        lambda update: dp.feed_raw_update(bot, update),
+        workers=WEBHOOK_WORKERS,
+        queue_size=WEBHOOK_QUEUE_SIZE,
+    )
+    track_queue("webhook", lambda: workers.depth)
+    runner = web.AppRunner(make_app(workers, WEBHOOK_SECRET, WEBHOOK_PATH))
+    await dp.emit_startup(bot=bot)
+    await workers.start()
+    await runner.setup()
+    await web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT).start()
+    if WEBHOOK_URL:
+        await bot.set_webhook(WEBHOOK_URL, secret_token=WEBHOOK_SECRET)
+    logging.info("Webhook слушает %s:%s%s", WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await workers.stop()
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
 
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(dp.start_polling(bot))
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        asyncio.run(run_webhook())
+    else:
+        asyncio.run(dp.start_polling(bot))
\ No newline at end of file
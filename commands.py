@@ -0,0 +1,91 @@
+import time
+import click
+from sqlalchemy import inspect, text, update
+from models import db, Reminder, ReminderArchive, User
+from archive import archive_reminders
+from routes.reminders import REFIRE_COLUMNS, refire_rows
+from search import create_search_index
+
+# Колонки, появившиеся после первых развёртываний
+ADDED_COLUMNS = (
+    Reminder.__table__.c.next_fire_at,
+    Reminder.__table__.c.timezone,
+    User.__table__.c.timezone,
+)
+
+
+def add_missing_columns():
+    # create_all не меняет существующие таблицы — недостающие колонки добавляем сами
+    preparer = db.engine.dialect.identifier_preparer
+    added = []
+    for column in ADDED_COLUMNS:
+        if column.name in {existing['name'] for existing in inspect(db.engine).get_columns(column.table.name)}:
+            continue
+        db.session.execute(text(
+            f'ALTER TABLE {preparer.format_table(column.table)} '
+            f'ADD COLUMN {preparer.format_column(column)} {column.type.compile(db.engine.dialect)}'
+        ))
+        added.append(f'{column.table.name}.{column.name}')
+    db.session.commit()
+    if 'Reminder.next_fire_at' in added:
+        index = next(index for index in Reminder.__table__.indexes if index.name == 'ix_reminder_next_fire')
+        index.create(db.engine, checkfirst=True)
+    return added
+
+
+def create_archive_table():
+    # Таблица архива и индекс выборки кандидатов — для базы, созданной до них
+    ReminderArchive.__table__.create(db.engine, checkfirst=True)
+    index = next(index for index in Reminder.__table__.indexes if index.name == 'ix_reminder_delivered')
+    index.create(db.engine, checkfirst=True)
+
+
+def backfill_next_fire(batch_size):
+    # Пересчёт диапазонами id с коммитом после каждого — без одной долгой транзакции на всю таблицу.
+    # Перевод в UTC зависит от зоны владельца, поэтому строки пачки читаем и пишем executemany.
+    max_id = db.session.scalar(db.select(db.func.max(Reminder.id))) or 0
+    updated = 0
+    for low in range(0, max_id, batch_size):
+        # Зона владельца — на случай строк, созданных до колонки Reminder.timezone
+        db.session.execute(
+            update(Reminder)
+            .where(Reminder.id > low, Reminder.id <= low + batch_size, Reminder.timezone.is_(None))
+            .values(timezone=db.select(User.timezone).where(User.id == Reminder.user_id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(db.select(*REFIRE_COLUMNS).where(Reminder.id > low, Reminder.id <= low + batch_size)).all()
+        if rows:
+            db.session.execute(update(Reminder), refire_rows(rows))
+        db.session.commit()
+        updated += len(rows)
+    return updated
+
+
+def register_commands(app):
+    @app.cli.command('backfill-next-fire', help='Заполнить Reminder.next_fire_at (UTC) у существующих напоминаний.')
+    @click.option('--batch-size', default=10000, show_default=True, type=click.IntRange(min=1))
+    def backfill_next_fire_command(batch_size):
+        started = time.perf_counter()
+        for name in add_missing_columns():
+            click.echo(f'Добавлена колонка {name}')
+        updated = backfill_next_fire(batch_size)
+        click.echo(f'Обновлено напоминаний: {updated} за {time.perf_counter() - started:.1f} с')
+
+    @app.cli.command('archive-reminders', help='Перенести сработавшие разовые напоминания в архив (запускать по cron).')
+    @click.option('--retention-days', type=click.IntRange(min=0), help='По умолчанию ARCHIVE_RETENTION_DAYS.')
+    @click.option('--batch-size', type=click.IntRange(min=1), help='По умолчанию ARCHIVE_BATCH_SIZE.')
+    @click.option('--pause', default=0.0, show_default=True, type=click.FloatRange(min=0), help='Пауза между пачками, с.')
+    def archive_reminders_command(retention_days, batch_size, pause):
+        create_archive_table()
+        report = archive_reminders(
+            app.config['ARCHIVE_RETENTION_DAYS'] if retention_days is None else retention_days,
+            batch_size or app.config['ARCHIVE_BATCH_SIZE'],
+            pause,
+        )
+        click.echo(f'Перенесено в архив: {report.moved} (пачек: {report.batches}) за {report.seconds:.1f} с')
+
+    @app.cli.command('create-search-index', help='Создать полнотекстовый индекс напоминаний в существующей базе.')
+    def create_search_index_command():
+        with db.engine.begin() as connection:
+            created = create_search_index(connection)
+        click.echo('Индекс поиска создан' if created else 'Индекс поиска уже есть')
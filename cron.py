@@ -0,0 +1,181 @@
+from calendar import monthrange
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Поле cron: (минимум, максимум, имена)
+FIELDS = (
+    (0, 59, None),
+    (0, 23, None),
+    (1, 31, None),
+    (1, 12, {name: i + 1 for i, name in enumerate(
+        ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])}),
+    (0, 7, {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}),
+)
+
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+# Сколько лет вперёд ищем срабатывание, прежде чем признать выражение невыполнимым
+# (например, '0 0 30 2 *')
+MAX_YEARS = 8
+
+# Множитель, повторяющий 7-битную маску недели пять раз подряд (35 дней)
+WEEK_REPEAT = sum(1 << (7 * i) for i in range(5))
+
+
+class CronExpression:
+    # Каждое поле скомпилировано в битовую маску: бит i установлен, если значение i подходит
+
+    __slots__ = ('source', 'minutes', 'hours', 'days', 'months', 'weekdays', 'day_any', 'weekday_any')
+
+    def __init__(self, source, minutes, hours, days, months, weekdays, day_any, weekday_any):
+        self.source = source
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = weekdays
+        self.day_any = day_any
+        self.weekday_any = weekday_any
+
+    def __repr__(self):
+        return f"CronExpression({self.source!r})"
+
+    def day_mask(self, year, month):
+        # Маска подходящих дней месяца с учётом правила cron: если ограничены и день
+        # месяца, и день недели, срабатывание по любому из них
+        days_in_month = monthrange(year, month)[1]
+        valid = ((1 << days_in_month) - 1) << 1
+        # Поворачиваем маску дней недели так, чтобы бит 0 соответствовал 1-му числу,
+        # и повторяем её на весь месяц
+        first_weekday = (datetime(year, month, 1).weekday() + 1) % 7
+        week = ((self.weekdays >> first_weekday) | (self.weekdays << (7 - first_weekday))) & 0x7F
+        by_weekday = (week * WEEK_REPEAT << 1) & valid
+        if self.day_any and self.weekday_any:
+            return valid
+        if self.day_any:
+            return by_weekday
+        if self.weekday_any:
+            return self.days & valid
+        return (self.days | by_weekday) & valid
+
+    def next_after(self, after):
+        # Ближайшее срабатывание строго позже after; по полям прыгаем к следующему
+        # установленному биту, а не перебираем минуты
+        current = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day, hour, minute = current.year, current.month, current.day, current.hour, current.minute
+        limit = year + MAX_YEARS
+        while year <= limit:
+            next_month = next_bit(self.months, month)
+            if next_month is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+            next_day = next_bit(self.day_mask(year, month), day)
+            if next_day is None:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                day, hour, minute = 1, 0, 0
+                continue
+            if next_day != day:
+                day, hour, minute = next_day, 0, 0
+            next_hour = next_bit(self.hours, hour)
+            if next_hour is None:
+                day, hour, minute = day + 1, 0, 0
+                if day > monthrange(year, month)[1]:
+                    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                    day = 1
+                continue
+            if next_hour != hour:
+                hour, minute = next_hour, 0
+            next_minute = next_bit(self.minutes, minute)
+            if next_minute is None:
+                hour, minute = hour + 1, 0
+                if hour > 23:
+                    day, hour = day + 1, 0
+                    if day > monthrange(year, month)[1]:
+                        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                        day = 1
+                continue
+            return datetime(year, month, day, hour, next_minute)
+        raise ValueError(f"cron expression {self.source!r} never fires")
+
+
+def next_bit(mask, start):
+    rest = mask >> start
+    if not rest:
+        return None
+    return start + (rest & -rest).bit_length() - 1
+
+
+def parse_value(token, names):
+    if names and token.lower() in names:
+        return names[token.lower()]
+    return int(token)
+
+
+def parse_field(text, low, high, names):
+    mask = 0
+    for part in text.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"invalid step in {text!r}")
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (parse_value(v, names) for v in expr.split('-', 1))
+        else:
+            start = parse_value(expr, names)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"value out of range in {text!r}")
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+@lru_cache(maxsize=4096)
+def compile_cron(expression):
+    source = expression.strip()
+    parts = MACROS.get(source.lower(), source).split()
+    if len(parts) != 5:
+        raise ValueError(f"cron expression must have 5 fields: {expression!r}")
+    try:
+        minutes, hours, days, months, weekdays = (
+            parse_field(part, low, high, names) for part, (low, high, names) in zip(parts, FIELDS)
+        )
+    except ValueError as e:
+        raise ValueError(f"invalid cron expression {expression!r}: {e}") from None
+    # 7 — тоже воскресенье
+    if weekdays >> 7 & 1:
+        weekdays = (weekdays | 1) & 0x7F
+    return CronExpression(
+        source, minutes, hours, days, months, weekdays,
+        day_any=parts[2].startswith('*'), weekday_any=parts[4].startswith('*'),
+    )
+
+
+# Точка отсчёта проверки: выполнимое выражение срабатывает в пределах MAX_YEARS
+# от любого момента, так что конкретная дата не важна
+VALIDATION_START = datetime(2000, 1, 1)
+
+
+def is_valid_cron(expression):
+    # Выражение, которое никогда не сработает ('0 0 30 2 *'), тоже неверное
+    try:
+        compile_cron(expression).next_after(VALIDATION_START)
+    except ValueError:
+        return False
+    return True
+
+
+def next_fire(expression, after):
+    return compile_cron(expression).next_after(after)
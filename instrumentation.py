@@ -0,0 +1,85 @@
+import logging
+import time
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+from metrics import CONTENT_TYPE, COUNT_BUCKETS, Registry
+
+logger = logging.getLogger(__name__)
+
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def add_query_count_header(response):
+    response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+    return response
+
+
+def init_query_counter(app):
+    # Число SQL-запросов на HTTP-запрос в заголовке X-Query-Count — чтобы тесты
+    # ловили регрессии вроде N+1. Включается QUERY_COUNT_HEADER в конфиге.
+    if not app.config.get('QUERY_COUNT_HEADER'):
+        return
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count_query)
+    app.after_request(add_query_count_header)
+
+
+def init_metrics(app):
+    # Метрики по эндпоинтам и SQL, отдаются на /metrics. При METRICS_ENABLED = False
+    # ни хуков, ни слушателей не регистрируем — выключенные метрики ничего не стоят.
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    registry = app.extensions['metrics'] = Registry()
+    requests_total = registry.counter('http_requests_total', 'HTTP-запросы', ('method', 'endpoint', 'status'))
+    latency = registry.histogram('http_request_duration_seconds', 'Время HTTP-запроса', ('method', 'endpoint'))
+    queries = registry.histogram('http_request_queries', 'SQL-запросов на HTTP-запрос', ('method', 'endpoint'), COUNT_BUCKETS)
+    sql_time = registry.histogram('http_request_sql_seconds', 'Время SQL на HTTP-запрос', ('method', 'endpoint'))
+    slow_queries = registry.counter('sql_slow_queries_total', 'SQL-запросы дольше SLOW_QUERY_MS')
+    slow_after = app.config.get('SLOW_QUERY_MS', 200) / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context():
+            g.sql_count = g.get('sql_count', 0) + 1
+            g.sql_time = g.get('sql_time', 0.0) + elapsed
+        if elapsed >= slow_after:
+            slow_queries.inc()
+            logger.warning("Медленный запрос, %.1f мс: %s", elapsed * 1000, statement)
+
+    def handle_error(context):
+        # Упавший запрос до after_cursor_execute не доходит — снимаем его отметку сами
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(db.engine, 'handle_error', handle_error)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        requests_total.inc(request.method, endpoint, str(response.status_code))
+        latency.observe(time.perf_counter() - started, request.method, endpoint)
+        queries.observe(g.get('sql_count', 0), request.method, endpoint)
+        sql_time.observe(g.get('sql_time', 0.0), request.method, endpoint)
+        return response
+
+    @app.get('/metrics')
+    def metrics():
+        return Response(registry.render(), headers={'Content-Type': CONTENT_TYPE})
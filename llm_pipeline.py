@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import random
+
+import openai
+
+from ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineOverloaded(Exception):
+    pass
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def retry_after(error):
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class ParsePipeline:
+    # Пул воркеров перед LLM: ограниченная очередь (при переполнении — отказ сразу,
+    # а не бесконечное ожидание), token bucket на частоту запросов, склейка одинаковых
+    # запросов «в полёте» и повторы с джиттером на 429/5xx.
+
+    def __init__(self, parse, workers=4, queue_size=100, rate=5.0, burst=10, retries=3, backoff=0.5, busy_threshold=None):
+        self.parse = parse
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.busy_threshold = busy_threshold if busy_threshold is not None else workers
+        self.bucket = TokenBucket(rate, burst)
+        self.deduplicated = 0
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._inflight = {}
+        self._tasks = []
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    @property
+    def busy(self):
+        # Очередь настолько глубокая, что пользователю стоит сказать «распознаю…»
+        return self.depth >= self.busy_threshold
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for future in self._inflight.values():
+            if not future.done():
+                future.cancel()
+        self._inflight.clear()
+
+    async def submit(self, key, *args):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            try:
+                self._queue.put_nowait((key, args, future))
+            except asyncio.QueueFull:
+                raise PipelineOverloaded() from None
+            self._inflight[key] = future
+        return await asyncio.shield(future)
+
+    async def _worker(self):
+        while True:
+            key, args, future = await self._queue.get()
+            try:
+                result = await self._call(args)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._inflight.pop(key, None)
+                self._queue.task_done()
+
+    async def _call(self, args):
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            try:
+                return await self.parse(*args)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.retries:
+                    raise
+                delay = retry_after(e) or self.backoff * (2 ** attempt)
+                delay *= random.uniform(1.0, 1.5)
+                logger.warning("LLM: %r, повтор через %.2f с", e, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
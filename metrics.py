@@ -0,0 +1,204 @@
+import bisect
+import re
+import threading
+import time
+
+from aiohttp import web
+
+# Метрики в текстовом формате Prometheus без внешних зависимостей. Значения метрики
+# хранятся по кортежу значений меток, порядок которых задан при регистрации.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def path_label(path):
+    # /reminders/42/delivered -> /reminders/{id}/delivered, чтобы не плодить ряды
+    return re.sub(r'/\d+', '/{id}', path)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(self.labels, labels, extra)} {format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield '', labels, (), value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        self._values[labels] = value
+
+    def track(self, fn, *labels):
+        # Значение считается в момент выдачи /metrics — для глубин очередей
+        self._values[labels] = fn
+
+    def samples(self):
+        for labels, value in sorted(self._values.items(), key=lambda item: item[0]):
+            yield '', labels, (), value() if callable(value) else value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels):
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def samples(self):
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                yield '_bucket', labels, (('le', format_value(float(bound))),), cumulative
+            yield '_bucket', labels, (('le', '+Inf'),), count
+            yield '_sum', labels, (), total
+            yield '_count', labels, (), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, cls, name, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def handler_middleware(registry):
+    # Middleware aiogram (dp.message.middleware(...)): время и ошибки по имени обработчика
+    latency = registry.histogram('bot_handler_seconds', 'Время обработчика бота', ('handler',))
+    errors = registry.counter('bot_handler_errors_total', 'Исключения в обработчиках бота', ('handler',))
+
+    async def middleware(handler, event, data):
+        name = getattr(getattr(data.get('handler'), 'callback', None), '__name__', 'unknown')
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            errors.inc(name)
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started, name)
+
+    return middleware
+
+
+def api_metrics(registry):
+    # Наблюдатель для ApiClient(observe=...): время вызова API вместе с повторами
+    latency = registry.histogram('bot_api_request_seconds', 'Время запроса бота к REST API', ('method', 'path', 'status'))
+
+    def observe(method, path, status, elapsed):
+        latency.observe(elapsed, method, path_label(path), str(status))
+
+    return observe
+
+
+def llm_metrics(registry):
+    latency = registry.histogram('bot_openai_request_seconds', 'Время запроса к OpenAI')
+    tokens = registry.counter('bot_openai_tokens_total', 'Токены OpenAI', ('kind',))
+
+    def observe(elapsed, usage):
+        latency.observe(elapsed)
+        if usage is not None:
+            tokens.inc('prompt', amount=usage.prompt_tokens or 0)
+            tokens.inc('completion', amount=usage.completion_tokens or 0)
+
+    return observe
+
+
+def metrics_app(registry):
+    async def view(request):
+        return web.Response(body=registry.render().encode(), headers={'Content-Type': CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get('/metrics', view)
+    return app
+
+
+async def serve_metrics(registry, host, port):
+    runner = web.AppRunner(metrics_app(registry))
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -1,13 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from cron import next_fire
+from zones import local_now, to_utc
 
 db = SQLAlchemy()
 
 class User(db.Model):
     __tablename__ = 'User'
     id = db.Column(db.Integer, primary_key=True)
-    telegram_id = db.Column(db.BigInteger, nullable=False)
+    telegram_id = db.Column(db.BigInteger, nullable=False, unique=True, index=True)
     username = db.Column(db.String(255))
+    # Имя зоны IANA (Europe/Moscow); NULL — DEFAULT_TIMEZONE из конфига
+    timezone = db.Column(db.String(64))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     reminders = db.relationship('Reminder', backref='user', lazy=True)
@@ -22,18 +26,113 @@ class Reminder(db.Model):
     event_time = db.Column(db.DateTime)
     repeat_type = db.Column(db.String(50))
     notification_time = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    # Аренда планировщиком: кто забрал напоминание на отправку и до какого момента
+    claimed_by = db.Column(db.String(64))
+    lease_until = db.Column(db.DateTime)
+    # event_time и notification_time — местное время владельца в его зоне, копия
+    # User.timezone здесь, чтобы пересчёт в UTC не ходил за пользователем
+    timezone = db.Column(db.String(64))
+    # Ближайшее срабатывание (notification_time, иначе event_time) в UTC; NULL — больше
+    # не сработает. Пересчитывается при каждой записи через ORM, массовые пути ставят его сами.
+    next_fire_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     tags = db.relationship('Tag', secondary='ReminderTag', backref='reminders')
 
+    def refresh_next_fire(self):
+        self.next_fire_at = next_fire_time(self)
+
+    # Индексы под постраничный список: фильтр по владельцу/чату, сортировка по (event_time, id)
+    __table_args__ = (
+        db.Index('ix_reminder_user_event', 'user_id', 'event_time', 'id'),
+        db.Index('ix_reminder_chat_event', 'chat_id', 'event_time', 'id'),
+        # Окно ближайших срабатываний для планировщика — один диапазон по next_fire_at
+        db.Index('ix_reminder_next_fire', 'next_fire_at'),
+        db.Index('ix_reminder_event', 'event_time'),
+        # Просроченные аренды упавших воркеров
+        db.Index('ix_reminder_lease', 'lease_until'),
+        # Доставленные — кандидаты в архив (archive.py)
+        db.Index('ix_reminder_delivered', 'delivered_at'),
+    )
+
+def fire_at(event_time, notification_time, repeat_type, timezone):
+    # Ближайшее срабатывание в UTC. У повторяющегося без event_time или с уже прошедшим —
+    # следующее по правилу от текущего местного времени, с тем же отступом notification_time
+    if repeat_type and (event_time is None or event_time <= local_now(timezone)):
+        try:
+            upcoming = next_fire(repeat_type, local_now(timezone))
+        except ValueError:
+            return None
+        if event_time is not None and notification_time is not None:
+            upcoming -= event_time - notification_time
+        return to_utc(upcoming, timezone)
+    return to_utc(notification_time or event_time, timezone)
+
+def next_fire_time(row):
+    # row — Reminder или строка запроса с теми же полями (массовые пути)
+    if row.delivered_at:
+        return None
+    return fire_at(row.event_time, row.notification_time, row.repeat_type, row.timezone)
+
+@db.event.listens_for(Reminder, 'before_insert')
+@db.event.listens_for(Reminder, 'before_update')
+def update_next_fire(mapper, connection, reminder):
+    reminder.refresh_next_fire()
+
 class Tag(db.Model):
     __tablename__ = 'Tag'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     chat_id = db.Column(db.Integer, nullable=False)
 
+    # Теги уникальны в пределах чата; индекс же служит для поиска по имени и префиксу
+    __table_args__ = (
+        db.UniqueConstraint('chat_id', 'name', name='uq_tag_chat_name'),
+    )
+
 class ReminderTag(db.Model):
     __tablename__ = 'ReminderTag'
     id = db.Column(db.Integer, primary_key=True)
     reminder_id = db.Column(db.Integer, db.ForeignKey('Reminder.id', ondelete='CASCADE'), nullable=False)
-    tag_id = db.Column(db.Integer, db.ForeignKey('Tag.id'), nullable=False)
\ No newline at end of file
+    tag_id = db.Column(db.Integer, db.ForeignKey('Tag.id'), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('reminder_id', 'tag_id', name='uq_reminder_tag'),
+        # Фильтр напоминаний по тегу идёт от тега к напоминаниям
+        db.Index('ix_reminder_tag_tag', 'tag_id', 'reminder_id'),
+    )
+
+class ReminderArchive(db.Model):
+    # Сработавшие разовые напоминания, перенесённые из Reminder задачей archive-reminders.
+    # id — свой: в SQLite id удалённых напоминаний выдаются заново, поэтому прежний
+    # хранится отдельно в reminder_id и уникальным не считается. tags — снимок тегов
+    # [{id, name, chat_id}]: связи в ReminderTag удаляются вместе с напоминанием.
+    __tablename__ = 'ReminderArchive'
+    id = db.Column(db.Integer, primary_key=True)
+    reminder_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    chat_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text)
+    event_time = db.Column(db.DateTime)
+    notification_time = db.Column(db.DateTime)
+    delivered_at = db.Column(db.DateTime)
+    timezone = db.Column(db.String(64))
+    tags = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+    # История пользователя — от недавно архивированных к давним по id
+    __table_args__ = (
+        db.Index('ix_reminder_archive_user', 'user_id', 'id'),
+    )
+
+class Version(db.Model):
+    # Счётчик изменений области ('owner' — напоминания пользователя, 'chat' —
+    # напоминания и теги чата, 'user'/'telegram' — сама запись пользователя).
+    # Растёт при каждой записи и служит основой ETag для GET-ответов.
+    __tablename__ = 'Version'
+    scope = db.Column(db.String(16), primary_key=True)
+    key = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
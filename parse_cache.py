@@ -0,0 +1,187 @@
+import json
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime, time as clock_time, timedelta
+
+TIME_FIELDS = ("event_time", "notification_time")
+
+# «через 15 минут» — время отсчитывается от момента сообщения
+RELATIVE_RE = re.compile(r"\b(через|спустя)\b")
+# Явная календарная дата — ответ не зависит от текущего дня, кроме смены года.
+# «15 числа», «в конце месяца», «в начале года» привязаны к календарю, а не к сегодняшнему
+# дню: смещение в днях для них не годится, такие ответы кэшируются на дату
+DATE_RE = re.compile(
+    r"\b\d{1,2}[./]\d{1,2}\b|"
+    r"\b(январ|феврал|март|апрел|ма[йя]|июн|июл|август|сентябр|октябр|ноябр|декабр)|"
+    r"\b(числ|месяц|год)"
+)
+# Дни недели — результат зависит от того, какой сегодня день
+WEEKDAY_RE = re.compile(r"\b(понедельник|вторник|сред[уа]|четверг|пятниц|суббот|воскресень|выходн|будн|недел)")
+
+# Как часто чистить SQLite от старых и лишних записей
+PRUNE_EVERY = 100
+
+
+def normalize(text):
+    text = text.lower().replace("ё", "е")
+    text = re.sub(r"[^\w\s:.]", " ", text)
+    text = re.sub(r"(?<!\d)\.|\.(?!\d)", " ", text)
+    return " ".join(text.split())
+
+
+def anchor_mode(normalized):
+    if RELATIVE_RE.search(normalized):
+        return "delta"
+    if DATE_RE.search(normalized):
+        return "absolute"
+    return "day"
+
+
+def bucket(normalized, mode, now):
+    # Корзина относительного времени: в пределах неё один и тот же текст
+    # даёт один и тот же ответ относительно now
+    if mode == "delta":
+        return "rel"
+    if mode == "absolute":
+        return now.date().isoformat()
+    if WEEKDAY_RE.search(normalized):
+        return f"w{now.weekday()}h{now.hour}"
+    return f"h{now.hour}"
+
+
+def wall_time(moment):
+    # Парсер отвечает в местном времени пользователя; смещение, если он его всё же
+    # добавил, и доли секунды отбрасываем — в кэше только наивное местное время
+    return moment.replace(tzinfo=None, microsecond=0)
+
+
+def to_relative(params, mode, now):
+    # Абсолютные времена из ответа парсера превращаем в смещения от now,
+    # чтобы при повторном использовании привязать их к новому now
+    entry = dict(params)
+    for field in TIME_FIELDS:
+        value = params.get(field)
+        if not value or mode == "absolute":
+            continue
+        moment = wall_time(datetime.fromisoformat(value))
+        if mode == "delta":
+            entry[field] = {"delta": (moment - now).total_seconds()}
+        else:
+            entry[field] = {"days": (moment.date() - now.date()).days, "time": moment.time().isoformat()}
+    return entry
+
+
+def from_relative(entry, now):
+    params = dict(entry)
+    for field in TIME_FIELDS:
+        value = entry.get(field)
+        if isinstance(value, dict):
+            if "delta" in value:
+                moment = now.replace(microsecond=0) + timedelta(seconds=value["delta"])
+            else:
+                day = now.date() + timedelta(days=value["days"])
+                moment = datetime.combine(day, wall_time(clock_time.fromisoformat(value["time"])))
+            params[field] = moment.isoformat(timespec="seconds")
+    return params
+
+
+class ParseCache:
+    # Кэш результатов разбора: ключ — нормализованный текст и корзина времени,
+    # значение — разбор с относительными временами. Вытеснение по размеру (LRU)
+    # и возрасту, опционально с хранением в SQLite между перезапусками.
+
+    def __init__(self, maxsize=5000, max_age=7 * 24 * 3600, path=None, clock=time.time):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._items = OrderedDict()
+        self._puts = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache "
+                "(key TEXT PRIMARY KEY, entry TEXT NOT NULL, latency REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_parse_cache_created ON parse_cache (created_at)")
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._items)
+
+    def key(self, text, now):
+        normalized = normalize(text)
+        mode = anchor_mode(normalized)
+        return f"{bucket(normalized, mode, now)}|{normalized}", mode
+
+    def inflight_key(self, text, now):
+        # Ключ склейки одновременных запросов к LLM. Ответ содержит абсолютные даты
+        # от now, поэтому кроме корзины кэша — местные дата и минута: пользователи
+        # в разных поясах с одинаковым часом, но разной датой один вызов не делят
+        key, _ = self.key(text, now)
+        return f"{now:%Y-%m-%dT%H:%M}|{key}"
+
+    def get(self, text, now):
+        key, _ = self.key(text, now)
+        item = self._items.get(key)
+        if item is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT created_at, entry, latency FROM parse_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                item = (row[0], json.loads(row[1]), row[2])
+                self._store(key, item)
+        if item is not None:
+            created_at, entry, latency = item
+            if self.clock() - created_at <= self.max_age:
+                self._items.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += latency
+                return from_relative(entry, now)
+            self._items.pop(key, None)
+        self.misses += 1
+        return None
+
+    def put(self, text, now, params, latency=0.0):
+        key, mode = self.key(text, now)
+        item = (self.clock(), to_relative(params, mode, now), latency)
+        self._store(key, item)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, entry, latency, created_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(item[1], ensure_ascii=False), latency, item[0]),
+            )
+            self._puts += 1
+            if self._puts % PRUNE_EVERY == 0:
+                self._db.execute(
+                    "DELETE FROM parse_cache WHERE created_at < ? OR key IN "
+                    "(SELECT key FROM parse_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (item[0] - self.max_age, self.maxsize),
+                )
+            self._db.commit()
+
+    def _store(self, key, item):
+        self._items[key] = item
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
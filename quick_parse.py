@@ -0,0 +1,170 @@
+import re
+from datetime import datetime, timedelta
+
+from cron import next_fire
+
+# Быстрый разбор типовых фраз без обращения к LLM. Возвращает тот же JSON, что и
+# parse_reminder_with_gpt, или None, если фраза распознана не целиком — тогда
+# решение остаётся за LLM.
+
+WEEKDAY_STEMS = ['понедельник', 'вторник', 'сред', 'четверг', 'пятниц', 'суббот', 'воскресень']
+WEEKDAY = r"(?P<wd>понедельник|вторник|сред|четверг|пятниц|суббот|воскресень)\w*"
+
+NUMBER_WORDS = {
+    'одну': 1, 'один': 1, 'одна': 1, 'пару': 2, 'два': 2, 'две': 2, 'три': 3, 'четыре': 4,
+    'пять': 5, 'шесть': 6, 'семь': 7, 'восемь': 8, 'девять': 9, 'десять': 10,
+    'пятнадцать': 15, 'двадцать': 20, 'тридцать': 30, 'сорок': 40,
+}
+UNITS = [('минут', 'minutes'), ('час', 'hours'), ('дн', 'days'), ('день', 'days'), ('недел', 'weeks')]
+
+RELATIVE_RE = re.compile(
+    r"\bчерез\s+(?:(?P<half>полчаса)|(?P<n>\d+|" + "|".join(NUMBER_WORDS) + r")?\s*"
+    r"(?P<unit>минут\w*|час\w*|дн\w*|день|недел\w*))\b"
+)
+RECURRENCE_RE = re.compile(
+    r"\b(?:(?P<daily>каждый\s+день|ежедневно|каждое\s+утро|каждый\s+вечер)"
+    r"|(?P<workdays>по\s+будням|каждый\s+будний\s+день)"
+    r"|(?:кажд\w+|по)\s+" + WEEKDAY + r")\b"
+)
+DAY_RE = re.compile(r"\b(?P<day>сегодня|завтра|послезавтра)\b")
+SINGLE_WEEKDAY_RE = re.compile(r"\bв[о]?\s+" + WEEKDAY + r"\b")
+TIME_RE = re.compile(
+    r"\b(?:в|во)\s+(?P<h>\d{1,2})(?::(?P<m>\d{2}))?(?:\s*(?:час\w*|ч))?"
+    r"(?:\s+(?P<part>утра|дня|вечера|ночи))?(?!\w)"
+)
+
+# Лишние слова в начале фразы, которые не относятся к названию
+PREFIX_RE = re.compile(r"^(?:напомни(?:ть)?(?:\s+мне)?|мне\s+надо|мне\s+нужно|надо|нужно|не\s+забыть)\s+")
+# Если после вырезания времени в тексте осталось что-то похожее на время,
+# фраза сложнее, чем мы умеем, — отдаём её LLM
+LEFTOVER_RE = re.compile(
+    r"\d|\b(?:утр|вечер|днем|ночь|ночью|полдень|полноч|числ|недел|месяц|год|час|минут|через|кажд|ежедн|"
+    r"сегодня|завтра|послезавтра|январ|феврал|март|апрел|мая|июн|июл|август|сентябр|октябр|ноябр|декабр|"
+    r"понедельник|вторник|сред[уа]\b|четверг|пятниц|суббот|воскресень)|\b(?:до|после|раз|пока)\b"
+)
+EDGE_WORDS = {'в', 'во', 'на', 'к', 'и', 'что', 'чтобы', 'а', 'по'}
+
+
+def result(title, event_time, repeat_type=None):
+    return {
+        "title": title,
+        "description": None,
+        "event_time": event_time.isoformat(timespec='seconds'),
+        "repeat_type": repeat_type,
+        "notification_time": None,
+        "tags": [],
+    }
+
+
+def parse_time(match, evening=False):
+    hour = int(match.group('h'))
+    minute = int(match.group('m') or 0)
+    part = match.group('part')
+    if (part in ('дня', 'вечера') or evening) and hour < 12:
+        hour += 12
+    elif part == 'ночи' and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return hour, minute
+
+
+def relative_delta(match):
+    if match.group('half'):
+        return timedelta(minutes=30)
+    count = match.group('n')
+    count = 1 if count is None else int(count) if count.isdigit() else NUMBER_WORDS[count]
+    unit = match.group('unit')
+    for stem, name in UNITS:
+        if unit.startswith(stem):
+            return timedelta(**{name: count})
+    return None
+
+
+def extract_title(text, spans):
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + ' ' + text[end:]
+    words = re.sub(r"[,.!?;:\-—]+", ' ', text).split()
+    while words and words[0].lower() in EDGE_WORDS:
+        words.pop(0)
+    while words and words[-1].lower() in EDGE_WORDS:
+        words.pop()
+    title = ' '.join(words)
+    title = title[len(title) - len(PREFIX_RE.sub('', title.lower())):]
+    if not title or LEFTOVER_RE.search(title.lower()):
+        return None
+    return title[0].upper() + title[1:]
+
+
+def quick_parse(text, now=None):
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    # Нижний регистр без «ё» сохраняет длину строки, поэтому позиции совпадений
+    # годятся для вырезания из исходного текста
+    source = ' '.join(text.split())
+    lowered = source.lower().replace('ё', 'е')
+    spans = []
+
+    relative = RELATIVE_RE.search(lowered)
+    recurrence = RECURRENCE_RE.search(lowered)
+    day = DAY_RE.search(lowered)
+    weekday = None if recurrence else SINGLE_WEEKDAY_RE.search(lowered)
+    times = list(TIME_RE.finditer(lowered))
+    if len(times) > 1:
+        return None
+    clock = times[0] if times else None
+
+    if relative:
+        # «Через час завтра» и подобное — неоднозначно
+        if recurrence or day or weekday or clock:
+            return None
+        delta = relative_delta(relative)
+        if delta is None:
+            return None
+        title = extract_title(source, [relative.span()])
+        return result(title, now + delta) if title else None
+
+    if clock is None:
+        return None
+    evening = bool(recurrence and 'вечер' in recurrence.group(0))
+    parsed_time = parse_time(clock, evening=evening)
+    if parsed_time is None:
+        return None
+    hour, minute = parsed_time
+    spans.append(clock.span())
+
+    if recurrence:
+        if day or weekday:
+            return None
+        spans.append(recurrence.span())
+        if recurrence.group('daily'):
+            days = '*'
+        elif recurrence.group('workdays'):
+            days = '1-5'
+        else:
+            days = str((WEEKDAY_STEMS.index(recurrence.group('wd')) + 1) % 7)
+        repeat_type = f"{minute} {hour} * * {days}"
+        title = extract_title(source, spans)
+        return result(title, next_fire(repeat_type, now - timedelta(minutes=1)), repeat_type) if title else None
+
+    if day and weekday:
+        return None
+    if day:
+        spans.append(day.span())
+        offset = ['сегодня', 'завтра', 'послезавтра'].index(day.group('day'))
+        event_time = now.replace(hour=hour, minute=minute) + timedelta(days=offset)
+        if event_time < now:
+            return None
+    elif weekday:
+        spans.append(weekday.span())
+        target = WEEKDAY_STEMS.index(weekday.group('wd'))
+        days_ahead = (target - now.weekday()) % 7
+        event_time = now.replace(hour=hour, minute=minute) + timedelta(days=days_ahead)
+        if event_time <= now:
+            event_time += timedelta(days=7)
+    else:
+        event_time = now.replace(hour=hour, minute=minute)
+        if event_time <= now:
+            event_time += timedelta(days=1)
+
+    title = extract_title(source, spans)
+    return result(title, event_time) if title else None
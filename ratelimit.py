@@ -0,0 +1,62 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    # Классический token bucket: rate токенов в секунду, не больше capacity про запас
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        # 0 — токены списаны, иначе сколько секунд ждать до появления нужного количества
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens=1):
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class TapDebouncer:
+    # Повторные нажатия кнопок одного сообщения: пока предыдущее обрабатывается и ещё
+    # interval секунд после него новые нажатия отбрасываются
+
+    def __init__(self, interval=1.0, maxsize=10000, clock=time.monotonic):
+        self.interval = interval
+        self.maxsize = maxsize
+        self.clock = clock
+        self._active = set()
+        self._done = OrderedDict()
+
+    def begin(self, key):
+        if key in self._active:
+            return False
+        finished = self._done.get(key)
+        if finished is not None and self.clock() - finished < self.interval:
+            return False
+        self._active.add(key)
+        return True
+
+    def end(self, key):
+        self._active.discard(key)
+        self._done[key] = self.clock()
+        self._done.move_to_end(key)
+        while len(self._done) > self.maxsize:
+            self._done.popitem(last=False)
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+# Разбор параметров запроса, общий для Flask-блюпринтов и async API: args — любой
+# словарь строк (request.args во Flask, request.query в aiohttp)
+
+def int_arg(args, name, default=None):
+    # Как request.args.get(name, default, type=int): нечисловое значение — default
+    try:
+        return int(args[name])
+    except (KeyError, TypeError, ValueError):
+        return default
+
+def datetime_arg(args, name):
+    value = args.get(name)
+    return datetime.fromisoformat(value) if value else None
@@ -1,29 +1,430 @@
+import base64
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
-from models import db, Reminder, Tag
+from marshmallow import ValidationError
+from sqlalchemy import and_, or_, func, insert, update, delete
+from sqlalchemy.orm import load_only, selectinload
+from models import db, Reminder, ReminderArchive, Tag, User, ReminderTag, fire_at, next_fire_time
 from schemas import ReminderSchema
+from cron import next_fire
+from routes.tags import resolve_tags
+from routes.args import int_arg, datetime_arg
+from search import ranked, search_terms
+from serializers import archived_json, reminders_json
+from versions import conditional, reminder_scopes, touch
+from zones import local_now, utc_now
 
 bp = Blueprint('reminders_bp', __name__, url_prefix='/reminders')
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_SIZE = 1000
+DEFAULT_LEASE = 60
+
+def encode_cursor(reminder):
+    # Базовый формат ISO 8601 — курсор должен влезать в callback_data Telegram (64 байта)
+    event_time = reminder.event_time.strftime('%Y%m%dT%H%M%S') if reminder.event_time else ''
+    if reminder.event_time and reminder.event_time.microsecond:
+        event_time += f'.{reminder.event_time.microsecond:06d}'
+    raw = f"{event_time}|{reminder.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    event_time, _, reminder_id = raw.partition('|')
+    return (datetime.fromisoformat(event_time) if event_time else None), int(reminder_id)
+
+def after_cursor(event_time, reminder_id):
+    # Порядок (event_time, id), NULL идут первыми — как в MariaDB и SQLite
+    if event_time is None:
+        return or_(
+            and_(Reminder.event_time.is_(None), Reminder.id > reminder_id),
+            Reminder.event_time.is_not(None),
+        )
+    return or_(
+        Reminder.event_time > event_time,
+        and_(Reminder.event_time == event_time, Reminder.id > reminder_id),
+    )
+
+def before_cursor(event_time, reminder_id):
+    # Строки строго раньше позиции в том же порядке (event_time, id)
+    if event_time is None:
+        return and_(Reminder.event_time.is_(None), Reminder.id < reminder_id)
+    return or_(
+        Reminder.event_time.is_(None),
+        Reminder.event_time < event_time,
+        and_(Reminder.event_time == event_time, Reminder.id < reminder_id),
+    )
+
+# Разбор параметров и построение запросов не зависят от Flask — их же использует
+# async API (async_routes/reminders.py)
+
+def parse_fields(value):
+    # ?fields=id,title,event_time — проекция: клиент получает только нужные поля
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(fields) - set(ReminderSchema().fields)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+def requested_fields():
+    return parse_fields(request.args.get('fields'))
+
+def project(query, fields):
+    # Теги подгружаем одним батчевым SELECT ... IN на всю страницу, а не по запросу
+    # на каждое напоминание; при проекции без тегов не трогаем их вовсе
+    if fields is None:
+        return query.options(selectinload(Reminder.tags))
+    columns = {Reminder.id, Reminder.event_time}
+    columns.update(getattr(Reminder, name) for name in fields if name != 'tags')
+    query = query.options(load_only(*columns))
+    if 'tags' in fields:
+        query = query.options(selectinload(Reminder.tags))
+    return query
+
+def reminder_filters(args, start, end):
+    # Общие условия списка и поиска: владелец, чат, тег, окно по event_time
+    filters = []
+    user_id = int_arg(args, 'user_id')
+    if user_id is not None:
+        filters.append(Reminder.user_id == user_id)
+    chat_id = int_arg(args, 'chat_id')
+    if chat_id is not None:
+        filters.append(Reminder.chat_id == chat_id)
+    tag = args.get('tag')
+    if tag:
+        # От тега к напоминаниям: (chat_id, name) -> (tag_id, reminder_id), без
+        # коррелированного EXISTS на каждую строку напоминаний
+        tagged = db.select(ReminderTag.reminder_id).join(Tag, Tag.id == ReminderTag.tag_id).where(Tag.name == tag)
+        if chat_id is not None:
+            tagged = tagged.where(Tag.chat_id == chat_id)
+        filters.append(Reminder.id.in_(tagged))
+    if start is not None:
+        filters.append(Reminder.event_time >= start)
+    if end is not None:
+        filters.append(Reminder.event_time < end)
+    return filters
+
+def list_query(args):
+    # (запрос страницы с одной лишней строкой, limit, fields); ValueError — неверные параметры
+    try:
+        start = datetime_arg(args, 'from')
+        end = datetime_arg(args, 'to')
+        cursor = args.get('cursor')
+        position = decode_cursor(cursor) if cursor else None
+        before = args.get('before')
+        previous = decode_cursor(before) if before else None
+        fields = parse_fields(args.get('fields'))
+    except ValueError:
+        raise ValueError("invalid from/to/cursor/fields") from None
+    if position is not None and previous is not None:
+        raise ValueError("cursor and before are mutually exclusive")
+    limit = min(max(int_arg(args, 'limit', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+
+    query = db.select(Reminder).where(*reminder_filters(args, start, end))
+    if position is not None:
+        query = query.where(after_cursor(*position))
+    if previous is not None:
+        # Предыдущая страница: идём от курсора назад, page_cursors развернёт порядок
+        query = query.where(before_cursor(*previous)).order_by(Reminder.event_time.desc(), Reminder.id.desc())
+    else:
+        query = query.order_by(Reminder.event_time, Reminder.id)
+    return project(query.limit(limit + 1), fields), limit, fields
+
+def search_query(args, dialect):
+    # (запрос страницы поиска с одной лишней строкой, limit, offset, fields).
+    # Релевантность не годится для курсора, поэтому страницы — по смещению.
+    try:
+        start = datetime_arg(args, 'from')
+        end = datetime_arg(args, 'to')
+        fields = parse_fields(args.get('fields'))
+    except ValueError:
+        raise ValueError("invalid from/to/fields") from None
+    terms = search_terms(args.get('q') or '')
+    if not terms:
+        raise ValueError("q is required")
+    # Поиск всегда в пределах пользователя или чата
+    if int_arg(args, 'user_id') is None and int_arg(args, 'chat_id') is None:
+        raise ValueError("user_id or chat_id is required")
+    limit = min(max(int_arg(args, 'limit', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    offset = max(int_arg(args, 'offset', 0), 0)
+    query, rank = ranked(db.select(Reminder).where(*reminder_filters(args, start, end)), terms, dialect)
+    query = query.order_by(rank, Reminder.id).offset(offset).limit(limit + 1)
+    return project(query, fields), limit, offset, fields
+
+def search_page(reminders, limit, offset):
+    if len(reminders) <= limit:
+        return reminders, {}
+    return reminders[:limit], {'X-Next-Offset': str(offset + limit)}
+
+def list_scope(args):
+    # Версия списка: по владельцу, иначе по чату; без обоих ответ не кэшируется
+    user_id = int_arg(args, 'user_id')
+    if user_id is not None:
+        return 'owner', user_id
+    chat_id = int_arg(args, 'chat_id')
+    return ('chat', chat_id) if chat_id is not None else None
+
+@bp.route('/search', methods=['GET'])
+@conditional(list_scope)
+def search_reminders():
+    try:
+        query, limit, offset, fields = search_query(request.args, db.session.get_bind().dialect.name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    reminders, headers = search_page(db.session.scalars(query).all(), limit, offset)
+    return reminders_json(reminders, fields, headers=headers)
+
+def history_query(args):
+    # Архив пользователя от новых к старым; курсор — id последнего показанного
+    user_id = int_arg(args, 'user_id')
+    if user_id is None:
+        raise ValueError("user_id is required")
+    cursor = args.get('cursor')
+    try:
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        raise ValueError("invalid cursor") from None
+    limit = min(max(int_arg(args, 'limit', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    query = db.select(ReminderArchive).where(ReminderArchive.user_id == user_id)
+    if cursor is not None:
+        query = query.where(ReminderArchive.id < cursor)
+    return query.order_by(ReminderArchive.id.desc()).limit(limit + 1), limit
+
+def history_page(rows, limit):
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers['X-Next-Cursor'] = str(rows[-1].id)
+    return rows, headers
+
+@bp.route('/history', methods=['GET'])
+@conditional(list_scope)
+def get_history():
+    # Сработавшие разовые напоминания, перенесённые в архив (archive.py)
+    try:
+        query, limit = history_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    rows, headers = history_page(db.session.scalars(query).all(), limit)
+    return archived_json(rows, headers=headers)
+
+def page_cursors(reminders, limit, args):
+    # Обрезает лишнюю строку; заголовки с курсорами соседних страниц:
+    # X-Next-Cursor — для ?cursor=, X-Prev-Cursor — для ?before=
+    backward = bool(args.get('before'))
+    more = len(reminders) > limit
+    reminders = reminders[:limit]
+    if backward:
+        reminders.reverse()
+    headers = {}
+    # Раз пришли по курсору с той стороны, страница там точно была
+    has_next = backward or more
+    has_prev = more if backward else bool(args.get('cursor'))
+    if reminders and has_next:
+        headers['X-Next-Cursor'] = encode_cursor(reminders[-1])
+    if reminders and has_prev:
+        headers['X-Prev-Cursor'] = encode_cursor(reminders[0])
+    return reminders, headers
+
+def page_response(query, limit, fields, args):
+    reminders, headers = page_cursors(db.session.scalars(query).all(), limit, args)
+    return reminders_json(reminders, fields, headers=headers)
+
 @bp.route('/', methods=['GET'])
+@conditional(list_scope)
 def get_reminders():
-    reminders = Reminder.query.all()
-    schema = ReminderSchema(many=True)
-    return schema.dump(reminders)
+    try:
+        query, limit, fields = list_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return page_response(query, limit, fields, request.args)
+
+def due_query(args):
+    # Неотправленные напоминания, срабатывающие в [from, to) по UTC, — диапазон по next_fire_at
+    try:
+        start = datetime_arg(args, 'from')
+        end = datetime_arg(args, 'to')
+    except ValueError:
+        raise ValueError("invalid from/to") from None
+    if start is None or end is None:
+        raise ValueError("from and to are required")
+    if end - start > timedelta(days=1):
+        raise ValueError("window must not exceed one day")
+    limit = min(max(int_arg(args, 'limit', MAX_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    after_id = int_arg(args, 'after_id', 0)
+    return (
+        db.select(Reminder)
+        .where(Reminder.id > after_id, fires_between(start, end))
+        .order_by(Reminder.id)
+        .limit(limit)
+        .options(selectinload(Reminder.tags))
+    )
+
+@bp.route('/due', methods=['GET'])
+def get_due_reminders():
+    try:
+        query = due_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return reminders_json(db.session.scalars(query).all())
+
+def fires_between(start, end):
+    # Диапазон по индексу next_fire_at; у доставленных он NULL. start=None — без нижней границы
+    if start is None:
+        return Reminder.next_fire_at < end
+    return and_(Reminder.next_fire_at >= start, Reminder.next_fire_at < end)
+
+def insert_rows(items):
+    # Массовая вставка идёт мимо ORM-событий — next_fire_at считаем сами
+    return [
+        dict({key: value for key, value in data.items() if key != 'tags'},
+             next_fire_at=fire_at(data.get('event_time'), data.get('notification_time'), data.get('repeat_type'), data.get('timezone')))
+        for data in items
+    ]
+
+# Всё, от чего зависит next_fire_at, — для пересчёта мимо ORM
+REFIRE_COLUMNS = (
+    Reminder.id, Reminder.event_time, Reminder.notification_time, Reminder.repeat_type, Reminder.delivered_at, Reminder.timezone,
+)
+
+def refire_rows(rows):
+    # Параметры executemany UPDATE по первичному ключу: перевод в UTC зависит от зоны,
+    # поэтому считаем в Python, а не выражением SQL
+    return [{'id': row.id, 'next_fire_at': next_fire_time(row)} for row in rows]
+
+def retime_statement(user_id, timezone):
+    # Смена зоны пользователя: местные времена его напоминаний остаются прежними,
+    # меняется их момент в UTC — его пересчитываем по pending_query
+    return update(Reminder).where(Reminder.user_id == user_id).values(timezone=timezone)
+
+def pending_query(user_id):
+    return db.select(*REFIRE_COLUMNS, Reminder.chat_id).where(Reminder.user_id == user_id, Reminder.delivered_at.is_(None))
+
+def refire_query(valid):
+    # Массовый UPDATE тоже мимо событий: затронутые времена перечитываем и пересчитываем
+    ids = [reminder_id for reminder_id, data in valid if {'event_time', 'notification_time', 'repeat_type'} & data.keys()]
+    if not ids:
+        return None
+    return db.select(*REFIRE_COLUMNS).where(Reminder.id.in_(ids))
+
+def claim_options(data):
+    # Параметры /claim из тела запроса; ValueError — неверные параметры
+    worker = data.get('worker')
+    if not isinstance(worker, str) or not worker or len(worker) > 64:
+        raise ValueError("worker is required")
+    try:
+        options = {
+            'worker': worker,
+            'start': datetime.fromisoformat(data['from']),
+            'end': datetime.fromisoformat(data['to']),
+            'partition': int(data.get('partition', 0)),
+            'partitions': int(data.get('partitions', 1)),
+            'lease': int(data.get('lease', DEFAULT_LEASE)),
+            'limit': min(max(int(data.get('limit', MAX_PAGE_SIZE)), 1), MAX_PAGE_SIZE),
+        }
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("invalid from/to/partition/lease/limit") from None
+    if options['partitions'] < 1 or not 0 <= options['partition'] < options['partitions'] or options['lease'] < 1:
+        raise ValueError("invalid from/to/partition/lease/limit")
+    if options['end'] - options['start'] > timedelta(days=1):
+        raise ValueError("window must not exceed one day")
+    return options
+
+def claim_query(start, end, now, partition=0, partitions=1, limit=MAX_PAGE_SIZE):
+    # Свободные напоминания окна [start, end): start — не раньше now - catch_up
+    # планировщика, так что давно пропущенные после простоя не рассылаются. Свои доли
+    # чатов узлы делят только среди свободных строк; истёкшую аренду (воркер упал,
+    # не отправив) забирает любой и без нижней границы — её уже брали в окно.
+    free = and_(Reminder.lease_until.is_(None), fires_between(start, end))
+    if partitions > 1:
+        free = and_(free, func.abs(Reminder.chat_id) % partitions == partition)
+    query = (
+        db.select(Reminder.id)
+        .where(or_(free, and_(Reminder.lease_until < now, fires_between(None, end))))
+        .order_by(Reminder.id)
+        .limit(limit)
+        # MariaDB: строки, которые сейчас забирает другой воркер, пропускаем, а не ждём.
+        # SQLite FOR UPDATE не поддерживает — там всё решает условный UPDATE ниже.
+        .with_for_update(skip_locked=True)
+    )
+    return query
+
+def lease_statements(ids, worker, lease_until, now):
+    # Compare-and-set: аренду получает только тот, кто первым обновил свободную
+    # строку; проигравший конкурент увидит, что строки уже не его. DATETIME в MariaDB
+    # хранит целые секунды — с долями сравнение с записанным значением не сошлось бы.
+    lease_until = lease_until.replace(microsecond=0)
+    lease = (
+        update(Reminder)
+        .where(Reminder.id.in_(ids), or_(Reminder.lease_until.is_(None), Reminder.lease_until < now))
+        .values(claimed_by=worker, lease_until=lease_until)
+    )
+    won = db.select(Reminder.id).where(
+        Reminder.id.in_(ids), Reminder.claimed_by == worker, Reminder.lease_until == lease_until,
+    )
+    return lease, won
+
+def claim_candidates(start, end, now, partition=0, partitions=1, limit=MAX_PAGE_SIZE):
+    return list(db.session.scalars(claim_query(start, end, now, partition, partitions, limit)))
+
+def lease_reminders(ids, worker, lease_until, now):
+    if not ids:
+        return []
+    lease, won = lease_statements(ids, worker, lease_until, now)
+    db.session.execute(lease)
+    return list(db.session.scalars(won))
+
+def claimed_query(ids):
+    return db.select(Reminder).where(Reminder.id.in_(ids)).order_by(Reminder.id).options(selectinload(Reminder.tags))
+
+@bp.route('/claim', methods=['POST'])
+def claim_reminders():
+    # Планировщик на нескольких узлах: каждый забирает срабатывания окна [from, to)
+    # своей доли чатов (abs(chat_id) % partitions == partition) в аренду до to + lease
+    # секунд. Отправленное отмечается /delivered, неотправленное после конца аренды
+    # заберёт любой воркер.
+    try:
+        options = claim_options(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    now = utc_now()
+    lease_until = max(options['end'], now) + timedelta(seconds=options['lease'])
+    ids = claim_candidates(
+        options['start'], options['end'], now, options['partition'], options['partitions'], options['limit'],
+    )
+    claimed = lease_reminders(ids, options['worker'], lease_until, now)
+    db.session.commit()
+    if not claimed:
+        return jsonify([])
+    return reminders_json(db.session.scalars(claimed_query(claimed)).all())
 
 @bp.route('/', methods=['POST'])
 def create_reminder():
     data = request.get_json()
     schema = ReminderSchema()
     reminder_data = schema.load(data)
-    reminder = Reminder(**reminder_data)
+    user = db.session.get(User, reminder_data['user_id'])
+    if user is None:
+        return jsonify({"error": "user not found"}), 404
+    tags = reminder_data.pop('tags', None)
+    reminder = Reminder(**reminder_data, timezone=user.timezone)
     db.session.add(reminder)
+    db.session.flush()
+    set_tags(reminder, dict(reminder_data, tags=tags))
     db.session.commit()
     return schema.dump(reminder), 201
 
 @bp.route('/<int:id>', methods=['GET'])
 def get_reminder(id):
-    reminder = Reminder.query.get_or_404(id)
-    schema = ReminderSchema()
+    try:
+        fields = requested_fields()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    reminder = db.first_or_404(project(db.select(Reminder).where(Reminder.id == id), fields))
+    schema = ReminderSchema(only=fields)
     return schema.dump(reminder)
 
 @bp.route('/<int:id>', methods=['PUT'])
@@ -32,19 +433,302 @@ def update_reminder(id):
     data = request.get_json()
     schema = ReminderSchema()
     reminder_data = schema.load(data, partial=True)
+    tags = reminder_data.pop('tags', None)
     for key, value in reminder_data.items():
         setattr(reminder, key, value)
+    if 'tags' in data:
+        db.session.execute(delete(ReminderTag).where(ReminderTag.reminder_id == reminder.id))
+        set_tags(reminder, {'chat_id': reminder.chat_id, 'tags': tags})
+        # Связи с тегами пишутся Core-запросами, мимо слушателей flush
+        touch(db.session, reminder_scopes([reminder.user_id], [reminder.chat_id]))
     db.session.commit()
     return schema.dump(reminder)
 
+def set_tags(reminder, data):
+    # Теги приходят именами; находим или создаём их в чате напоминания
+    pairs = tag_pairs(data)
+    link_tags([(reminder.id, pairs)], resolve_tags(pairs))
+    db.session.expire(reminder, ['tags'])
+
+def advance_reminder(reminder, now):
+    # Переносим повторяющееся напоминание на следующее срабатывание cron, сохраняя
+    # отступ notification_time от event_time. Пропущенные (например, при простое)
+    # срабатывания не догоняем — берём первое после now. Всё в местном времени
+    # владельца: «каждый день в 9:00» остаётся 9:00 и после перевода часов.
+    event_time = reminder.event_time or now
+    offset = event_time - reminder.notification_time if reminder.notification_time else None
+    base = max(event_time, now + offset if offset else now)
+    try:
+        reminder.event_time = next_fire(reminder.repeat_type, base)
+    except ValueError:
+        # Правило больше не срабатывает (сохранено до проверки при записи) — считаем
+        # напоминание доставленным, чтобы его не забирали и не слали снова
+        reminder.delivered_at = utc_now()
+        return
+    if offset is not None:
+        reminder.notification_time = reminder.event_time - offset
+
+def mark_delivered(reminder, worker=None):
+    # Воркер, чья аренда истекла и перешла к другому, отметить доставку уже не может
+    if worker and reminder.claimed_by not in (None, worker):
+        return False
+    reminder.claimed_by = None
+    reminder.lease_until = None
+    if reminder.repeat_type:
+        advance_reminder(reminder, local_now(reminder.timezone))
+    else:
+        reminder.delivered_at = utc_now()
+    return True
+
+@bp.route('/<int:id>/delivered', methods=['POST'])
+def mark_reminder_delivered(id):
+    reminder = Reminder.query.get_or_404(id)
+    if not mark_delivered(reminder, request.args.get('worker')):
+        return jsonify({"error": "lease lost"}), 409
+    db.session.commit()
+    schema = ReminderSchema()
+    return schema.dump(reminder)
+
 @bp.route('/<int:id>', methods=['DELETE'])
 def delete_reminder(id):
     user_id = request.args.get('user_id', type=int)
     if user_id is None:
         return jsonify({"error": "user_id is required"}), 400
+    page = None
+    if request.args.get('return_page') == '1':
+        # Вместо 204 — обновлённая страница списка пользователя с теми же
+        # cursor/before/limit/fields: боту хватает одного запроса на удаление
+        try:
+            page = list_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
     reminder = Reminder.query.get_or_404(id)
     if reminder.user_id != user_id:
         return jsonify({"error": "Вы не владелец этого напоминания"}), 403
     db.session.delete(reminder)
     db.session.commit()
-    return '', 204
\ No newline at end of file
+    if page is not None:
+        return page_response(*page, request.args)
+    return '', 204
+
+def load_bulk(items, partial=False):
+    # Валидируем всю пачку за раз; ошибки — по индексам, остальное идёт в работу
+    schema = ReminderSchema(many=True)
+    try:
+        return schema.load(items, partial=partial), {}
+    except ValidationError as e:
+        errors = {index: messages for index, messages in e.messages.items()}
+        return e.valid_data, errors
+
+def tag_pairs(item):
+    return [(tag.get('chat_id', item['chat_id']), tag['name']) for tag in item.get('tags') or []]
+
+def tag_links(links, resolved):
+    return [
+        {'reminder_id': reminder_id, 'tag_id': resolved[pair]}
+        for reminder_id, pairs in links
+        for pair in dict.fromkeys(pairs)
+    ]
+
+def link_tags(links, resolved):
+    rows = tag_links(links, resolved)
+    if rows:
+        db.session.execute(insert(ReminderTag), rows)
+
+def check_bulk_items(items):
+    if not isinstance(items, list):
+        raise ValueError("expected a JSON array")
+    if len(items) > MAX_BULK_SIZE:
+        raise ValueError(f"at most {MAX_BULK_SIZE} items per request")
+    return items
+
+def bulk_items():
+    try:
+        return check_bulk_items(request.get_json(silent=True)), None
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+def bulk_result(key, done, errors, status=200):
+    if not done and errors:
+        status = 400
+    return {key: done, "errors": {str(index): messages for index, messages in sorted(errors.items())}}, status
+
+def created_scopes(valid):
+    return reminder_scopes({data['user_id'] for data in valid}, {data['chat_id'] for data in valid})
+
+def updated_scopes(valid, current):
+    # Области до и после обновления; current — {id: (user_id, chat_id)}
+    user_ids = {current[reminder_id][0] for reminder_id, _ in valid}
+    chat_ids = {current[reminder_id][1] for reminder_id, _ in valid}
+    return reminder_scopes(
+        user_ids | {data['user_id'] for _, data in valid if 'user_id' in data},
+        chat_ids | {data['chat_id'] for _, data in valid if 'chat_id' in data},
+    )
+
+def bulk_response(key, done, errors, status=200):
+    payload, status = bulk_result(key, done, errors, status)
+    return jsonify(payload), status
+
+@bp.route('/bulk', methods=['POST'])
+def bulk_create_reminders():
+    items, failure = bulk_items()
+    if failure:
+        return failure
+    loaded, errors = load_bulk(items)
+    candidates = [(index, data) for index, data in enumerate(loaded) if index not in errors]
+
+    user_ids = {data['user_id'] for _, data in candidates}
+    existing = dict(db.session.execute(db.select(User.id, User.timezone).where(User.id.in_(user_ids))).all()) if user_ids else {}
+    valid = []
+    for index, data in candidates:
+        if data['user_id'] in existing:
+            valid.append(dict(data, timezone=existing[data['user_id']]))
+        else:
+            errors[index] = {"user_id": ["user not found"]}
+    if not valid:
+        return bulk_response("created", [], errors, 201)
+
+    # Одна транзакция: executemany по напоминаниям, затем по связям с тегами
+    rows = insert_rows(valid)
+    ids = list(db.session.scalars(insert(Reminder).returning(Reminder.id, sort_by_parameter_order=True), rows))
+    resolved = resolve_tags(pair for data in valid for pair in tag_pairs(data))
+    link_tags(((reminder_id, tag_pairs(data)) for reminder_id, data in zip(ids, valid)), resolved)
+    touch(db.session, created_scopes(valid))
+    db.session.commit()
+
+    reminders = db.session.scalars(
+        db.select(Reminder).where(Reminder.id.in_(ids)).order_by(Reminder.id).options(selectinload(Reminder.tags))
+    ).all()
+    return bulk_response("created", ReminderSchema(many=True).dump(reminders), errors, 201)
+
+def update_candidates(items):
+    # [(index, id, data)] и ошибки по индексам; id — dump_only в схеме, поэтому
+    # валидируем без него
+    loaded, errors = load_bulk(
+        [{key: value for key, value in item.items() if key != 'id'} if isinstance(item, dict) else item for item in items],
+        partial=True,
+    )
+    candidates = []
+    for index, (item, data) in enumerate(zip(items, loaded)):
+        if index in errors:
+            continue
+        reminder_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(reminder_id, int):
+            errors[index] = {"id": ["Missing data for required field."]}
+            continue
+        candidates.append((index, reminder_id, data))
+    return candidates, errors
+
+def owned_updates(candidates, current, user_id, errors):
+    # [(id, data)] напоминаний пользователя; current — {id: (user_id, chat_id)}.
+    # Передать напоминание другому пользователю пачкой нельзя: его существование
+    # и зону пришлось бы проверять для каждого элемента
+    valid = []
+    for index, reminder_id, data in candidates:
+        if reminder_id not in current:
+            errors[index] = {"id": ["reminder not found"]}
+        elif current[reminder_id][0] != user_id:
+            errors[index] = {"id": ["Вы не владелец этого напоминания"]}
+        elif data.get('user_id', user_id) != user_id:
+            errors[index] = {"user_id": ["user_id cannot be changed in bulk update"]}
+        else:
+            valid.append((reminder_id, data))
+    return valid
+
+@bp.route('/bulk', methods=['PUT'])
+def bulk_update_reminders():
+    user_id = request.args.get('user_id', type=int)
+    if user_id is None:
+        return jsonify({"error": "user_id is required"}), 400
+    items, failure = bulk_items()
+    if failure:
+        return failure
+    candidates, errors = update_candidates(items)
+
+    ids = [reminder_id for _, reminder_id, _ in candidates]
+    current = {
+        reminder_id: (user_id, chat_id)
+        for reminder_id, user_id, chat_id in db.session.execute(
+            db.select(Reminder.id, Reminder.user_id, Reminder.chat_id).where(Reminder.id.in_(ids))
+        )
+    } if ids else {}
+    valid = owned_updates(candidates, current, user_id, errors)
+    if not valid:
+        return bulk_response("updated", [], errors)
+
+    rows = [
+        dict({key: value for key, value in data.items() if key != 'tags'}, id=reminder_id)
+        for reminder_id, data in valid
+    ]
+    if any(len(row) > 1 for row in rows):
+        db.session.execute(update(Reminder), [row for row in rows if len(row) > 1])
+    refire = refire_query(valid)
+    if refire is not None:
+        db.session.execute(update(Reminder), refire_rows(db.session.execute(refire)))
+    retagged = [(reminder_id, data) for reminder_id, data in valid if 'tags' in data]
+    if retagged:
+        db.session.execute(delete(ReminderTag).where(ReminderTag.reminder_id.in_([rid for rid, _ in retagged])))
+        pairs = {
+            reminder_id: tag_pairs(dict(data, chat_id=data.get('chat_id', current[reminder_id][1])))
+            for reminder_id, data in retagged
+        }
+        resolved = resolve_tags(pair for reminder_pairs in pairs.values() for pair in reminder_pairs)
+        link_tags(pairs.items(), resolved)
+    touch(db.session, updated_scopes(valid, current))
+    db.session.commit()
+
+    updated_ids = [reminder_id for reminder_id, _ in valid]
+    reminders = db.session.scalars(
+        db.select(Reminder).where(Reminder.id.in_(updated_ids)).order_by(Reminder.id)
+        .options(selectinload(Reminder.tags))
+        .execution_options(populate_existing=True)
+    ).all()
+    return bulk_response("updated", ReminderSchema(many=True).dump(reminders), errors)
+
+def owned_ids(ids, owners, user_id):
+    errors = {}
+    for index, reminder_id in enumerate(ids):
+        if not isinstance(reminder_id, int) or reminder_id not in owners:
+            errors[index] = {"id": ["reminder not found"]}
+        elif owners[reminder_id] != user_id:
+            errors[index] = {"id": ["Вы не владелец этого напоминания"]}
+    return [reminder_id for index, reminder_id in enumerate(ids) if index not in errors], errors
+
+def delete_all_statements(user_id):
+    # Все напоминания пользователя без списка id: связи с тегами — подзапросом,
+    # сами напоминания отдают id и чаты через RETURNING
+    return (
+        delete(ReminderTag).where(ReminderTag.reminder_id.in_(db.select(Reminder.id).where(Reminder.user_id == user_id))),
+        delete(Reminder).where(Reminder.user_id == user_id).returning(Reminder.id, Reminder.chat_id),
+    )
+
+@bp.route('/bulk', methods=['DELETE'])
+def bulk_delete_reminders():
+    # {"ids": [...]} удаляет перечисленные, без ids — все напоминания пользователя
+    user_id = request.args.get('user_id', type=int)
+    if user_id is None:
+        return jsonify({"error": "user_id is required"}), 400
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    errors = {}
+    if ids is None:
+        unlink, remove = delete_all_statements(user_id)
+        db.session.execute(unlink)
+        chats = dict(db.session.execute(remove).all())
+        ids = sorted(chats)
+        touch(db.session, reminder_scopes([user_id], set(chats.values())))
+        db.session.commit()
+        return bulk_response("deleted", ids, errors)
+    if not isinstance(ids, list) or len(ids) > MAX_BULK_SIZE:
+        return jsonify({"error": f"ids must be an array of at most {MAX_BULK_SIZE} items"}), 400
+    rows = db.session.execute(
+        db.select(Reminder.id, Reminder.user_id, Reminder.chat_id).where(Reminder.id.in_([i for i in ids if isinstance(i, int)]))
+    ).all()
+    chats = {reminder_id: chat_id for reminder_id, _, chat_id in rows}
+    ids, errors = owned_ids(ids, {reminder_id: owner for reminder_id, owner, _ in rows}, user_id)
+    if ids:
+        db.session.execute(delete(ReminderTag).where(ReminderTag.reminder_id.in_(ids)))
+        db.session.execute(delete(Reminder).where(Reminder.id.in_(ids)))
+        touch(db.session, reminder_scopes([user_id], {chats[reminder_id] for reminder_id in ids}))
+        db.session.commit()
+    return bulk_response("deleted", ids, errors)
@@ -1,9 +1,71 @@
 from flask import Blueprint, request, jsonify
-from models import db, Tag
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.exc import IntegrityError
+from models import db, Tag, ReminderTag
 from schemas import TagSchema
+from routes.args import int_arg
+from versions import conditional
 
 bp = Blueprint('tags_bp', __name__, url_prefix='/tags')
 
+def tag_lookup(pairs):
+    return db.select(Tag.chat_id, Tag.name, Tag.id).where(tuple_(Tag.chat_id, Tag.name).in_(pairs))
+
+def resolve_tags(pairs):
+    # {(chat_id, name): tag_id} для набора тегов: существующие одним запросом,
+    # недостающие одной пачкой INSERT
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    query = tag_lookup(pairs)
+    resolved = {(chat_id, name): tag_id for chat_id, name, tag_id in db.session.execute(query)}
+    missing = [{'chat_id': chat_id, 'name': name} for chat_id, name in pairs - resolved.keys()]
+    if missing:
+        # Параллельный запрос мог успеть создать те же теги — тогда уникальный
+        # индекс (chat_id, name) откатит savepoint, и мы просто перечитаем их
+        try:
+            with db.session.begin_nested():
+                rows = db.session.execute(insert(Tag).returning(Tag.chat_id, Tag.name, Tag.id), missing).all()
+            resolved.update({(chat_id, name): tag_id for chat_id, name, tag_id in rows})
+        except IntegrityError:
+            resolved = {(chat_id, name): tag_id for chat_id, name, tag_id in db.session.execute(query)}
+    return resolved
+
+def chat_scope(args):
+    chat_id = int_arg(args, 'chat_id')
+    return ('chat', chat_id) if chat_id is not None else None
+
+@bp.route('/', methods=['GET'])
+@conditional(chat_scope)
+def get_tags():
+    # Теги чата с числом напоминаний; ?q= — поиск по началу имени (идёт по
+    # индексу (chat_id, name))
+    try:
+        query = tags_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify([row._asdict() for row in db.session.execute(query)])
+
+def tags_query(args):
+    chat_id = int_arg(args, 'chat_id')
+    if chat_id is None:
+        raise ValueError("chat_id is required")
+    limit = min(max(int_arg(args, 'limit', 50), 1), 200)
+    count = func.count(ReminderTag.reminder_id)
+    query = (
+        db.select(Tag.id, Tag.name, Tag.chat_id, count.label('reminders_count'))
+        .outerjoin(ReminderTag, ReminderTag.tag_id == Tag.id)
+        .where(Tag.chat_id == chat_id)
+        .group_by(Tag.id, Tag.name, Tag.chat_id)
+        .order_by(count.desc(), Tag.name)
+        .limit(limit)
+    )
+    q = (args.get('q') or '').strip()
+    if q:
+        pattern = q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.where(Tag.name.like(pattern, escape='\\'))
+    return query
+
 @bp.route('/', methods=['POST'])
 def create_tag():
     data = request.get_json()
@@ -11,7 +73,11 @@ def create_tag():
     tag_data = schema.load(data)
     tag = Tag(**tag_data)
     db.session.add(tag)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "tag already exists"}), 409
     return schema.dump(tag), 201
 
 @bp.route('/<int:id>', methods=['GET'])
@@ -28,7 +94,11 @@ def update_tag(id):
     tag_data = schema.load(data, partial=True)
     for key, value in tag_data.items():
         setattr(tag, key, value)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "tag already exists"}), 409
     return schema.dump(tag)
 
 @bp.route('/<int:id>', methods=['DELETE'])
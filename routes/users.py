@@ -1,14 +1,17 @@
 from flask import Blueprint, request, jsonify
-from models import db, User
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from models import db, Reminder, User
 from schemas import UserSchema
+from serializers import users_json
+from routes.reminders import pending_query, refire_rows, retime_statement
+from versions import conditional, reminder_scopes, touch
 
 bp = Blueprint('users_bp', __name__, url_prefix='/users')
 
 @bp.route('/', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    schema = UserSchema(many=True)
-    return schema.dump(users)
+    return users_json(User.query.all())
 
 @bp.route('/', methods=['POST'])
 def create_user():
@@ -17,10 +20,44 @@ def create_user():
     user_data = schema.load(data)
     user = User(**user_data)
     db.session.add(user)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "user with this telegram_id already exists"}), 409
     return schema.dump(user), 201
 
+@bp.route('/telegram/<int:telegram_id>', methods=['GET'])
+@conditional(lambda args, telegram_id: ('telegram', telegram_id))
+def get_user_by_telegram_id(telegram_id):
+    user = User.query.filter_by(telegram_id=telegram_id).first_or_404()
+    schema = UserSchema()
+    return schema.dump(user)
+
+@bp.route('/telegram/<int:telegram_id>', methods=['PUT'])
+def get_or_create_user_by_telegram_id(telegram_id):
+    data = request.get_json(silent=True) or {}
+    schema = UserSchema()
+    user_data = schema.load(data, partial=True)
+    username = user_data.get('username')
+    user = User.query.filter_by(telegram_id=telegram_id).first()
+    if user is None:
+        # Гонку двух одновременных /start разрешает уникальный индекс по telegram_id
+        user = User(telegram_id=telegram_id, username=username)
+        db.session.add(user)
+        try:
+            db.session.commit()
+            return schema.dump(user), 201
+        except IntegrityError:
+            db.session.rollback()
+            user = User.query.filter_by(telegram_id=telegram_id).one()
+    if username is not None and user.username != username:
+        user.username = username
+        db.session.commit()
+    return schema.dump(user)
+
 @bp.route('/<int:id>', methods=['GET'])
+@conditional(lambda args, id: ('user', id))
 def get_user(id):
     user = User.query.get_or_404(id)
     schema = UserSchema()
@@ -34,9 +71,18 @@ def update_user(id):
     user_data = schema.load(data, partial=True)
     for key, value in user_data.items():
         setattr(user, key, value)
+    if 'timezone' in user_data:
+        retime_reminders(user)
     db.session.commit()
     return schema.dump(user)
 
+def retime_reminders(user):
+    db.session.execute(retime_statement(user.id, user.timezone))
+    rows = db.session.execute(pending_query(user.id)).all()
+    if rows:
+        db.session.execute(update(Reminder), refire_rows(rows))
+    touch(db.session, reminder_scopes([user.id], {row.chat_id for row in rows}))
+
 @bp.route('/<int:id>', methods=['DELETE'])
 def delete_user(id):
     user = User.query.get_or_404(id)
@@ -0,0 +1,233 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from zones import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+# Поля, которых хватает, чтобы сверить и отправить напоминание
+CONFIRM_FIELDS = "id,chat_id,title,description,next_fire_at"
+
+
+def fire_time(reminder):
+    # Момент отправки в UTC: next_fire_at из API (None — больше не сработает),
+    # у старых ответов без него — notification_time или event_time
+    if "next_fire_at" in reminder:
+        value = reminder["next_fire_at"]
+    else:
+        value = reminder.get("notification_time") or reminder.get("event_time")
+    return datetime.fromisoformat(value) if value else None
+
+
+def format_reminder(reminder):
+    text = f"⏰ Напоминание: {reminder['title']}"
+    if reminder.get("description"):
+        text += f"\n{reminder['description']}"
+    return text
+
+
+class ApiReminderSource:
+    # Источник напоминаний поверх REST API. Срабатывания окна забираются в аренду
+    # (/reminders/claim), поэтому несколько узлов с планировщиком не отправят одно
+    # напоминание дважды; partition/partitions делят чаты между узлами.
+
+    def __init__(self, api, page_size=200, worker=None, partition=0, partitions=1, lease=60):
+        self.api = api
+        self.page_size = page_size
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+        self.partition = partition
+        self.partitions = partitions
+        self.lease = lease
+
+    async def fetch_due(self, start, end):
+        # Забранные строки в следующую выборку не попадают, так что курсор не нужен
+        while True:
+            body = {
+                "worker": self.worker,
+                "from": start.isoformat(),
+                "to": end.isoformat(),
+                "partition": self.partition,
+                "partitions": self.partitions,
+                "lease": self.lease,
+                "limit": self.page_size,
+            }
+            resp = await self.api.post("/reminders/claim", json=body)
+            if resp.status != 200:
+                raise RuntimeError(f"POST /reminders/claim: HTTP {resp.status}")
+            page = resp.data
+            for reminder in page:
+                yield reminder
+            if len(page) < self.page_size:
+                return
+
+    async def fetch(self, reminder_id):
+        # Текущее состояние напоминания; None — его удалили
+        resp = await self.api.get(f"/reminders/{reminder_id}", params={"fields": CONFIRM_FIELDS})
+        if resp.status == 404:
+            return None
+        if resp.status != 200:
+            raise RuntimeError(f"GET /reminders/{reminder_id}: HTTP {resp.status}")
+        return resp.data
+
+    async def mark_delivered(self, reminder_id):
+        resp = await self.api.post(f"/reminders/{reminder_id}/delivered", params={"worker": self.worker})
+        if resp.status != 200:
+            raise RuntimeError(f"POST /reminders/{reminder_id}/delivered: HTTP {resp.status}")
+        return resp.data
+
+
+class ReminderScheduler:
+    # В памяти держим только окно ближайших срабатываний (min-heap по времени),
+    # окно сдвигается вперёд инкрементально, а цикл спит ровно до ближайшего момента.
+    # Раз в poll окно перечитывается целиком: напоминание, созданное в уже загруженной
+    # его части через REST, пачкой или другим процессом, иначе бы не сработало.
+    # Часы — UTC, как и next_fire_at: пояса пользователей учтены уже в нём.
+
+    def __init__(self, source, send, window=timedelta(minutes=5), catch_up=timedelta(minutes=10),
+                 poll=timedelta(seconds=30), clock=utc_now):
+        self.source = source
+        self.send = send
+        self.window = window
+        self.catch_up = catch_up
+        self.poll = poll
+        self.clock = clock
+        self.delivered = 0
+        self.last_lag = 0.0
+        self._heap = []
+        self._queued = set()
+        self._loaded_until = None
+        self._polled_at = None
+        self._refresh = False
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._sending = set()
+
+    @property
+    def depth(self):
+        return len(self._heap)
+
+    @property
+    def lag(self):
+        # Насколько отстаёт доставка: просрочка самого раннего элемента в очереди,
+        # а при пустой очереди — задержка последней отправки
+        if self._heap:
+            overdue = (self.clock() - self._heap[0][0]).total_seconds()
+            if overdue > 0:
+                return overdue
+        return self.last_lag
+
+    def stats(self):
+        return {"depth": self.depth, "lag": self.lag, "delivered": self.delivered}
+
+    def add(self, reminder):
+        # Напоминание создано уже после загрузки текущего окна. Сами в очередь его не
+        # кладём — его может забрать другой узел; просим перечитать окно, не дожидаясь poll.
+        when = fire_time(reminder)
+        if when is None or reminder["id"] in self._queued:
+            return
+        if self._loaded_until is None or when >= self._loaded_until:
+            return
+        self._refresh = True
+        self._wakeup.set()
+
+    async def start(self):
+        self._loaded_until = self.clock() - self.catch_up
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in self._sending:
+            task.cancel()
+        await asyncio.gather(*self._sending, return_exceptions=True)
+
+    async def refill(self, now):
+        # Вместе с новым хвостом окна перечитываем и уже загруженную часть;
+        # то, что уже стоит в очереди, _load пропускает
+        self._refresh = False
+        self._polled_at = now
+        end = max(now + self.window, self._loaded_until)
+        await self._load(now - self.catch_up, end)
+        self._loaded_until = end
+
+    async def _load(self, start, end):
+        async for reminder in self.source.fetch_due(start, end):
+            when = fire_time(reminder)
+            if when is not None and reminder["id"] not in self._queued:
+                self._push(when, reminder)
+
+    def _push(self, when, reminder):
+        heapq.heappush(self._heap, (when, reminder["id"], reminder))
+        self._queued.add(reminder["id"])
+
+    async def deliver(self, when, reminder):
+        # Из _queued убираем только после отправки, чтобы перечитанное окно не
+        # поставило то же напоминание в очередь второй раз
+        moved = None
+        try:
+            # Окно загружено заранее: напоминание могли удалить или перенести —
+            # сверяемся с API перед отправкой
+            latest = await self.source.fetch(reminder["id"])
+            if latest is None or fire_time(latest) != when:
+                moved = latest
+                return
+            # due — плановое время: по нему очередь отправки упорядочивает сообщения
+            # и считает задержку
+            await self.send(latest["chat_id"], format_reminder(latest), due=when)
+            updated = await self.source.mark_delivered(reminder["id"])
+        except Exception:
+            logger.exception("Не удалось доставить напоминание %s", reminder["id"])
+            return
+        finally:
+            self._queued.discard(reminder["id"])
+            # Перенесённое в пределах окна ставим заново — аренда всё ещё наша;
+            # перенесённое дальше заберут после её конца
+            next_time = fire_time(moved) if moved is not None else None
+            if next_time is not None and next_time < self._loaded_until:
+                self._push(next_time, moved)
+        self.delivered += 1
+        self.last_lag = max((self.clock() - when).total_seconds(), 0.0)
+        # Повторяющееся напоминание API переносит на следующее срабатывание
+        next_time = fire_time(updated) if updated else None
+        if next_time is not None and next_time > when:
+            self.add(updated)
+
+    async def run_once(self):
+        now = self.clock()
+        # Догружаем окно, когда до его конца осталось меньше половины, по add()
+        # и раз в poll
+        next_poll = now if self._polled_at is None else self._polled_at + self.poll
+        if self._refresh or self._loaded_until - now < self.window / 2 or now >= next_poll:
+            await self.refill(now)
+        # Отправки идут параллельно: send может ждать лимитов Telegram конкретного
+        # чата, и это не должно задерживать остальные напоминания
+        while self._heap and self._heap[0][0] <= now:
+            when, _, reminder = heapq.heappop(self._heap)
+            task = asyncio.create_task(self.deliver(when, reminder))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+        next_refill = min(self._loaded_until - self.window / 2, self._polled_at + self.poll)
+        wake_at = min(self._heap[0][0], next_refill) if self._heap else next_refill
+        return max((wake_at - self.clock()).total_seconds(), 0.0)
+
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                timeout = await self.run_once()
+            except Exception:
+                logger.exception("Ошибка цикла планировщика")
+                timeout = 5.0
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
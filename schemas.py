@@ -1,10 +1,21 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, ValidationError
 from models import User, Reminder, Tag
+from cron import is_valid_cron
+from zones import is_valid_timezone
+
+def validate_cron(value):
+    if value is not None and not is_valid_cron(value):
+        raise ValidationError("repeat_type must be a valid cron expression")
+
+def validate_timezone(value):
+    if value is not None and not is_valid_timezone(value):
+        raise ValidationError("timezone must be an IANA time zone name, e.g. Europe/Moscow")
 
 class UserSchema(Schema):
     id = fields.Int(dump_only=True)
     telegram_id = fields.Int(required=True)
     username = fields.Str()
+    timezone = fields.Str(allow_none=True, validate=validate_timezone)
     created_at = fields.DateTime(dump_only=True)
 
 class TagSchema(Schema):
@@ -12,6 +23,36 @@ class TagSchema(Schema):
     name = fields.Str(required=True)
     chat_id = fields.Int(required=True)
 
+class TagRef(fields.Field):
+    # На вход — имя тега строкой (как их отдаёт GPT) или объект {"name", "chat_id"};
+    # на выход — тот же объект, что и TagSchema
+    def _serialize(self, value, attr, obj, **kwargs):
+        return TagSchema().dump(value)
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        if isinstance(value, str):
+            value = {"name": value}
+        if not isinstance(value, dict):
+            raise ValidationError("tag must be a name or an object")
+        tag = TagSchema(partial=("chat_id",)).load(value)
+        tag["name"] = tag["name"].strip()
+        if not tag["name"] or len(tag["name"]) > 255:
+            raise ValidationError("tag name must be 1-255 characters")
+        return tag
+
+class ArchivedReminderSchema(Schema):
+    id = fields.Int()
+    reminder_id = fields.Int()
+    user_id = fields.Int()
+    chat_id = fields.Int()
+    title = fields.Str()
+    description = fields.Str(allow_none=True)
+    event_time = fields.DateTime()
+    notification_time = fields.DateTime(allow_none=True)
+    delivered_at = fields.DateTime(allow_none=True)
+    archived_at = fields.DateTime()
+    tags = fields.List(fields.Dict())
+
 class ReminderSchema(Schema):
     id = fields.Int(dump_only=True)
     user_id = fields.Int(required=True)
@@ -19,7 +60,8 @@ class ReminderSchema(Schema):
     title = fields.Str(required=True)
     description = fields.Str(allow_none=True)
     event_time = fields.DateTime()
-    repeat_type = fields.Str(allow_none=True)
+    repeat_type = fields.Str(allow_none=True, validate=validate_cron)
     notification_time = fields.DateTime(allow_none=True)
+    next_fire_at = fields.DateTime(dump_only=True)
     created_at = fields.DateTime(dump_only=True)
-    tags = fields.Nested(TagSchema, many=True, allow_none=True)
\ No newline at end of file
+    tags = fields.List(TagRef(), allow_none=True)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import re
+from sqlalchemy import and_, column, event, func, inspect, literal_column, or_, table, text
+from sqlalchemy.dialects.mysql import match
+from models import Reminder
+
+# Полнотекстовый поиск по title/description. MariaDB — FULLTEXT-индекс на самой
+# таблице; SQLite — внешняя FTS5-таблица, которую триггеры держат в синхроне
+# с Reminder. Индекс создаётся вместе с таблицей, для уже существующей базы —
+# командой flask create-search-index.
+
+FULLTEXT_INDEX = 'ix_reminder_fulltext'
+FTS_TABLE = 'reminder_fts'
+MAX_TERMS = 8
+# InnoDB не индексирует слова короче innodb_ft_min_token_size (3 по умолчанию)
+MIN_FULLTEXT_TERM = 3
+
+fts = table(FTS_TABLE, column('rowid'))
+
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, description, content='Reminder', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON Reminder BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON Reminder BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON Reminder BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+
+def is_mysql(dialect):
+    return dialect in ('mysql', 'mariadb')
+
+
+def create_search_index(connection):
+    # True, если индекс пришлось создать
+    dialect = connection.dialect.name
+    if is_mysql(dialect):
+        if any(index['name'] == FULLTEXT_INDEX for index in inspect(connection).get_indexes(Reminder.__tablename__)):
+            return False
+        connection.execute(text(f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON {Reminder.__tablename__} (title, description)"))
+        return True
+    if dialect == 'sqlite':
+        if inspect(connection).has_table(FTS_TABLE):
+            return False
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        # Строки, появившиеся до индекса
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        return True
+    return False
+
+
+@event.listens_for(Reminder.__table__, 'after_create')
+def create_index_with_table(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(Reminder.__table__, 'before_drop')
+def drop_fts_table(target, connection, **kw):
+    # Триггеры SQLite уходят вместе с Reminder, FTS-таблица — нет
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def search_terms(q):
+    return re.findall(r'\w+', q.lower())[:MAX_TERMS]
+
+
+def ranked(query, terms, dialect):
+    # (запрос с условием поиска, выражение ORDER BY — самые релевантные первыми).
+    # Все слова обязательны, каждое ищется и как префикс: «стомат» найдёт «стоматолог».
+    if is_mysql(dialect):
+        words = [term for term in terms if len(term) >= MIN_FULLTEXT_TERM] or terms
+        score = match(Reminder.title, Reminder.description, against=' '.join(f'+{word}*' for word in words))
+        score = score.in_boolean_mode()
+        return query.where(score > 0), score.desc()
+    if dialect == 'sqlite':
+        document = literal_column(FTS_TABLE)
+        query = (
+            query.join(fts, fts.c.rowid == Reminder.id)
+            .where(document.op('MATCH')(' '.join(f'"{term}"*' for term in terms)))
+        )
+        # bm25 в SQLite тем меньше, чем документ релевантнее
+        return query, func.bm25(document)
+    # Базы без полнотекстового индекса: подстрока, без ранжирования
+    return query.where(and_(*(
+        or_(Reminder.title.ilike(f'%{term}%'), Reminder.description.ilike(f'%{term}%')) for term in terms
+    ))), Reminder.id.desc()
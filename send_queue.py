@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from ratelimit import TokenBucket
+from zones import utc_now
+
+logger = logging.getLogger(__name__)
+
+# Меньше — важнее
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REMINDER = 1
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class SendQueue:
+    # Исходящие сообщения с учётом лимитов Telegram: общий token bucket на бота
+    # (~30 сообщений в секунду) и свой bucket на каждый чат (1 в секунду, в группах
+    # 20 в минуту). Очередь упорядочена по (приоритет, срок). Сообщение в чат, который
+    # сейчас упёрся в лимит или получил RetryAfter, откладывается, а остальные чаты
+    # продолжают отправляться.
+
+    def __init__(self, send, rate=30.0, chat_rate=1.0, group_rate=20 / 60, max_chats=10000,
+                 max_retries=5, clock=time.monotonic, now=utc_now, lag_window=1000):
+        self.send = send
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_chats = max_chats
+        self.max_retries = max_retries
+        self.clock = clock
+        self.now = now
+        self.bucket = TokenBucket(rate, clock=clock)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self._lags = deque(maxlen=lag_window)
+        self._heap = []
+        self._deferred = []
+        self._seq = itertools.count()
+        self._chats = OrderedDict()
+        self._paused = {}
+        self._inflight = set()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def depth(self):
+        return len(self._heap) + len(self._deferred)
+
+    def stats(self):
+        lags = list(self._lags)
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "lag_p50": percentile(lags, 0.50),
+            "lag_p95": percentile(lags, 0.95),
+            "lag_p99": percentile(lags, 0.99),
+            "lag_max": max(lags, default=0.0),
+        }
+
+    async def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._inflight, return_exceptions=True)
+            self._task = None
+        for entry in self._heap + [entry for _, _, entry in self._deferred]:
+            if not entry[-1].done():
+                entry[-1].cancel()
+        self._heap.clear()
+        self._deferred.clear()
+
+    def submit(self, chat_id, text, priority=PRIORITY_REMINDER, due=None, **kwargs):
+        # Future с результатом send; due — когда сообщение должно было уйти (для
+        # порядка и подсчёта задержки)
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, due or self.now(), next(self._seq), chat_id, text, kwargs, [0], future)
+        heapq.heappush(self._heap, entry)
+        self._wakeup.set()
+        return future
+
+    async def send_message(self, chat_id, text, **kwargs):
+        # Совместимо с bot.send_message — можно подставить вместо него
+        return await self.submit(chat_id, text, **kwargs)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательные id — группы и каналы, у них лимит строже
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, capacity=1, clock=self.clock)
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    def _chat_wait(self, chat_id):
+        paused = self._paused.get(chat_id)
+        if paused is not None:
+            wait = paused - self.clock()
+            if wait > 0:
+                return wait
+            del self._paused[chat_id]
+        return self._chat_bucket(chat_id).try_acquire()
+
+    def _defer(self, entry, wait):
+        heapq.heappush(self._deferred, (self.clock() + wait, entry[2], entry))
+
+    def _promote(self):
+        now = self.clock()
+        while self._deferred and self._deferred[0][0] <= now:
+            heapq.heappush(self._heap, heapq.heappop(self._deferred)[2])
+
+    async def run(self):
+        while True:
+            self._promote()
+            if not self._heap:
+                timeout = self._deferred[0][0] - self.clock() if self._deferred else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            entry = heapq.heappop(self._heap)
+            if entry[-1].done():
+                continue
+            wait = self._chat_wait(entry[3])
+            if wait:
+                self._defer(entry, wait)
+                continue
+            # Общий лимит касается всех чатов, тут ждать можно
+            await self.bucket.acquire()
+            task = asyncio.create_task(self._send(entry))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, entry):
+        _, due, _, chat_id, text, kwargs, attempts, future = entry
+        try:
+            result = await self.send(chat_id, text, **kwargs)
+        except TelegramRetryAfter as e:
+            attempts[0] += 1
+            if attempts[0] > self.max_retries:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # Ставим на паузу только этот чат и возвращаем сообщение в очередь
+            self.retried += 1
+            self._paused[chat_id] = self.clock() + e.retry_after
+            self._defer(entry, e.retry_after)
+            self._wakeup.set()
+            logger.warning("Telegram RetryAfter %s с для чата %s", e.retry_after, chat_id)
+            return
+        except Exception as e:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(e)
+            return
+        self.sent += 1
+        self._lags.append(max((self.now() - due).total_seconds(), 0.0))
+        if not future.done():
+            future.set_result(result)
@@ -0,0 +1,115 @@
+import json
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter, itemgetter
+from flask import current_app, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from marshmallow import fields
+from schemas import ArchivedReminderSchema, ReminderSchema, TagRef, TagSchema, UserSchema
+
+# Сериализация списков в JSON за один проход, без marshmallow dump на каждый объект.
+# План (ключ, как достать значение, как закодировать) строится один раз из полей
+# схемы — контракт по-прежнему задаёт schemas.py. Результат побайтно совпадает с
+# jsonify(schema.dump(...)): ключи по алфавиту, не-ASCII экранируется, компактные
+# разделители, перевод строки в конце.
+
+def datetime_encoder(field):
+    if (field.format or field.DEFAULT_FORMAT) in ('iso', 'iso8601'):
+        return lambda value: '"' + value.isoformat() + '"'
+    return fallback_encoder(field)
+
+
+def fallback_encoder(field):
+    return lambda value: json.dumps(field._serialize(value, None, None), sort_keys=True, separators=(',', ':'))
+
+
+class Serializer:
+    # columns — порядок значений в кортеже; без него значения берутся атрибутами
+    # (ORM-объекты и строки Row с одноимёнными колонками)
+
+    def __init__(self, schema_class, only=None, columns=None):
+        self.schema = schema_class(only=only)
+        self.plan = []
+        for key, field in sorted((field.data_key or name, field) for name, field in self.schema.dump_fields.items()):
+            attribute = field.attribute or field.name
+            getter = itemgetter(columns.index(attribute)) if columns is not None else attrgetter(attribute)
+            self.plan.append((encode_basestring_ascii(key) + ':', getter, self.encoder(field)))
+
+    def encoder(self, field):
+        # Типовые поля кодируем сами; остальные — через _serialize поля marshmallow
+        if type(field) is fields.Integer and not field.as_string:
+            return lambda value: str(int(value))
+        if type(field) is fields.String:
+            return lambda value: encode_basestring_ascii(str(value))
+        if type(field) is fields.DateTime:
+            return datetime_encoder(field)
+        if type(field) is fields.List and type(field.inner) is TagRef:
+            tags = serializer(TagSchema)
+            return lambda value: '[' + ','.join(map(tags.dumps, value)) + ']'
+        return fallback_encoder(field)
+
+    def dumps(self, obj):
+        parts = []
+        for prefix, getter, encode in self.plan:
+            value = getter(obj)
+            parts.append(prefix + ('null' if value is None else encode(value)))
+        return '{' + ','.join(parts) + '}'
+
+    def dumps_many(self, objects):
+        return '[' + ','.join(map(self.dumps, objects)) + ']'
+
+    def iter_many(self, objects, chunk_size=100):
+        # Тот же массив кусками — для потоковой (chunked) отдачи больших списков
+        yield '['
+        for start in range(0, len(objects), chunk_size):
+            chunk = ','.join(map(self.dumps, objects[start:start + chunk_size]))
+            yield chunk if start == 0 else ',' + chunk
+        yield ']\n'
+
+
+@lru_cache(maxsize=256)
+def cached_serializer(schema_class, only):
+    return Serializer(schema_class, only)
+
+
+def serializer(schema_class, only=None):
+    return cached_serializer(schema_class, tuple(only) if only is not None else None)
+
+
+def fast_path():
+    # Свой формат только при настройках JSON по умолчанию; иначе (debug с отступами,
+    # свой провайдер) — обычный jsonify, чтобы вывод не разошёлся
+    provider = current_app.json
+    if type(provider) is not DefaultJSONProvider or not provider.sort_keys or not provider.ensure_ascii:
+        return False
+    return provider.compact is True or (provider.compact is None and not current_app.debug)
+
+
+def json_list(schema_class, objects, only=None, status=200, headers=None):
+    if not fast_path():
+        response = jsonify(schema_class(many=True, only=only).dump(objects))
+    else:
+        dumper = serializer(schema_class, only)
+        objects = list(objects)
+        threshold = current_app.config.get('JSON_STREAM_THRESHOLD')
+        if threshold and len(objects) > threshold:
+            body = stream_with_context(dumper.iter_many(objects))
+        else:
+            body = dumper.dumps_many(objects) + '\n'
+        response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.status_code = status
+    if headers:
+        response.headers.update(headers)
+    return response
+
+
+def reminders_json(reminders, only=None, **kwargs):
+    return json_list(ReminderSchema, reminders, only, **kwargs)
+
+
+def users_json(users, **kwargs):
+    return json_list(UserSchema, users, **kwargs)
+
+
+def archived_json(reminders, **kwargs):
+    return json_list(ArchivedReminderSchema, reminders, **kwargs)
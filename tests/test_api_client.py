@@ -0,0 +1,103 @@
+import asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from api_client import ApiClient
+
+def run_with_server(handler, scenario):
+    async def main():
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        server = TestServer(app)
+        await server.start_server()
+        client = ApiClient(str(server.make_url('')), retries=2, backoff=0.01)
+        await client.start()
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            await server.close()
+
+    return asyncio.run(main())
+
+def test_get_retries_on_unavailable():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.method)
+        if len(calls) < 3:
+            return web.Response(status=503)
+        return web.json_response({'ok': True})
+
+    async def scenario(client):
+        return await client.get('/users/telegram/1')
+
+    resp = run_with_server(handler, scenario)
+    assert resp.status == 200
+    assert resp.data == {'ok': True}
+    assert calls == ['GET', 'GET', 'GET']
+
+def test_post_is_not_retried_on_server_error():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.method)
+        return web.json_response({'error': 'busy'}, status=503)
+
+    async def scenario(client):
+        return await client.post('/reminders/', json={})
+
+    resp = run_with_server(handler, scenario)
+    assert resp.status == 503
+    assert calls == ['POST']
+
+def test_connections_are_reused():
+    peers = set()
+
+    async def handler(request):
+        peers.add(request.transport.get_extra_info('peername'))
+        return web.Response(status=204)
+
+    async def scenario(client):
+        for _ in range(5):
+            resp = await client.delete('/reminders/1', params={'user_id': 1})
+            assert resp.status == 204
+            assert resp.data is None
+
+    run_with_server(handler, scenario)
+    assert len(peers) == 1
+
+def test_observe_reports_status_and_latency():
+    seen = []
+
+    async def handler(request):
+        return web.json_response({'ok': True}, status=201)
+
+    async def scenario(client):
+        client.observe = lambda *args: seen.append(args)
+        return await client.post('/reminders/', json={})
+
+    run_with_server(handler, scenario)
+    assert [(method, path, status) for method, path, status, _ in seen] == [('POST', '/reminders/', 201)]
+    assert seen[0][3] >= 0
+
+def test_get_revalidates_cached_body():
+    seen = []
+
+    async def handler(request):
+        seen.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304, headers={'ETag': '"v1"'})
+        return web.json_response([{'id': 1}], headers={'ETag': '"v1"', 'X-Next-Cursor': 'c'})
+
+    async def scenario(client):
+        first = await client.get('/reminders/', params={'user_id': 1})
+        second = await client.get('/reminders/', params={'user_id': 1})
+        other = await client.get('/reminders/', params={'user_id': 2})
+        return first, second, other
+
+    first, second, other = run_with_server(handler, scenario)
+    assert seen == [None, '"v1"', None]
+    assert second.status == 200
+    assert second.data == first.data == [{'id': 1}]
+    assert second.headers['X-Next-Cursor'] == 'c'
+    assert other.data == [{'id': 1}]
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+from aiohttp.test_utils import TestClient, TestServer
+from async_app import create_async_app
+from config import TestConfig
+
+def run(scenario):
+    async def main():
+        async with TestClient(TestServer(create_async_app(TestConfig))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+async def create_user(client, telegram_id=123456789):
+    response = await client.put(f'/users/telegram/{telegram_id}', json={'username': 'testuser'})
+    return await response.json()
+
+def test_users_contract():
+    async def scenario(client):
+        response = await client.put('/users/telegram/42', json={'username': 'a'})
+        assert response.status == 201
+        user = await response.json()
+        response = await client.put('/users/telegram/42', json={'username': 'b'})
+        assert response.status == 200
+        assert (await response.json())['username'] == 'b'
+
+        response = await client.get('/users/telegram/42')
+        assert (await response.json())['id'] == user['id']
+        assert (await client.get('/users/telegram/43')).status == 404
+        assert (await client.post('/users/', json={'telegram_id': 42})).status == 409
+
+        response = await client.post('/users/', json={'username': 'no id'})
+        assert response.status == 400
+        assert 'telegram_id' in (await response.json())['error']
+
+        assert (await client.delete(f"/users/{user['id']}")).status == 204
+        assert (await client.get(f"/users/{user['id']}")).status == 404
+
+    run(scenario)
+
+def test_reminders_contract():
+    async def scenario(client):
+        user = await create_user(client)
+        created = []
+        for day in range(3):
+            response = await client.post('/reminders/', json={
+                'user_id': user['id'], 'chat_id': 1, 'title': f'R{day}',
+                'event_time': f'2030-06-0{day + 1}T09:00:00', 'tags': ['работа'],
+            })
+            assert response.status == 201
+            created.append(await response.json())
+        assert created[0]['tags'][0]['name'] == 'работа'
+
+        response = await client.get('/reminders/', params={'user_id': user['id'], 'limit': 2, 'fields': 'id,title'})
+        page = await response.json()
+        assert [r['title'] for r in page] == ['R0', 'R1']
+        assert set(page[0]) == {'id', 'title'}
+        response = await client.get('/reminders/', params={'user_id': user['id'], 'cursor': response.headers['X-Next-Cursor']})
+        assert [r['title'] for r in await response.json()] == ['R2']
+        assert 'X-Next-Cursor' not in response.headers
+
+        response = await client.get('/reminders/', params={'tag': 'работа', 'chat_id': 1})
+        assert len(await response.json()) == 3
+
+        response = await client.put(f"/reminders/{created[0]['id']}", json={'title': 'Changed', 'tags': ['дом']})
+        data = await response.json()
+        assert data['title'] == 'Changed'
+        assert [t['name'] for t in data['tags']] == ['дом']
+
+        response = await client.get('/reminders/search', params={'q': 'changed', 'user_id': user['id']})
+        assert [r['title'] for r in await response.json()] == ['Changed']
+
+        response = await client.get('/tags/', params={'chat_id': 1})
+        assert [(t['name'], t['reminders_count']) for t in await response.json()] == [('работа', 2), ('дом', 1)]
+
+        response = await client.delete(f"/reminders/{created[1]['id']}", params={'user_id': user['id'] + 1})
+        assert response.status == 403
+        response = await client.delete(f"/reminders/{created[1]['id']}", params={'user_id': user['id']})
+        assert response.status == 204
+        assert (await client.get(f"/reminders/{created[1]['id']}")).status == 404
+        response = await client.delete(f"/reminders/{created[2]['id']}", params={
+            'user_id': user['id'], 'return_page': '1', 'fields': 'title',
+        })
+        assert response.status == 200
+        assert await response.json() == [{'title': 'Changed'}]
+
+        response = await client.post('/reminders/', json={'user_id': 999, 'chat_id': 1, 'title': 'x'})
+        assert response.status == 404
+        response = await client.post('/reminders/', json={'user_id': user['id'], 'chat_id': 1, 'title': 'x', 'repeat_type': 'bad'})
+        assert response.status == 400
+
+    run(scenario)
+
+def test_claim_and_deliver():
+    async def scenario(client):
+        user = await create_user(client)
+        now = datetime.now()
+        response = await client.post('/reminders/bulk', json=[
+            {'user_id': user['id'], 'chat_id': chat_id, 'title': f'C{chat_id}', 'event_time': (now + timedelta(minutes=1)).isoformat()}
+            for chat_id in (1, 2)
+        ])
+        assert response.status == 201
+        window = {'from': (now - timedelta(minutes=10)).isoformat(), 'to': (now + timedelta(minutes=5)).isoformat()}
+
+        response = await client.post('/reminders/claim', json=dict(window, worker='a', partition=0, partitions=2))
+        claimed = await response.json()
+        assert [r['chat_id'] for r in claimed] == [2]
+        response = await client.post('/reminders/claim', json=dict(window, worker='b'))
+        assert [r['chat_id'] for r in await response.json()] == [1]
+
+        reminder_id = claimed[0]['id']
+        response = await client.post(f'/reminders/{reminder_id}/delivered', params={'worker': 'b'})
+        assert response.status == 409
+        response = await client.post(f'/reminders/{reminder_id}/delivered', params={'worker': 'a'})
+        assert response.status == 200
+
+        response = await client.delete('/reminders/bulk', params={'user_id': user['id']})
+        assert len((await response.json())['deleted']) == 2
+
+    run(scenario)
+
+def test_timezone_change_refires():
+    async def scenario(client):
+        user = await create_user(client)
+        response = await client.put(f"/users/{user['id']}", json={'timezone': 'Europe/Moscow'})
+        assert (await response.json())['timezone'] == 'Europe/Moscow'
+        response = await client.post('/reminders/', json={
+            'user_id': user['id'], 'chat_id': 1, 'title': 'R', 'event_time': '2030-06-01T09:00:00',
+        })
+        reminder = await response.json()
+        assert reminder['next_fire_at'] == '2030-06-01T06:00:00'
+
+        await client.put(f"/users/{user['id']}", json={'timezone': 'UTC'})
+        response = await client.get(f"/reminders/{reminder['id']}")
+        assert (await response.json())['next_fire_at'] == '2030-06-01T09:00:00'
+
+    run(scenario)
+
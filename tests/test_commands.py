@@ -0,0 +1,117 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import insert, text
+from app import create_app
+from models import db, Reminder, ReminderArchive, ReminderTag, Tag, User
+from config import TestConfig
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.session.add(User(id=1, telegram_id=1))
+        db.session.commit()
+        # Строки «до миграции»: вставка мимо ORM-событий, next_fire_at пуст
+        db.session.execute(insert(Reminder), [
+            {'user_id': 1, 'chat_id': 1, 'title': 'Event', 'event_time': datetime(2030, 6, 1, 10)},
+            {'user_id': 1, 'chat_id': 1, 'title': 'Notified', 'event_time': datetime(2030, 6, 1, 10),
+             'notification_time': datetime(2030, 6, 1, 9)},
+            {'user_id': 1, 'chat_id': 1, 'title': 'Delivered', 'event_time': datetime(2030, 6, 1, 10),
+             'delivered_at': datetime(2030, 6, 1, 10)},
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def next_fire(app):
+    with app.app_context():
+        return dict(db.session.execute(db.select(Reminder.title, Reminder.next_fire_at)).all())
+
+def test_backfill_next_fire(app):
+    assert set(next_fire(app).values()) == {None}
+    result = app.test_cli_runner().invoke(args=['backfill-next-fire', '--batch-size', '2'])
+    assert result.exit_code == 0
+    assert 'Обновлено напоминаний: 3' in result.output
+    assert next_fire(app) == {
+        'Event': datetime(2030, 6, 1, 10),
+        'Notified': datetime(2030, 6, 1, 9),
+        'Delivered': None,
+    }
+
+def test_backfill_adds_missing_column(app):
+    with app.app_context():
+        db.session.execute(text('DROP INDEX ix_reminder_next_fire'))
+        db.session.execute(text('ALTER TABLE Reminder DROP COLUMN next_fire_at'))
+        db.session.execute(text('ALTER TABLE Reminder DROP COLUMN timezone'))
+        db.session.execute(text('ALTER TABLE User DROP COLUMN timezone'))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['backfill-next-fire'])
+    assert result.exit_code == 0, result.output
+    for column in ('Reminder.next_fire_at', 'Reminder.timezone', 'User.timezone'):
+        assert f'Добавлена колонка {column}' in result.output
+    assert next_fire(app)['Notified'] == datetime(2030, 6, 1, 9)
+
+def test_create_search_index_indexes_existing_rows(app):
+    with app.app_context():
+        db.session.execute(text('DROP TABLE reminder_fts'))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['create-search-index'])
+    assert 'Индекс поиска создан' in result.output
+    response = app.test_client().get('/reminders/search', query_string={'q': 'notified', 'user_id': 1})
+    assert [r['title'] for r in response.get_json()] == ['Notified']
+    result = app.test_cli_runner().invoke(args=['create-search-index'])
+    assert 'Индекс поиска уже есть' in result.output
+
+def test_archive_moves_fired_one_off_reminders(app):
+    old = datetime.utcnow() - timedelta(days=40)
+    with app.app_context():
+        tag = Tag(name='work', chat_id=1)
+        db.session.add_all([
+            Reminder(user_id=1, chat_id=1, title='Old delivered', event_time=old, delivered_at=old, tags=[tag]),
+            Reminder(user_id=1, chat_id=1, title='Old missed', event_time=old),
+            Reminder(user_id=1, chat_id=1, title='Old daily', event_time=old, delivered_at=old, repeat_type='0 9 * * *'),
+            Reminder(user_id=1, chat_id=1, title='Recent', event_time=old, delivered_at=datetime.utcnow() - timedelta(days=1)),
+        ])
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['archive-reminders', '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'Перенесено в архив: 2 (пачек: 2)' in result.output
+    with app.app_context():
+        titles = set(db.session.scalars(db.select(Reminder.title)))
+        assert {'Old delivered', 'Old missed'} & titles == set()
+        assert {'Old daily', 'Recent', 'Event'} <= titles
+        assert db.session.scalar(db.select(db.func.count()).select_from(ReminderTag)) == 0
+        assert db.session.scalar(db.select(db.func.count()).select_from(ReminderArchive)) == 2
+
+    client = app.test_client()
+    response = client.get('/reminders/history', query_string={'user_id': 1, 'limit': 1})
+    assert [r['title'] for r in response.get_json()] == ['Old missed']
+    response = client.get('/reminders/history', query_string={'user_id': 1, 'cursor': response.headers['X-Next-Cursor']})
+    [archived] = response.get_json()
+    assert archived['title'] == 'Old delivered'
+    assert archived['tags'] == [{'id': 1, 'name': 'work', 'chat_id': 1}]
+    assert 'X-Next-Cursor' not in response.headers
+    assert client.get('/reminders/history').status_code == 400
+
+    result = app.test_cli_runner().invoke(args=['archive-reminders'])
+    assert 'Перенесено в архив: 0 (пачек: 0)' in result.output
+
+def test_archive_survives_reused_reminder_ids(app):
+    # SQLite без AUTOINCREMENT выдаёт id удалённой последней строки заново
+    old = datetime.utcnow() - timedelta(days=40)
+    ids = []
+    for title in ('First', 'Second'):
+        with app.app_context():
+            reminder = Reminder(user_id=1, chat_id=1, title=title, event_time=old, delivered_at=old)
+            db.session.add(reminder)
+            db.session.commit()
+            ids.append(reminder.id)
+        result = app.test_cli_runner().invoke(args=['archive-reminders'])
+        assert result.exit_code == 0, result.output
+    assert ids[0] == ids[1]
+
+    history = app.test_client().get('/reminders/history', query_string={'user_id': 1}).get_json()
+    assert [(r['title'], r['reminder_id']) for r in history] == [('Second', ids[0]), ('First', ids[0])]
@@ -0,0 +1,41 @@
+from datetime import datetime
+import pytest
+from cron import compile_cron, next_fire, is_valid_cron
+
+def test_daily():
+    assert next_fire('0 8 * * *', datetime(2024, 6, 1, 7, 59, 30)) == datetime(2024, 6, 1, 8, 0)
+    assert next_fire('0 8 * * *', datetime(2024, 6, 1, 8, 0)) == datetime(2024, 6, 2, 8, 0)
+
+def test_weekly_monday():
+    # 1 июня 2024 — суббота
+    assert next_fire('0 9 * * 1', datetime(2024, 6, 1, 12, 0)) == datetime(2024, 6, 3, 9, 0)
+    assert next_fire('0 9 * * mon', datetime(2024, 6, 3, 9, 0)) == datetime(2024, 6, 10, 9, 0)
+
+def test_steps_ranges_and_lists():
+    assert next_fire('*/15 * * * *', datetime(2024, 6, 1, 10, 16)) == datetime(2024, 6, 1, 10, 30)
+    assert next_fire('5-10/5 3,4 * * *', datetime(2024, 6, 1, 3, 6)) == datetime(2024, 6, 1, 3, 10)
+    assert next_fire('0 12 * * 7', datetime(2024, 6, 1, 0, 0)) == datetime(2024, 6, 2, 12, 0)
+
+def test_year_and_month_rollover():
+    assert next_fire('59 23 31 12 *', datetime(2024, 12, 31, 23, 59)) == datetime(2025, 12, 31, 23, 59)
+    assert next_fire('0 0 31 * *', datetime(2024, 4, 1)) == datetime(2024, 5, 31)
+    assert next_fire('0 0 29 2 *', datetime(2024, 3, 1)) == datetime(2028, 2, 29)
+
+def test_day_of_month_or_weekday():
+    # Ограничены оба поля — подходит любой из них: 13-е число или пятница
+    assert next_fire('0 9 13 * 5', datetime(2024, 6, 1)) == datetime(2024, 6, 7, 9, 0)
+    assert next_fire('0 9 13 * 5', datetime(2024, 6, 12)) == datetime(2024, 6, 13, 9, 0)
+
+def test_invalid_expressions():
+    assert not is_valid_cron('0 8 * *')
+    assert not is_valid_cron('61 * * * *')
+    assert not is_valid_cron('каждый день')
+    assert is_valid_cron('@daily')
+    # Синтаксически верное, но никогда не срабатывающее
+    assert not is_valid_cron('0 0 30 2 *')
+    assert is_valid_cron('0 0 29 2 *')
+    with pytest.raises(ValueError):
+        next_fire('0 0 30 2 *', datetime(2024, 1, 1))
+
+def test_compiled_expressions_are_cached():
+    assert compile_cron('0 8 * * *') is compile_cron('0 8 * * *')
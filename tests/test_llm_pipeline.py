@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from openai import AsyncOpenAI
+from llm_pipeline import ParsePipeline, PipelineOverloaded
+
+class FakeOpenAI:
+    # Локальный сервер с тем же протоколом, что /v1/chat/completions
+    def __init__(self, failures=0, status=429, delay=0.0):
+        self.failures = failures
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def handle(self, request):
+        self.calls += 1
+        body = await request.json()
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            return web.json_response({'error': {'message': 'slow down', 'type': 'rate_limit'}}, status=self.status)
+        text = body['messages'][-1]['content']
+        return web.json_response({
+            'id': f'chatcmpl-{self.calls}',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': body['model'],
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': json.dumps({'title': text})},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        })
+
+def run_pipeline(fake, scenario, **options):
+    async def main():
+        app = web.Application()
+        app.router.add_post('/v1/chat/completions', fake.handle)
+        server = TestServer(app)
+        await server.start_server()
+        client = AsyncOpenAI(api_key='test', base_url=str(server.make_url('/v1')), max_retries=0)
+
+        async def parse(text):
+            response = await client.chat.completions.create(
+                model='gpt-4.1', messages=[{'role': 'user', 'content': text}],
+            )
+            return json.loads(response.choices[0].message.content)
+
+        pipeline = ParsePipeline(parse, **options)
+        await pipeline.start()
+        try:
+            return await scenario(pipeline)
+        finally:
+            await pipeline.stop()
+            await client.close()
+            await server.close()
+
+    return asyncio.run(main())
+
+def test_retries_rate_limited_requests():
+    fake = FakeOpenAI(failures=2, status=429)
+
+    async def scenario(pipeline):
+        return await pipeline.submit('k', 'пить воду')
+
+    assert run_pipeline(fake, scenario, backoff=0.01) == {'title': 'пить воду'}
+    assert fake.calls == 3
+
+def test_gives_up_after_retries():
+    fake = FakeOpenAI(failures=10, status=503)
+
+    async def scenario(pipeline):
+        return await pipeline.submit('k', 'пить воду')
+
+    with pytest.raises(Exception):
+        run_pipeline(fake, scenario, backoff=0.01, retries=1)
+    assert fake.calls == 2
+
+def test_identical_inflight_requests_are_merged():
+    fake = FakeOpenAI(delay=0.05)
+
+    async def scenario(pipeline):
+        results = await asyncio.gather(*(pipeline.submit('same', 'пить воду') for _ in range(5)))
+        return results, pipeline.deduplicated
+
+    results, deduplicated = run_pipeline(fake, scenario)
+    assert results == [{'title': 'пить воду'}] * 5
+    assert deduplicated == 4
+    assert fake.calls == 1
+
+def test_full_queue_is_rejected_and_reported_busy():
+    fake = FakeOpenAI(delay=0.1)
+
+    async def scenario(pipeline):
+        tasks = [asyncio.create_task(pipeline.submit(0, 'текст 0'))]
+        await asyncio.sleep(0.01)
+        # Первый запрос уже у воркера, ещё два заполняют очередь
+        tasks += [asyncio.create_task(pipeline.submit(i, f'текст {i}')) for i in (1, 2)]
+        await asyncio.sleep(0)
+        busy = pipeline.busy
+        with pytest.raises(PipelineOverloaded):
+            await pipeline.submit('extra', 'ещё один')
+        await asyncio.gather(*tasks)
+        return busy
+
+    assert run_pipeline(fake, scenario, workers=1, queue_size=2, busy_threshold=2)
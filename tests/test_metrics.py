@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+import pytest
+from app import create_app
+from config import TestConfig
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from metrics import Registry, handler_middleware, llm_metrics, path_label
+from models import db
+
+MetricsConfig = type('MetricsConfig', (TestConfig,), {'METRICS_ENABLED': True})
+
+@pytest.fixture
+def test_client():
+    app = create_app(MetricsConfig)
+    with app.test_client() as client:
+        yield client
+
+def test_render_text_format():
+    registry = Registry()
+    registry.counter('jobs_total', 'Jobs', ('queue',)).inc('a"b', amount=2)
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(3.0)
+    registry.gauge('depth', 'Depth', ('queue',)).track(lambda: 7, 'send')
+
+    text = registry.render()
+    assert '# TYPE jobs_total counter\njobs_total{queue="a\\"b"} 2\n' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="1"} 2\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3\n' in text
+    assert 'latency_seconds_sum 3.55\n' in text
+    assert 'latency_seconds_count 3\n' in text
+    assert 'depth{queue="send"} 7\n' in text
+
+def test_path_label_collapses_ids():
+    assert path_label('/reminders/42/delivered') == '/reminders/{id}/delivered'
+    assert path_label('/users/telegram/123') == '/users/telegram/{id}'
+
+def test_endpoint_metrics(test_client):
+    test_client.put('/users/telegram/1', json={'username': 'a'})
+    test_client.get('/reminders/', query_string={'user_id': 1})
+    test_client.get('/reminders/999')
+
+    response = test_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert 'http_requests_total{method="PUT",endpoint="/users/telegram/<int:telegram_id>",status="201"} 1' in text
+    assert 'http_requests_total{method="GET",endpoint="/reminders/<int:id>",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/reminders/"} 1' in text
+    assert 'http_request_queries_count{method="GET",endpoint="/reminders/"} 1' in text
+    assert 'http_request_sql_seconds_count{method="GET",endpoint="/reminders/"} 1' in text
+
+def test_slow_query_log(caplog):
+    app = create_app(type('SlowConfig', (MetricsConfig,), {'SLOW_QUERY_MS': 0}))
+    with caplog.at_level(logging.WARNING, logger='instrumentation'):
+        app.test_client().get('/users/telegram/1')
+    assert any('Медленный запрос' in r.getMessage() and 'FROM "User"' in r.getMessage() for r in caplog.records)
+    assert app.extensions['metrics'].get('sql_slow_queries_total').value() >= 1
+
+def test_failed_query_does_not_leak_timer():
+    app = create_app(MetricsConfig)
+    with app.app_context(), db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing_table'))
+        assert conn.info['query_started'] == []
+
+def test_metrics_disabled():
+    app = create_app(type('NoMetrics', (TestConfig,), {'METRICS_ENABLED': False}))
+    assert 'metrics' not in app.extensions
+    assert app.test_client().get('/metrics').status_code == 404
+
+def test_handler_middleware():
+    registry = Registry()
+    middleware = handler_middleware(registry)
+
+    async def cmd_start(event, data):
+        return 'ok'
+
+    async def broken(event, data):
+        raise RuntimeError
+
+    async def main():
+        assert await middleware(cmd_start, None, {'handler': SimpleNamespace(callback=cmd_start)}) == 'ok'
+        with pytest.raises(RuntimeError):
+            await middleware(broken, None, {'handler': SimpleNamespace(callback=broken)})
+
+    asyncio.run(main())
+    assert registry.get('bot_handler_seconds').count('cmd_start') == 1
+    assert registry.get('bot_handler_errors_total').value('broken') == 1
+
+def test_llm_metrics_count_tokens():
+    registry = Registry()
+    observe = llm_metrics(registry)
+    observe(0.3, SimpleNamespace(prompt_tokens=120, completion_tokens=40))
+    observe(0.2, None)
+    assert registry.get('bot_openai_request_seconds').count() == 2
+    assert registry.get('bot_openai_tokens_total').value('prompt') == 120
+    assert registry.get('bot_openai_tokens_total').value('completion') == 40
@@ -0,0 +1,89 @@
+from datetime import datetime
+from parse_cache import ParseCache, from_relative, normalize
+
+PARSED = {
+    'title': 'Позвонить маме',
+    'description': None,
+    'event_time': '2024-06-02T19:00:00',
+    'repeat_type': None,
+    'notification_time': None,
+    'tags': [],
+}
+
+def test_normalize():
+    assert normalize('  Завтра в 19:00, позвонить МАМЕ!! ') == 'завтра в 19:00 позвонить маме'
+    assert normalize('пить воду ещё') == 'пить воду еще'
+
+def test_day_anchored_entry_is_reanchored():
+    cache = ParseCache()
+    cache.put('Завтра в 19:00 позвонить маме', datetime(2024, 6, 1, 10, 5), PARSED, latency=2.0)
+    params = cache.get('завтра в 19:00 позвонить маме!', datetime(2024, 6, 10, 10, 40))
+    assert params['event_time'] == '2024-06-11T19:00:00'
+    assert params['title'] == 'Позвонить маме'
+    # В другой час ответ может отличаться («в 19:00» после 19:00 — уже завтра)
+    assert cache.get('завтра в 19:00 позвонить маме', datetime(2024, 6, 10, 20, 0)) is None
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'saved_seconds': 2.0}
+
+def test_fractional_and_offset_times_are_stored_naive():
+    cache = ParseCache()
+    parsed = dict(PARSED, event_time='2024-06-02T19:00:00.250+03:00', notification_time='2024-06-02T18:50:00.5')
+    cache.put('Завтра в 19:00 позвонить маме', datetime(2024, 6, 1, 10, 5), parsed)
+    params = cache.get('завтра в 19:00 позвонить маме', datetime(2024, 6, 10, 10, 40))
+    assert params['event_time'] == '2024-06-11T19:00:00'
+    assert params['notification_time'] == '2024-06-11T18:50:00'
+    # Записи, сохранённые раньше с долями секунды или смещением, тоже читаются
+    entry = {'event_time': {'days': 1, 'time': '19:00:00.250+03:00'}}
+    assert from_relative(entry, datetime(2024, 6, 10, 10, 40))['event_time'] == '2024-06-11T19:00:00'
+
+def test_relative_entry_keeps_delta():
+    cache = ParseCache()
+    parsed = dict(PARSED, event_time='2024-06-01T10:20:00')
+    cache.put('через 15 минут выключить плиту', datetime(2024, 6, 1, 10, 5), parsed)
+    params = cache.get('Через 15 минут выключить плиту', datetime(2024, 6, 3, 22, 30))
+    assert params['event_time'] == '2024-06-03T22:45:00'
+
+def test_absolute_date_is_not_shifted():
+    cache = ParseCache()
+    parsed = dict(PARSED, event_time='2024-07-01T09:00:00')
+    cache.put('1 июля в 9 к врачу', datetime(2024, 6, 1, 10, 0), parsed)
+    assert cache.get('1 июля в 9 к врачу', datetime(2024, 6, 1, 18, 0))['event_time'] == '2024-07-01T09:00:00'
+    assert cache.get('1 июля в 9 к врачу', datetime(2024, 6, 2, 10, 0)) is None
+
+def test_day_of_month_is_not_shifted():
+    cache = ParseCache()
+    parsed = dict(PARSED, title='Оплатить интернет', event_time='2024-10-15T10:00:00')
+    cache.put('оплатить интернет 15 числа в 10', datetime(2024, 10, 10, 9, 0), parsed)
+    assert cache.get('оплатить интернет 15 числа в 10', datetime(2024, 10, 10, 18, 0))['event_time'] == '2024-10-15T10:00:00'
+    assert cache.get('оплатить интернет 15 числа в 10', datetime(2024, 10, 13, 9, 0)) is None
+    assert cache.key('в конце месяца сдать отчет', datetime(2024, 10, 10, 9, 0))[1] == 'absolute'
+
+def test_inflight_key_separates_local_dates():
+    cache = ParseCache()
+    text = 'завтра в 19:00 позвонить маме'
+    # Один и тот же местный час, но разные даты — у пользователей в разных поясах
+    assert cache.key(text, datetime(2024, 6, 1, 10, 5)) == cache.key(text, datetime(2024, 6, 2, 10, 5))
+    assert cache.inflight_key(text, datetime(2024, 6, 1, 10, 5)) != cache.inflight_key(text, datetime(2024, 6, 2, 10, 5))
+    assert cache.inflight_key(text, datetime(2024, 6, 1, 10, 5, 1)) == cache.inflight_key(text, datetime(2024, 6, 1, 10, 5, 40))
+
+def test_size_and_age_eviction():
+    now = [1000.0]
+    cache = ParseCache(maxsize=2, max_age=60, clock=lambda: now[0])
+    moment = datetime(2024, 6, 1, 10, 0)
+    for text in ('a', 'b', 'c'):
+        cache.put(text, moment, PARSED)
+    assert len(cache) == 2
+    assert cache.get('a', moment) is None
+    now[0] += 61
+    assert cache.get('c', moment) is None
+
+def test_sqlite_backing(tmp_path):
+    path = str(tmp_path / 'parse_cache.sqlite3')
+    moment = datetime(2024, 6, 1, 10, 0)
+    cache = ParseCache(path=path)
+    cache.put('завтра в 19:00 позвонить маме', moment, PARSED, latency=1.5)
+    cache.close()
+
+    reopened = ParseCache(path=path)
+    assert reopened.get('завтра в 19:00 позвонить маме', moment)['event_time'] == '2024-06-02T19:00:00'
+    assert reopened.stats()['saved_seconds'] == 1.5
+    reopened.close()
@@ -0,0 +1,34 @@
+import json
+import os
+from datetime import datetime
+from quick_parse import quick_parse
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'quick_parse_corpus.json')
+
+def test_corpus_precision():
+    with open(CORPUS, encoding='utf-8') as f:
+        corpus = json.load(f)
+    now = datetime.fromisoformat(corpus['now'])
+    for case in corpus['cases']:
+        parsed = quick_parse(case['text'], now)
+        expected = case['expected']
+        if expected is None:
+            assert parsed is None, case['text']
+        elif parsed is not None:
+            assert {k: parsed[k] for k in expected} == expected, case['text']
+
+def test_result_has_llm_shape():
+    parsed = quick_parse('завтра в 19:00 позвонить маме', datetime(2024, 6, 1, 10, 5))
+    assert parsed == {
+        'title': 'Позвонить маме',
+        'description': None,
+        'event_time': '2024-06-02T19:00:00',
+        'repeat_type': None,
+        'notification_time': None,
+        'tags': [],
+    }
+
+def test_weekday_later_today_is_this_week():
+    # 1 июня 2024 — суббота, 10:05
+    parsed = quick_parse('в субботу в 18 баня', datetime(2024, 6, 1, 10, 5))
+    assert parsed['event_time'] == '2024-06-01T18:00:00'
@@ -0,0 +1,29 @@
+from ratelimit import TapDebouncer, TokenBucket
+
+def test_bucket_allows_burst_then_throttles():
+    now = [0.0]
+    bucket = TokenBucket(rate=2, capacity=3, clock=lambda: now[0])
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == 0.5
+    now[0] = 0.5
+    assert bucket.try_acquire() == 0.0
+
+def test_bucket_does_not_exceed_capacity():
+    now = [0.0]
+    bucket = TokenBucket(rate=1, capacity=2, clock=lambda: now[0])
+    now[0] = 100.0
+    assert bucket.try_acquire(2) == 0.0
+    assert bucket.try_acquire() == 1.0
+
+def test_debouncer_drops_taps_in_flight_and_right_after():
+    now = [0.0]
+    debouncer = TapDebouncer(interval=1.0, clock=lambda: now[0])
+    assert debouncer.begin((1, 10))
+    assert not debouncer.begin((1, 10))
+    assert debouncer.begin((1, 11))
+    debouncer.end((1, 10))
+    now[0] = 0.5
+    assert not debouncer.begin((1, 10))
+    now[0] = 1.5
+    assert debouncer.begin((1, 10))
+
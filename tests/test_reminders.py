@@ -1,7 +1,9 @@
 import pytest
 from app import create_app
-from models import db, Reminder, User
+from datetime import datetime, timedelta
+from models import db, Reminder, ReminderTag, Tag, User
 from config import TestConfig
+from routes.reminders import claim_candidates, lease_reminders
 
 @pytest.fixture
 def test_client():
@@ -104,3 +106,611 @@ def test_delete_reminder(test_client, create_user):
 		)
 		assert response.status_code == 403
 		assert "Вы не владелец" in response.get_json()['error']
+
+def test_list_reminders_filters_and_pages(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		other = User(telegram_id=987654321, username='otheruser')
+		db.session.add(other)
+		db.session.commit()
+		db.session.add_all([
+			Reminder(user_id=user.id, chat_id=1, title=f'R{i}', event_time=datetime(2024, 6, 1, 9 + i))
+			for i in range(5)
+		])
+		db.session.add(Reminder(user_id=user.id, chat_id=1, title='No time'))
+		db.session.add(Reminder(user_id=other.id, chat_id=2, title='Foreign', event_time=datetime(2024, 6, 1, 10)))
+		db.session.commit()
+
+		titles = []
+		cursor = None
+		while True:
+			params = {'user_id': user.id, 'limit': 2}
+			if cursor:
+				params['cursor'] = cursor
+			response = test_client.get('/reminders/', query_string=params)
+			assert response.status_code == 200
+			titles += [r['title'] for r in response.get_json()]
+			cursor = response.headers.get('X-Next-Cursor')
+			if not cursor:
+				break
+		assert titles == ['No time', 'R0', 'R1', 'R2', 'R3', 'R4']
+
+		response = test_client.get('/reminders/', query_string={
+			'chat_id': 1, 'from': '2024-06-01T10:00:00', 'to': '2024-06-01T12:00:00',
+		})
+		assert [r['title'] for r in response.get_json()] == ['R1', 'R2']
+
+		response = test_client.get('/reminders/', query_string={'cursor': '!!!'})
+		assert response.status_code == 400
+
+def test_list_reminders_pages_backwards(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add(Reminder(user_id=user.id, chat_id=1, title='No time'))
+		db.session.add_all([
+			Reminder(user_id=user.id, chat_id=1, title=f'R{i}', event_time=datetime(2024, 6, 1, 9 + i))
+			for i in range(4)
+		])
+		db.session.commit()
+
+		first = test_client.get('/reminders/', query_string={'user_id': user.id, 'limit': 2})
+		assert 'X-Prev-Cursor' not in first.headers
+		second = test_client.get('/reminders/', query_string={'user_id': user.id, 'limit': 2, 'cursor': first.headers['X-Next-Cursor']})
+		assert [r['title'] for r in second.get_json()] == ['R1', 'R2']
+		third = test_client.get('/reminders/', query_string={'user_id': user.id, 'limit': 2, 'cursor': second.headers['X-Next-Cursor']})
+		assert [r['title'] for r in third.get_json()] == ['R3']
+		assert 'X-Next-Cursor' not in third.headers
+
+		back = test_client.get('/reminders/', query_string={'user_id': user.id, 'limit': 2, 'before': third.headers['X-Prev-Cursor']})
+		assert [r['title'] for r in back.get_json()] == ['R1', 'R2']
+		back = test_client.get('/reminders/', query_string={'user_id': user.id, 'limit': 2, 'before': back.headers['X-Prev-Cursor']})
+		assert [r['title'] for r in back.get_json()] == ['No time', 'R0']
+		assert 'X-Prev-Cursor' not in back.headers
+		assert len(back.headers['X-Next-Cursor'].encode()) <= 32
+
+		response = test_client.get('/reminders/', query_string={'cursor': first.headers['X-Next-Cursor'], 'before': first.headers['X-Next-Cursor']})
+		assert response.status_code == 400
+
+def test_delete_reminder_returns_page(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		reminders = [
+			Reminder(user_id=user.id, chat_id=1, title=f'R{i}', event_time=datetime(2024, 6, 1, 9 + i))
+			for i in range(4)
+		]
+		db.session.add_all(reminders)
+		db.session.commit()
+		ids = [r.id for r in reminders]
+		user_id = user.id
+
+	first = test_client.get('/reminders/', query_string={'user_id': user_id, 'limit': 2})
+	response = test_client.delete(f'/reminders/{ids[2]}', query_string={
+		'user_id': user_id, 'return_page': 1, 'limit': 2, 'fields': 'id,title',
+		'cursor': first.headers['X-Next-Cursor'],
+	})
+	assert response.status_code == 200
+	assert response.get_json() == [{'id': ids[3], 'title': 'R3'}]
+	assert 'X-Next-Cursor' not in response.headers
+	assert response.headers['X-Prev-Cursor']
+	# Удаление и страница — в одном запросе, без отдельного GET со стороны бота
+	assert int(response.headers['X-Query-Count']) <= 5
+
+def test_list_reminders_by_tag(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		work = Tag(name='work', chat_id=1)
+		tagged = Reminder(user_id=user.id, chat_id=1, title='Tagged', tags=[work])
+		db.session.add_all([tagged, Reminder(user_id=user.id, chat_id=1, title='Plain')])
+		db.session.commit()
+
+		response = test_client.get('/reminders/', query_string={'tag': 'work'})
+		assert [r['title'] for r in response.get_json()] == ['Tagged']
+
+		response = test_client.get('/reminders/', query_string={'tag': 'work', 'chat_id': 2})
+		assert response.get_json() == []
+
+def test_due_reminders_window(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add_all([
+			Reminder(user_id=user.id, chat_id=1, title='By event', event_time=datetime(2024, 6, 1, 9, 0)),
+			Reminder(user_id=user.id, chat_id=1, title='By notification',
+				event_time=datetime(2024, 6, 1, 12, 0), notification_time=datetime(2024, 6, 1, 9, 3)),
+			Reminder(user_id=user.id, chat_id=1, title='Notified earlier',
+				event_time=datetime(2024, 6, 1, 9, 2), notification_time=datetime(2024, 6, 1, 8, 0)),
+			Reminder(user_id=user.id, chat_id=1, title='Later', event_time=datetime(2024, 6, 1, 10, 0)),
+		])
+		db.session.commit()
+
+		window = {'from': '2024-06-01T09:00:00', 'to': '2024-06-01T09:05:00'}
+		response = test_client.get('/reminders/due', query_string=window)
+		assert response.status_code == 200
+		due = response.get_json()
+		assert [r['title'] for r in due] == ['By event', 'By notification']
+
+		response = test_client.post(f"/reminders/{due[0]['id']}/delivered")
+		assert response.status_code == 200
+		response = test_client.get('/reminders/due', query_string=window)
+		assert [r['title'] for r in response.get_json()] == ['By notification']
+
+		response = test_client.get('/reminders/due', query_string={'from': '2024-06-01T09:00:00'})
+		assert response.status_code == 400
+
+def test_delivered_recurring_reminder_is_rescheduled(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		reminder = Reminder(user_id=user.id, chat_id=1, title='Water', repeat_type='0 8 * * *',
+			event_time=datetime(2030, 6, 2, 8, 0), notification_time=datetime(2030, 6, 2, 7, 50))
+		db.session.add(reminder)
+		db.session.commit()
+
+		response = test_client.post(f'/reminders/{reminder.id}/delivered')
+		data = response.get_json()
+		assert data['event_time'] == '2030-06-03T08:00:00'
+		assert data['notification_time'] == '2030-06-03T07:50:00'
+
+def test_delivered_reminder_with_dead_rule_stops(test_client, create_user):
+	# Правило, сохранённое до проверки на выполнимость: доставку отмечаем, а не падаем
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		reminder = Reminder(user_id=user.id, chat_id=1, title='Never', repeat_type='0 0 30 2 *',
+			event_time=datetime(2030, 6, 2, 8, 0))
+		db.session.add(reminder)
+		db.session.commit()
+
+		response = test_client.post(f'/reminders/{reminder.id}/delivered')
+		assert response.status_code == 200
+		data = response.get_json()
+		assert data['next_fire_at'] is None
+		assert db.session.get(Reminder, reminder.id).delivered_at is not None
+
+		response = test_client.post('/reminders/', json={
+			'user_id': user.id, 'chat_id': 1, 'title': 'Never', 'repeat_type': '0 0 30 2 *',
+		})
+		assert response.status_code == 400
+
+def test_recurring_next_fire_at_follows_rule(test_client, create_user):
+	with test_client.application.app_context():
+		user_id = db.session.merge(create_user).id
+	now = datetime.utcnow()
+
+	# Без event_time и с давно прошедшим — ближайшее срабатывание по правилу
+	for extra in ({}, {'event_time': '2020-01-01T08:00:00', 'notification_time': '2020-01-01T07:50:00'}):
+		response = test_client.post('/reminders/', json=dict({'user_id': user_id, 'chat_id': 1, 'title': 'Water', 'repeat_type': '0 8 * * *'}, **extra))
+		next_fire_at = datetime.fromisoformat(response.get_json()['next_fire_at'])
+		assert now < next_fire_at <= now + timedelta(days=1)
+		assert next_fire_at.minute == (50 if extra else 0)
+
+	response = test_client.post('/reminders/bulk', json=[{'user_id': user_id, 'chat_id': 1, 'title': 'Bulk', 'repeat_type': '0 8 * * *'}])
+	assert response.get_json()['created'][0]['next_fire_at'] is not None
+
+def test_next_fire_at_follows_writes(test_client, create_user):
+	with test_client.application.app_context():
+		user_id = db.session.merge(create_user).id
+
+	response = test_client.post('/reminders/', json={
+		'user_id': user_id, 'chat_id': 1, 'title': 'Call',
+		'event_time': '2030-06-01T10:00:00', 'notification_time': '2030-06-01T09:50:00',
+	})
+	reminder = response.get_json()
+	assert reminder['next_fire_at'] == '2030-06-01T09:50:00'
+
+	response = test_client.put(f"/reminders/{reminder['id']}", json={'notification_time': None})
+	assert response.get_json()['next_fire_at'] == '2030-06-01T10:00:00'
+
+	response = test_client.put('/reminders/bulk', query_string={'user_id': user_id}, json=[{'id': reminder['id'], 'event_time': '2030-06-02T10:00:00'}])
+	assert response.get_json()['updated'][0]['next_fire_at'] == '2030-06-02T10:00:00'
+
+	response = test_client.post('/reminders/bulk', json=[
+		{'user_id': user_id, 'chat_id': 1, 'title': 'Water', 'repeat_type': '0 8 * * *', 'event_time': '2030-06-02T08:00:00'},
+	])
+	water = response.get_json()['created'][0]
+	assert water['next_fire_at'] == '2030-06-02T08:00:00'
+
+	assert test_client.post(f"/reminders/{reminder['id']}/delivered").get_json()['next_fire_at'] is None
+	assert test_client.post(f"/reminders/{water['id']}/delivered").get_json()['next_fire_at'] == '2030-06-03T08:00:00'
+
+def test_search_reminders(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		other = User(telegram_id=987654321, username='otheruser')
+		db.session.add(other)
+		db.session.commit()
+		db.session.add_all([
+			Reminder(user_id=user.id, chat_id=1, title='Стоматолог', description='Записаться к стоматологу на чистку',
+				event_time=datetime(2024, 6, 3, 9), tags=[Tag(name='здоровье', chat_id=1)]),
+			Reminder(user_id=user.id, chat_id=1, title='Купить зубную пасту', description='После стоматолога',
+				event_time=datetime(2024, 6, 1, 9)),
+			Reminder(user_id=user.id, chat_id=1, title='Позвонить маме', event_time=datetime(2024, 6, 2, 9)),
+			Reminder(user_id=other.id, chat_id=2, title='Чужой стоматолог'),
+		])
+		db.session.commit()
+		user_id = user.id
+
+	response = test_client.get('/reminders/search', query_string={'q': 'стоматолог', 'user_id': user_id})
+	assert response.status_code == 200
+	# Совпадение и в названии, и в описании выше, чем только в описании
+	assert [r['title'] for r in response.get_json()] == ['Стоматолог', 'Купить зубную пасту']
+
+	response = test_client.get('/reminders/search', query_string={'q': 'СТОМАТ', 'user_id': user_id, 'limit': 1, 'fields': 'title'})
+	assert response.get_json() == [{'title': 'Стоматолог'}]
+	response = test_client.get('/reminders/search', query_string={
+		'q': 'стомат', 'user_id': user_id, 'limit': 1, 'offset': response.headers['X-Next-Offset'],
+	})
+	assert [r['title'] for r in response.get_json()] == ['Купить зубную пасту']
+	assert 'X-Next-Offset' not in response.headers
+
+	response = test_client.get('/reminders/search', query_string={'q': 'стоматолог', 'chat_id': 1, 'tag': 'здоровье'})
+	assert [r['title'] for r in response.get_json()] == ['Стоматолог']
+	response = test_client.get('/reminders/search', query_string={'q': 'стоматолог', 'user_id': user_id, 'to': '2024-06-02T00:00:00'})
+	assert [r['title'] for r in response.get_json()] == ['Купить зубную пасту']
+	response = test_client.get('/reminders/search', query_string={'q': 'стоматолог маме', 'user_id': user_id})
+	assert response.get_json() == []
+
+	# Индекс следует за изменениями и удалениями
+	reminder_id = test_client.get('/reminders/search', query_string={'q': 'маме', 'user_id': user_id}).get_json()[0]['id']
+	test_client.put(f'/reminders/{reminder_id}', json={'title': 'Позвонить папе'})
+	assert test_client.get('/reminders/search', query_string={'q': 'маме', 'user_id': user_id}).get_json() == []
+	assert len(test_client.get('/reminders/search', query_string={'q': 'папе', 'user_id': user_id}).get_json()) == 1
+	test_client.delete(f'/reminders/{reminder_id}', query_string={'user_id': user_id})
+	assert test_client.get('/reminders/search', query_string={'q': 'папе', 'user_id': user_id}).get_json() == []
+
+	assert test_client.get('/reminders/search', query_string={'q': 'стоматолог'}).status_code == 400
+	assert test_client.get('/reminders/search', query_string={'q': ' ', 'user_id': user_id}).status_code == 400
+
+def test_create_reminder_rejects_invalid_cron(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		response = test_client.post('/reminders/', json={
+			'user_id': user.id,
+			'chat_id': 12345,
+			'title': 'Test Reminder',
+			'repeat_type': 'каждый день',
+		})
+		assert response.status_code == 400
+		assert 'repeat_type' in response.get_json()['error']
+
+def test_create_reminder_for_missing_user(test_client):
+	response = test_client.post('/reminders/', json={
+		'user_id': 999,
+		'chat_id': 12345,
+		'title': 'Test Reminder',
+	})
+	assert response.status_code == 404
+	assert response.get_json()['error'] == 'user not found'
+
+def test_bulk_create_reminders(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add(Tag(name='work', chat_id=1))
+		db.session.commit()
+
+		response = test_client.post('/reminders/bulk', json=[
+			{'user_id': user.id, 'chat_id': 1, 'title': 'A', 'tags': [{'name': 'work', 'chat_id': 1}]},
+			{'user_id': user.id, 'chat_id': 1},
+			{'user_id': 999, 'chat_id': 1, 'title': 'Nobody'},
+			{'user_id': user.id, 'chat_id': 1, 'title': 'B', 'tags': [{'name': 'home', 'chat_id': 1}, {'name': 'work', 'chat_id': 1}]},
+		])
+		assert response.status_code == 201
+		data = response.get_json()
+		assert [r['title'] for r in data['created']] == ['A', 'B']
+		assert sorted(t['name'] for t in data['created'][1]['tags']) == ['home', 'work']
+		assert set(data['errors']) == {'1', '2'}
+		assert Tag.query.filter_by(name='work').count() == 1
+
+def test_bulk_update_reminders(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		first = Reminder(user_id=user.id, chat_id=1, title='Old 1')
+		second = Reminder(user_id=user.id, chat_id=1, title='Old 2')
+		other = User(telegram_id=987654321, username='otheruser')
+		db.session.add_all([first, second, other])
+		db.session.commit()
+		foreign = Reminder(user_id=other.id, chat_id=2, title='Foreign')
+		db.session.add(foreign)
+		db.session.commit()
+
+		response = test_client.put(f'/reminders/bulk?user_id={user.id}', json=[
+			{'id': first.id, 'title': 'New 1'},
+			{'id': second.id, 'tags': [{'name': 'home', 'chat_id': 1}]},
+			{'id': 12345, 'title': 'Missing'},
+			{'title': 'No id'},
+			{'id': foreign.id, 'title': 'Stolen'},
+			{'id': first.id, 'user_id': 9999},
+		])
+		assert response.status_code == 200
+		data = response.get_json()
+		assert [r['title'] for r in data['updated']] == ['New 1', 'Old 2']
+		assert [t['name'] for t in data['updated'][1]['tags']] == ['home']
+		assert set(data['errors']) == {'2', '3', '4', '5'}
+		assert 'Вы не владелец' in data['errors']['4']['id'][0]
+		assert 'user_id' in data['errors']['5']
+		assert db.session.get(Reminder, first.id).user_id == user.id
+		assert db.session.get(Reminder, foreign.id).title == 'Foreign'
+
+		assert test_client.put('/reminders/bulk', json=[{'id': first.id, 'title': 'X'}]).status_code == 400
+
+def test_bulk_delete_reminders(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		other = User(telegram_id=987654321, username='otheruser')
+		db.session.add(other)
+		db.session.commit()
+		mine = [Reminder(user_id=user.id, chat_id=1, title=f'R{i}') for i in range(3)]
+		foreign = Reminder(user_id=other.id, chat_id=2, title='Foreign')
+		db.session.add_all(mine + [foreign])
+		db.session.commit()
+		ids = [r.id for r in mine]
+		tag = Tag(name='work', chat_id=1)
+		db.session.add(tag)
+		db.session.commit()
+		db.session.add(ReminderTag(reminder_id=ids[2], tag_id=tag.id))
+		db.session.commit()
+
+		response = test_client.delete(f'/reminders/bulk?user_id={user.id}', json={'ids': [ids[0], foreign.id]})
+		data = response.get_json()
+		assert data['deleted'] == [ids[0]]
+		assert 'Вы не владелец' in data['errors']['1']['id'][0]
+
+		response = test_client.delete(f'/reminders/bulk?user_id={user.id}')
+		assert response.get_json()['deleted'] == ids[1:]
+		assert Reminder.query.filter_by(user_id=user.id).count() == 0
+		assert Reminder.query.count() == 1
+		assert ReminderTag.query.count() == 0
+
+def test_list_reminders_loads_tags_in_one_query(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		for i in range(10):
+			db.session.add(Reminder(user_id=user.id, chat_id=1, title=f'R{i}', tags=[Tag(name=f't{i}', chat_id=1)]))
+		db.session.commit()
+		user_id = user.id
+
+	# Запросы вне контекста теста, чтобы не мешала его сессия с уже загруженными объектами
+	response = test_client.get('/reminders/', query_string={'user_id': user_id})
+	assert len(response.get_json()) == 10
+	assert all(len(r['tags']) == 1 for r in response.get_json())
+	# Версия для ETag, один запрос на страницу напоминаний и один на все их теги
+	assert response.headers['X-Query-Count'] == '3'
+
+	reminder_id = response.get_json()[0]['id']
+	response = test_client.get(f'/reminders/{reminder_id}')
+	assert response.get_json()['tags'][0]['name'] == 't0'
+	assert response.headers['X-Query-Count'] == '2'
+
+def test_reminder_field_projection(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		reminder = Reminder(user_id=user.id, chat_id=1, title='Short', tags=[Tag(name='work', chat_id=1)])
+		db.session.add(reminder)
+		db.session.commit()
+
+		response = test_client.get('/reminders/', query_string={'user_id': user.id, 'fields': 'id,title,event_time'})
+		assert response.get_json() == [{'id': reminder.id, 'title': 'Short', 'event_time': None}]
+		assert response.headers['X-Query-Count'] == '2'
+
+		response = test_client.get(f'/reminders/{reminder.id}', query_string={'fields': 'title,tags'})
+		assert response.get_json() == {'title': 'Short', 'tags': [{'id': 1, 'name': 'work', 'chat_id': 1}]}
+
+		response = test_client.get('/reminders/', query_string={'fields': 'title,secret'})
+		assert response.status_code == 400
+
+def test_create_reminder_with_tag_names(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add(Tag(name='работа', chat_id=1))
+		db.session.commit()
+
+		response = test_client.post('/reminders/', json={
+			'user_id': user.id, 'chat_id': 1, 'title': 'Собрание', 'tags': ['работа', ' встреча ', 'работа'],
+		})
+		assert response.status_code == 201
+		assert sorted(t['name'] for t in response.get_json()['tags']) == ['встреча', 'работа']
+		assert Tag.query.filter_by(chat_id=1).count() == 2
+
+		# Тот же тег в другом чате — отдельный тег
+		response = test_client.post('/reminders/', json={
+			'user_id': user.id, 'chat_id': 2, 'title': 'Другое', 'tags': ['работа'],
+		})
+		assert response.get_json()['tags'][0]['chat_id'] == 2
+
+		response = test_client.post('/reminders/', json={
+			'user_id': user.id, 'chat_id': 1, 'title': 'Пустой', 'tags': ['  '],
+		})
+		assert response.status_code == 400
+
+def test_update_reminder_replaces_tags(test_client, create_user):
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		reminder_id = test_client.post('/reminders/', json={
+			'user_id': user.id, 'chat_id': 1, 'title': 'R', 'tags': ['a', 'b'],
+		}).get_json()['id']
+
+		response = test_client.put(f'/reminders/{reminder_id}', json={'tags': ['b', {'name': 'c'}]})
+		assert sorted(t['name'] for t in response.get_json()['tags']) == ['b', 'c']
+
+		response = test_client.put(f'/reminders/{reminder_id}', json={'title': 'R2'})
+		assert sorted(t['name'] for t in response.get_json()['tags']) == ['b', 'c']
+
+def claim(client, worker, start, end, **options):
+	body = dict(worker=worker, **{'from': start.isoformat(), 'to': end.isoformat()}, **options)
+	response = client.post('/reminders/claim', json=body)
+	assert response.status_code == 200
+	return response.get_json()
+
+def test_claim_reminders_by_partition(test_client, create_user):
+	now = datetime.now()
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add_all([
+			Reminder(user_id=user.id, chat_id=chat_id, title=f'C{chat_id}', event_time=now + timedelta(minutes=1))
+			for chat_id in (1, 2, 3, -4, 5, 6)
+		])
+		db.session.add(Reminder(user_id=user.id, chat_id=1, title='Later', event_time=now + timedelta(hours=1)))
+		db.session.commit()
+
+	start, end = now - timedelta(minutes=10), now + timedelta(minutes=5)
+	first = claim(test_client, 'a', start, end, partition=0, partitions=2)
+	second = claim(test_client, 'b', start, end, partition=1, partitions=2)
+	assert sorted(r['chat_id'] for r in first) == [-4, 2, 6]
+	assert sorted(r['chat_id'] for r in second) == [1, 3, 5]
+	# Уже забранное повторно не выдаётся
+	assert claim(test_client, 'c', start, end) == []
+
+	response = test_client.post('/reminders/claim', json={'worker': 'a', 'from': start.isoformat(), 'to': end.isoformat(), 'partition': 2, 'partitions': 2})
+	assert response.status_code == 400
+	response = test_client.post('/reminders/claim', json={'worker': 'a', 'to': end.isoformat()})
+	assert response.status_code == 400
+
+def test_claim_respects_lower_bound(test_client, create_user):
+	# Созданное задним числом в пределах catch_up уходит, давно пропущенное — нет
+	now = datetime.now()
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add_all([
+			Reminder(user_id=user.id, chat_id=3, title='Late', event_time=now - timedelta(minutes=5)),
+			Reminder(user_id=user.id, chat_id=3, title='Ancient', event_time=datetime(2020, 1, 1)),
+		])
+		db.session.commit()
+
+	start, end = now - timedelta(minutes=10), now + timedelta(minutes=5)
+	assert [r['title'] for r in claim(test_client, 'a', start, end, partition=1, partitions=2)] == ['Late']
+
+def test_claim_is_compare_and_set(test_client, create_user):
+	# Эмуляция гонки на SQLite: воркер b прочитал кандидатов до того, как их забрал a
+	now = datetime.now()
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add(Reminder(user_id=user.id, chat_id=1, title='Race', event_time=now + timedelta(minutes=1)))
+		db.session.commit()
+		start, end = now - timedelta(minutes=10), now + timedelta(minutes=5)
+		stale = claim_candidates(start, end, now)
+		assert len(stale) == 1
+
+		assert [r['title'] for r in claim(test_client, 'a', start, end)] == ['Race']
+		assert lease_reminders(stale, 'b', end + timedelta(seconds=60), datetime.now()) == []
+
+def test_claim_with_fractional_times(test_client, create_user):
+	now = datetime(2030, 6, 1, 9, 0, 0, 654321)
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		db.session.add(Reminder(user_id=user.id, chat_id=1, title='Frac', event_time=now + timedelta(seconds=30)))
+		db.session.commit()
+		[reminder_id] = claim_candidates(now, now + timedelta(minutes=1), now)
+		assert lease_reminders([reminder_id], 'a', now + timedelta(minutes=2), now) == [reminder_id]
+		# В базу уходит время без долей секунды — как его сохранит MariaDB
+		assert db.session.get(Reminder, reminder_id).lease_until == datetime(2030, 6, 1, 9, 2)
+
+def test_expired_lease_is_recovered(test_client, create_user):
+	now = datetime.now()
+	with test_client.application.app_context():
+		user = db.session.merge(create_user)
+		# Воркер dead забрал напоминание и упал, не отправив; срабатывание уже вне окна
+		reminder = Reminder(user_id=user.id, chat_id=1, title='Lost', event_time=now - timedelta(minutes=30),
+			claimed_by='dead', lease_until=now - timedelta(seconds=1))
+		db.session.add(reminder)
+		db.session.commit()
+		reminder_id = reminder.id
+
+	# Истёкшую аренду забирает любой узел, не только владелец доли чата
+	start, end = now - timedelta(minutes=10), now + timedelta(minutes=5)
+	assert [r['id'] for r in claim(test_client, 'b', start, end, partition=0, partitions=2)] == [reminder_id]
+
+	response = test_client.post(f'/reminders/{reminder_id}/delivered', query_string={'worker': 'dead'})
+	assert response.status_code == 409
+	response = test_client.post(f'/reminders/{reminder_id}/delivered', query_string={'worker': 'b'})
+	assert response.status_code == 200
+	assert claim(test_client, 'c', start, end) == []
+
+def test_list_revalidates_with_etag(test_client, create_user):
+	with test_client.application.app_context():
+		user_id = db.session.merge(create_user).id
+	created = test_client.post('/reminders/', json={'user_id': user_id, 'chat_id': 1, 'title': 'A', 'tags': ['work']}).get_json()
+	params = {'user_id': user_id}
+
+	def etag_after(write):
+		etag = test_client.get('/reminders/', query_string=params).headers['ETag']
+		write()
+		response = test_client.get('/reminders/', query_string=params, headers={'If-None-Match': etag})
+		assert response.status_code == 200
+		assert response.headers['ETag'] != etag
+		return response
+
+	response = test_client.get('/reminders/', query_string=params)
+	assert response.headers['Cache-Control'] == 'private, no-cache'
+	cached = test_client.get('/reminders/', query_string=params, headers={'If-None-Match': response.headers['ETag']})
+	assert cached.status_code == 304
+	assert cached.data == b''
+	# Только чтение версии — без списка и сериализации
+	assert cached.headers['X-Query-Count'] == '1'
+	# У другой страницы той же области — свой ETag
+	other = test_client.get('/reminders/', query_string={'user_id': user_id, 'limit': 1})
+	assert other.headers['ETag'] != response.headers['ETag']
+
+	etag_after(lambda: test_client.put(f"/reminders/{created['id']}", json={'tags': ['home']}))
+	etag_after(lambda: test_client.put(f"/tags/{test_client.get('/tags/', query_string={'chat_id': 1}).get_json()[0]['id']}", json={'name': 'house'}))
+	etag_after(lambda: test_client.post('/reminders/bulk', json=[{'user_id': user_id, 'chat_id': 2, 'title': 'B'}]))
+	etag_after(lambda: test_client.put('/reminders/bulk', query_string={'user_id': user_id}, json=[{'id': created['id'], 'title': 'A2'}]))
+	etag_after(lambda: test_client.delete(f"/reminders/{created['id']}", query_string={'user_id': user_id}))
+	response = etag_after(lambda: test_client.delete('/reminders/bulk', query_string={'user_id': user_id}))
+	assert response.get_json() == []
+
+	# Списки чата версионируются отдельно и меняются вместе с напоминаниями чата
+	params = {'chat_id': 2}
+	etag_after(lambda: test_client.post('/reminders/', json={'user_id': user_id, 'chat_id': 2, 'title': 'C'}))
+
+def test_fire_times_follow_user_timezone(test_client, create_user):
+	with test_client.application.app_context():
+		user_id = db.session.merge(create_user).id
+	response = test_client.put(f'/users/{user_id}', json={'timezone': 'Europe/Berlin'})
+	assert response.get_json()['timezone'] == 'Europe/Berlin'
+	reminder = test_client.post('/reminders/', json={
+		'user_id': user_id, 'chat_id': 1, 'title': 'Berlin', 'event_time': '2030-06-01T09:00:00',
+	}).get_json()
+	# Время в местном, срабатывание — в UTC (летом Берлин UTC+2)
+	assert reminder['event_time'] == '2030-06-01T09:00:00'
+	assert reminder['next_fire_at'] == '2030-06-01T07:00:00'
+	bulk = test_client.post('/reminders/bulk', json=[
+		{'user_id': user_id, 'chat_id': 1, 'title': 'Bulk', 'event_time': '2030-01-01T09:00:00'},
+	]).get_json()
+	assert bulk['created'][0]['next_fire_at'] == '2030-01-01T08:00:00'
+
+	response = test_client.get('/reminders/due', query_string={'from': '2030-06-01T06:55:00', 'to': '2030-06-01T07:05:00'})
+	assert [r['title'] for r in response.get_json()] == ['Berlin']
+
+	# Смена зоны: местное время прежнее, момент в UTC пересчитан
+	test_client.put(f'/users/{user_id}', json={'timezone': 'Asia/Tokyo'})
+	response = test_client.get(f"/reminders/{reminder['id']}")
+	assert response.get_json()['event_time'] == '2030-06-01T09:00:00'
+	assert response.get_json()['next_fire_at'] == '2030-06-01T00:00:00'
+
+	response = test_client.put(f'/users/{user_id}', json={'timezone': 'Mars/Olympus'})
+	assert response.status_code == 400
+
+def test_cron_keeps_local_hour_across_dst(test_client, create_user):
+	with test_client.application.app_context():
+		user_id = db.session.merge(create_user).id
+	test_client.put(f'/users/{user_id}', json={'timezone': 'Europe/Berlin'})
+
+	def fire_times(event_time, deliveries):
+		reminder = test_client.post('/reminders/', json={
+			'user_id': user_id, 'chat_id': 1, 'title': 'Daily', 'event_time': event_time, 'repeat_type': '30 2 * * *',
+		}).get_json()
+		times = [(reminder['event_time'], reminder['next_fire_at'])]
+		for _ in range(deliveries):
+			reminder = test_client.post(f"/reminders/{reminder['id']}/delivered").get_json()
+			times.append((reminder['event_time'], reminder['next_fire_at']))
+		return times
+
+	# Весной 02:30 в ночь перевода не существует — срабатываем в 03:30 по новому времени
+	assert fire_times('2030-03-30T02:30:00', 2) == [
+		('2030-03-30T02:30:00', '2030-03-30T01:30:00'),
+		('2030-03-31T02:30:00', '2030-03-31T01:30:00'),
+		('2030-04-01T02:30:00', '2030-04-01T00:30:00'),
+	]
+	# Осенью 02:30 бывает дважды — срабатываем один раз, в первое
+	assert fire_times('2030-10-26T02:30:00', 2) == [
+		('2030-10-26T02:30:00', '2030-10-26T00:30:00'),
+		('2030-10-27T02:30:00', '2030-10-27T00:30:00'),
+		('2030-10-28T02:30:00', '2030-10-28T01:30:00'),
+	]
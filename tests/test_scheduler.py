@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta
+from scheduler import ReminderScheduler, fire_time
+
+class FakeSource:
+    def __init__(self, reminders):
+        self.reminders = reminders
+        self.windows = []
+        self.delivered = []
+
+    async def fetch_due(self, start, end):
+        self.windows.append((start, end))
+        for reminder in self.reminders:
+            if reminder['id'] not in self.delivered and start <= fire_time(reminder) < end:
+                yield reminder
+
+    async def fetch(self, reminder_id):
+        return next((r for r in self.reminders if r['id'] == reminder_id), None)
+
+    async def mark_delivered(self, reminder_id):
+        self.delivered.append(reminder_id)
+        return next(r for r in self.reminders if r['id'] == reminder_id)
+
+def make_reminder(id, when):
+    return {'id': id, 'chat_id': 100 + id, 'title': f'R{id}', 'event_time': when.isoformat(), 'notification_time': None}
+
+def test_scheduler_delivers_in_time_order():
+    async def scenario():
+        now = datetime.now()
+        source = FakeSource([
+            make_reminder(1, now + timedelta(milliseconds=200)),
+            make_reminder(2, now + timedelta(milliseconds=50)),
+            make_reminder(3, now + timedelta(hours=1)),
+        ])
+        sent = []
+
+        async def send(chat_id, text, **kwargs):
+            sent.append(chat_id)
+            dues.append(kwargs.get('due'))
+
+        dues = []
+        scheduler = ReminderScheduler(source, send, window=timedelta(minutes=5))
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        # В памяти только окно ближайших 5 минут
+        assert scheduler.depth == 2
+        await asyncio.sleep(0.3)
+        await scheduler.stop()
+        assert sent == [102, 101]
+        assert dues == [fire_time(source.reminders[1]), fire_time(source.reminders[0])]
+        assert source.delivered == [2, 1]
+        assert scheduler.depth == 0
+        assert scheduler.stats()['delivered'] == 2
+        assert scheduler.lag < 0.1
+
+    asyncio.run(scenario())
+
+def test_scheduler_picks_up_added_reminder():
+    async def scenario():
+        source = FakeSource([])
+        sent = []
+
+        async def send(chat_id, text, **kwargs):
+            sent.append(text)
+
+        scheduler = ReminderScheduler(source, send)
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        reminder = make_reminder(7, datetime.now() + timedelta(milliseconds=50))
+        source.reminders.append(reminder)
+        scheduler.add(reminder)
+        await asyncio.sleep(0.2)
+        await scheduler.stop()
+        assert sent == ['⏰ Напоминание: R7']
+
+    asyncio.run(scenario())
+
+def test_scheduler_slides_window():
+    async def scenario():
+        clock = [datetime(2024, 6, 1, 9, 0)]
+        source = FakeSource([make_reminder(1, datetime(2024, 6, 1, 9, 7))])
+
+        async def send(chat_id, text, **kwargs):
+            pass
+
+        scheduler = ReminderScheduler(
+            source, send, window=timedelta(minutes=5), catch_up=timedelta(0), poll=timedelta(minutes=10), clock=lambda: clock[0],
+        )
+        scheduler._loaded_until = clock[0]
+        timeout = await scheduler.run_once()
+        assert scheduler.depth == 0
+        assert timeout == 150
+        clock[0] = datetime(2024, 6, 1, 9, 3)
+        await scheduler.run_once()
+        assert scheduler.depth == 1
+        assert source.windows[-1] == (datetime(2024, 6, 1, 9, 3), datetime(2024, 6, 1, 9, 8))
+
+    asyncio.run(scenario())
+
+def test_scheduler_polls_loaded_window():
+    # Напоминание появилось в уже загруженной части окна без add(): его создал
+    # другой процесс
+    async def scenario():
+        clock = [datetime(2024, 6, 1, 9, 0)]
+        source = FakeSource([])
+
+        async def send(chat_id, text, **kwargs):
+            pass
+
+        scheduler = ReminderScheduler(source, send, poll=timedelta(seconds=30), clock=lambda: clock[0])
+        scheduler._loaded_until = clock[0]
+        assert await scheduler.run_once() == 30
+        source.reminders.append(make_reminder(1, datetime(2024, 6, 1, 9, 2)))
+        clock[0] = datetime(2024, 6, 1, 9, 0, 20)
+        await scheduler.run_once()
+        assert scheduler.depth == 0
+        clock[0] = datetime(2024, 6, 1, 9, 0, 30)
+        await scheduler.run_once()
+        assert scheduler.depth == 1
+        # Повторный опрос не ставит его в очередь второй раз
+        clock[0] = datetime(2024, 6, 1, 9, 1)
+        await scheduler.run_once()
+        assert scheduler.depth == 1
+
+    asyncio.run(scenario())
+
+def test_scheduler_confirms_before_sending():
+    # После загрузки окна одно напоминание удалили, другое перенесли
+    async def scenario():
+        clock = [datetime(2024, 6, 1, 9, 0)]
+        gone = make_reminder(1, datetime(2024, 6, 1, 9, 1))
+        moved = make_reminder(2, datetime(2024, 6, 1, 9, 1))
+        source = FakeSource([gone, moved])
+        sent = []
+
+        async def send(chat_id, text, **kwargs):
+            sent.append((chat_id, kwargs['due']))
+
+        scheduler = ReminderScheduler(source, send, catch_up=timedelta(0), clock=lambda: clock[0])
+        scheduler._loaded_until = clock[0]
+        await scheduler.run_once()
+        assert scheduler.depth == 2
+        source.reminders.remove(gone)
+        source.reminders[0] = dict(moved, event_time=datetime(2024, 6, 1, 9, 3).isoformat())
+
+        clock[0] = datetime(2024, 6, 1, 9, 1)
+        await scheduler.run_once()
+        await asyncio.gather(*scheduler._sending)
+        assert sent == []
+        assert scheduler.depth == 1
+        clock[0] = datetime(2024, 6, 1, 9, 3)
+        await scheduler.run_once()
+        await asyncio.gather(*scheduler._sending)
+        assert sent == [(102, datetime(2024, 6, 1, 9, 3))]
+
+    asyncio.run(scenario())
@@ -0,0 +1,116 @@
+import asyncio
+import time
+import pytest
+from datetime import timedelta
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from send_queue import PRIORITY_INTERACTIVE, SendQueue, percentile
+
+class FakeBotApi:
+    # Bot API с лимитами: не чаще chat_rate в секунду на чат и не больше rate
+    # сообщений за любую секунду; нарушение — RetryAfter, как у Telegram
+    def __init__(self, rate, chat_rate, retry_after=0.05):
+        self.rate = rate
+        self.chat_interval = 1 / chat_rate
+        self.retry_after = retry_after
+        self.sent = []
+        self.rejected = 0
+        self.fail_first = set()
+
+    async def send_message(self, chat_id, text, **kwargs):
+        now = time.monotonic()
+        last = [at for chat, _, at in self.sent if chat == chat_id]
+        recent = [at for _, _, at in self.sent if now - at < 1.0]
+        # 5% допуска на неточность таймеров
+        too_fast = last and now - last[-1] < self.chat_interval * 0.95
+        if chat_id in self.fail_first or too_fast or len(recent) >= self.rate:
+            self.fail_first.discard(chat_id)
+            self.rejected += 1
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), 'Too Many Requests', self.retry_after)
+        self.sent.append((chat_id, text, now))
+        return {'chat_id': chat_id, 'text': text}
+
+def run(scenario):
+    return asyncio.run(scenario())
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2, 4], 0.5) == 3
+    assert percentile(list(range(100)), 0.99) == 99
+
+def test_queue_respects_chat_and_global_limits():
+    async def scenario():
+        api = FakeBotApi(rate=40, chat_rate=20)
+        queue = SendQueue(api.send_message, rate=40, chat_rate=20)
+        await queue.start()
+        futures = [queue.submit(chat_id, f'{chat_id}-{n}') for n in range(5) for chat_id in (1, 2, 3)]
+        results = await asyncio.gather(*futures)
+        await queue.stop()
+        return api, queue, results
+
+    api, queue, results = run(scenario)
+    assert api.rejected == 0
+    assert len(results) == 15
+    for chat_id in (1, 2, 3):
+        assert [text for chat, text, _ in api.sent if chat == chat_id] == [f'{chat_id}-{n}' for n in range(5)]
+    assert queue.stats()['sent'] == 15
+
+def test_retry_after_reschedules_only_that_chat():
+    async def scenario():
+        api = FakeBotApi(rate=100, chat_rate=100, retry_after=0.2)
+        api.fail_first.add(1)
+        # Часы очереди стоят: пауза чата 1 не кончится, пока их не сдвинем
+        clock = [0.0]
+        queue = SendQueue(api.send_message, rate=100, chat_rate=100, clock=lambda: clock[0])
+        await queue.start()
+        slow = queue.submit(1, 'slow')
+        await asyncio.sleep(0.02)
+        await asyncio.gather(*(queue.submit(chat_id, 'fast') for chat_id in (2, 3, 4)))
+        # Пока чат 1 на паузе, остальные чаты не ждут
+        paused = not slow.done()
+        clock[0] += 1
+        await slow
+        await queue.stop()
+        return api, queue, paused
+
+    api, queue, paused = run(scenario)
+    assert paused
+    assert [chat for chat, _, _ in api.sent] == [2, 3, 4, 1]
+    assert queue.stats()['retried'] == 1
+
+def test_priority_then_due_order():
+    async def scenario():
+        api = FakeBotApi(rate=100, chat_rate=100)
+        queue = SendQueue(api.send_message, rate=100, chat_rate=100)
+        now = queue.now()
+        futures = [
+            queue.submit(1, 'late reminder', due=now),
+            queue.submit(2, 'early reminder', due=now - timedelta(seconds=5)),
+            queue.submit(3, 'reply', priority=PRIORITY_INTERACTIVE, due=now),
+        ]
+        await queue.start()
+        await asyncio.gather(*futures)
+        await queue.stop()
+        return api, queue
+
+    api, queue = run(scenario)
+    assert [text for _, text, _ in api.sent] == ['reply', 'early reminder', 'late reminder']
+    stats = queue.stats()
+    assert stats['lag_max'] >= 5
+    assert stats['lag_p50'] < stats['lag_max']
+
+def test_gives_up_after_max_retries():
+    async def scenario():
+        async def always_flooded(chat_id, text):
+            raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), 'Too Many Requests', 0.01)
+
+        queue = SendQueue(always_flooded, chat_rate=100, max_retries=2)
+        await queue.start()
+        with pytest.raises(TelegramRetryAfter):
+            await queue.submit(1, 'x')
+        await queue.stop()
+        return queue.stats()
+
+    stats = run(scenario)
+    assert stats['retried'] == 2
+    assert stats['failed'] == 1
@@ -0,0 +1,63 @@
+import pytest
+from datetime import datetime
+from flask import jsonify
+from app import create_app
+from models import db, Reminder, Tag, User
+from config import TestConfig
+from schemas import ReminderSchema, UserSchema
+from serializers import reminders_json, serializer, users_json
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        user = User(telegram_id=1, username='Юзер "quoted" \\ \n\t')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            Reminder(user_id=user.id, chat_id=-100, title='Стоматолог 🦷', description='Line\nbreak </script>',
+                event_time=datetime(2030, 6, 1, 9, 30, 0, 123), repeat_type='0 9 * * 1',
+                tags=[Tag(name='здоровье', chat_id=-100), Tag(name='"x"', chat_id=-100)]),
+            Reminder(user_id=user.id, chat_id=1, title='Без времени'),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def reference(schema, objects, only=None):
+    return jsonify(schema(many=True, only=only).dump(objects)).get_data()
+
+def test_reminders_match_jsonify(app):
+    reminders = db.session.scalars(db.select(Reminder)).all()
+    for only in (None, ['id', 'title', 'event_time'], ['tags'], ['description', 'next_fire_at']):
+        assert reminders_json(reminders, only).get_data() == reference(ReminderSchema, reminders, only)
+    assert reminders_json([]).get_data() == reference(ReminderSchema, [])
+
+def test_users_and_rows_match_jsonify(app):
+    users = db.session.scalars(db.select(User)).all()
+    assert users_json(users).get_data() == reference(UserSchema, users)
+    # Строки Row читаются так же, как ORM-объекты
+    rows = db.session.execute(db.select(Reminder.id, Reminder.title)).all()
+    dumped = ReminderSchema(many=True, only=['id', 'title']).dump(rows)
+    assert serializer(ReminderSchema, ['id', 'title']).dumps_many(rows) + '\n' == jsonify(dumped).get_data(as_text=True)
+
+def test_large_lists_are_streamed(app):
+    app.config['JSON_STREAM_THRESHOLD'] = 1
+    reminders = db.session.scalars(db.select(Reminder)).all()
+    with app.test_request_context():
+        response = reminders_json(reminders, headers={'X-Next-Cursor': 'abc'})
+        assert response.is_streamed
+        assert response.headers['X-Next-Cursor'] == 'abc'
+        assert b''.join(response.iter_encoded()) == reference(ReminderSchema, reminders)
+
+    client = app.test_client()
+    response = client.get('/reminders/', query_string={'user_id': 1})
+    assert response.is_streamed
+    ordered = db.session.scalars(db.select(Reminder).order_by(Reminder.event_time, Reminder.id)).all()
+    assert response.get_data() == reference(ReminderSchema, ordered)
+
+def test_debug_output_falls_back_to_jsonify(app):
+    app.debug = True
+    reminders = db.session.scalars(db.select(Reminder)).all()
+    assert reminders_json(reminders).get_data() == reference(ReminderSchema, reminders)
+    assert b'\n  ' in reminders_json(reminders).get_data()
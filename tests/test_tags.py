@@ -1,6 +1,6 @@
 import pytest
 from app import create_app
-from models import db, Tag
+from models import db, Tag, Reminder, User
 from config import TestConfig
 
 @pytest.fixture
@@ -63,3 +63,60 @@ def test_delete_tag(test_client):
         response = test_client.delete(f'/tags/{tag.id}')
         assert response.status_code == 204
         assert db.session.get(Tag, tag.id) is None
+
+def test_create_duplicate_tag(test_client):
+    test_client.post('/tags/', json={'name': 'Work', 'chat_id': 1})
+    response = test_client.post('/tags/', json={'name': 'Work', 'chat_id': 1})
+    assert response.status_code == 409
+    response = test_client.post('/tags/', json={'name': 'Work', 'chat_id': 2})
+    assert response.status_code == 201
+
+def test_list_tags_with_counts(test_client):
+    with test_client.application.app_context():
+        user = User(telegram_id=1, username='u')
+        work, home, wish = Tag(name='work', chat_id=1), Tag(name='home', chat_id=1), Tag(name='wish_list', chat_id=1)
+        db.session.add_all([
+            Reminder(user=user, chat_id=1, title='A', tags=[work, home]),
+            Reminder(user=user, chat_id=1, title='B', tags=[work]),
+            wish,
+            Tag(name='work', chat_id=2),
+        ])
+        db.session.commit()
+
+    response = test_client.get('/tags/', query_string={'chat_id': 1})
+    assert response.status_code == 200
+    assert [(t['name'], t['reminders_count']) for t in response.get_json()] == [('work', 2), ('home', 1), ('wish_list', 0)]
+
+    response = test_client.get('/tags/', query_string={'chat_id': 1, 'q': 'w'})
+    assert [t['name'] for t in response.get_json()] == ['work', 'wish_list']
+
+    # _ в запросе — обычный символ, а не шаблон LIKE
+    response = test_client.get('/tags/', query_string={'chat_id': 1, 'q': 'wish_'})
+    assert [t['name'] for t in response.get_json()] == ['wish_list']
+    response = test_client.get('/tags/', query_string={'chat_id': 1, 'q': 'wor_'})
+    assert response.get_json() == []
+
+    response = test_client.get('/tags/')
+    assert response.status_code == 400
+
+def test_tags_revalidate_with_etag(test_client):
+    with test_client.application.app_context():
+        user = User(telegram_id=1, username='u')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    test_client.post('/reminders/', json={'user_id': user_id, 'chat_id': 1, 'title': 'A', 'tags': ['work']})
+
+    etag = test_client.get('/tags/', query_string={'chat_id': 1}).headers['ETag']
+    assert test_client.get('/tags/', query_string={'chat_id': 1}, headers={'If-None-Match': etag}).status_code == 304
+    # Новое напоминание чата меняет счётчики тегов
+    test_client.post('/reminders/', json={'user_id': user_id, 'chat_id': 1, 'title': 'B', 'tags': ['work']})
+    response = test_client.get('/tags/', query_string={'chat_id': 1}, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['reminders_count'] == 2
+
+    etag = response.headers['ETag']
+    test_client.delete(f"/tags/{response.get_json()[0]['id']}")
+    response = test_client.get('/tags/', query_string={'chat_id': 1}, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json() == []
@@ -0,0 +1,33 @@
+from user_cache import UserCache
+
+def test_hit_and_miss_counters():
+    cache = UserCache()
+    assert cache.get(1) is None
+    cache.put(1, {'id': 10})
+    assert cache.get(1) == {'id': 10}
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+def test_entries_expire():
+    now = [0.0]
+    cache = UserCache(ttl=60, clock=lambda: now[0])
+    cache.put(1, {'id': 10})
+    now[0] = 59
+    assert cache.get(1) is not None
+    now[0] = 61
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+def test_least_recently_used_is_evicted():
+    cache = UserCache(maxsize=2)
+    cache.put(1, {'id': 10})
+    cache.put(2, {'id': 20})
+    cache.get(1)
+    cache.put(3, {'id': 30})
+    assert cache.get(2) is None
+    assert cache.get(1) == {'id': 10}
+
+def test_invalidate():
+    cache = UserCache()
+    cache.put(1, {'id': 10})
+    cache.invalidate(1)
+    assert cache.get(1) is None
@@ -59,3 +59,49 @@ def test_delete_user(test_client):
         response = test_client.delete(f'/users/{user.id}')
         assert response.status_code == 204
         assert db.session.get(User, user.id) is None
+
+def test_get_user_by_telegram_id(test_client):
+    with test_client.application.app_context():
+        user = User(telegram_id=555, username='tg')
+        db.session.add(user)
+        db.session.commit()
+
+        response = test_client.get('/users/telegram/555')
+        assert response.status_code == 200
+        assert response.get_json()['id'] == user.id
+
+        response = test_client.get('/users/telegram/556')
+        assert response.status_code == 404
+
+def test_get_or_create_user_by_telegram_id(test_client):
+    response = test_client.put('/users/telegram/777', json={'username': 'first'})
+    assert response.status_code == 201
+    created = response.get_json()
+    assert created['telegram_id'] == 777
+
+    response = test_client.put('/users/telegram/777', json={'username': 'renamed'})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['id'] == created['id']
+    assert data['username'] == 'renamed'
+
+def test_create_duplicate_user(test_client):
+    test_client.post('/users/', json={'telegram_id': 42, 'username': 'a'})
+    response = test_client.post('/users/', json={'telegram_id': 42, 'username': 'b'})
+    assert response.status_code == 409
+
+def test_user_lookup_revalidates_with_etag(test_client):
+    user = test_client.put('/users/telegram/888', json={'username': 'a'}).get_json()
+    for path in (f"/users/{user['id']}", '/users/telegram/888'):
+        etag = test_client.get(path).headers['ETag']
+        assert test_client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+        test_client.put('/users/telegram/888', json={'username': 'b'})
+        response = test_client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['username'] == 'b'
+        test_client.put('/users/telegram/888', json={'username': 'a'})
+
+    etag = test_client.get('/users/telegram/888').headers['ETag']
+    test_client.delete(f"/users/{user['id']}")
+    assert test_client.get('/users/telegram/888', headers={'If-None-Match': etag}).status_code == 404
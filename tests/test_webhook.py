@@ -0,0 +1,143 @@
+import asyncio
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Bot, Dispatcher, F, types
+from aiogram.types import CallbackQuery
+from webhook import SECRET_HEADER, UpdateWorkers, chat_key, make_app
+
+TOKEN = '123456:ABCdefGhIJKlmnoPQRstuVWXyz012345678'
+
+def message_update(update_id, chat_id, text):
+    # Апдейт в том виде, в каком его присылает Telegram
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1717236000,
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': 'Test'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'},
+            'text': text,
+        },
+    }
+
+def callback_update(update_id, chat_id, data):
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'chat_instance': '1',
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Test'},
+            'message': message_update(update_id, chat_id, 'list')['message'],
+            'data': data,
+        },
+    }
+
+def run_webhook(handle, scenario, secret='s3cret', **options):
+    async def main():
+        workers = UpdateWorkers(handle, **options)
+        await workers.start()
+        async with TestClient(TestServer(make_app(workers, secret))) as client:
+            result = await scenario(client, workers)
+        await workers.stop()
+        return result
+    return asyncio.run(main())
+
+def test_chat_key():
+    assert chat_key(message_update(1, 42, 'hi')) == 42
+    assert chat_key(callback_update(2, 43, 'x')) == 43
+    assert chat_key({'update_id': 3, 'inline_query': {'id': '1', 'from': {'id': 44}, 'query': ''}}) == 44
+
+def test_secret_token_is_checked():
+    async def handle(update):
+        pass
+
+    async def scenario(client, workers):
+        missing = await client.post('/webhook', json=message_update(1, 1, 'hi'))
+        wrong = await client.post('/webhook', json=message_update(1, 1, 'hi'), headers={SECRET_HEADER: 'nope'})
+        unicode = await client.post('/webhook', json=message_update(1, 1, 'hi'), headers={SECRET_HEADER: 'sécret'})
+        broken = await client.post('/webhook', data='{', headers={SECRET_HEADER: 's3cret'})
+        ok = await client.post('/webhook', json=message_update(1, 1, 'hi'), headers={SECRET_HEADER: 's3cret'})
+        return missing.status, wrong.status, unicode.status, broken.status, ok.status
+
+    assert run_webhook(handle, scenario) == (403, 403, 403, 400, 200)
+
+def test_secret_is_required():
+    with pytest.raises(ValueError):
+        make_app(UpdateWorkers(lambda update: None), None)
+
+def test_updates_are_ordered_per_chat_and_parallel_across_chats():
+    handled = []
+    running = 0
+    peak = 0
+
+    async def handle(update):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        handled.append((chat_key(update), update['update_id']))
+        running -= 1
+
+    async def scenario(client, workers):
+        update_id = 0
+        for _ in range(5):
+            for chat_id in (1, 2, 3, 4):
+                update_id += 1
+                response = await client.post(
+                    '/webhook', json=message_update(update_id, chat_id, 'hi'), headers={SECRET_HEADER: 's3cret'},
+                )
+                assert response.status == 200
+        await asyncio.gather(*(queue.join() for queue in workers._queues))
+
+    run_webhook(handle, scenario, workers=4)
+    assert len(handled) == 20
+    for chat_id in (1, 2, 3, 4):
+        ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert ids == sorted(ids)
+    assert peak > 1
+
+def test_full_queue_is_rejected():
+    release = None
+
+    async def handle(update):
+        await release.wait()
+
+    async def scenario(client, workers):
+        nonlocal release
+        release = asyncio.Event()
+        statuses = []
+        for update_id in range(1, 5):
+            response = await client.post('/webhook', json=message_update(update_id, 1, 'hi'), headers={SECRET_HEADER: 's3cret'})
+            statuses.append(response.status)
+            await asyncio.sleep(0.01)
+        release.set()
+        return statuses, workers.rejected
+
+    statuses, rejected = run_webhook(handle, scenario, workers=1, queue_size=2)
+    # Первый апдейт уже у воркера, ещё два ждут в очереди, четвёртый не влезает
+    assert statuses == [200, 200, 200, 503]
+    assert rejected == 1
+
+def test_recorded_updates_reach_dispatcher_handlers():
+    seen = []
+    dp = Dispatcher()
+
+    @dp.message()
+    async def on_message(message: types.Message):
+        seen.append(('message', message.chat.id, message.text))
+
+    @dp.callback_query(F.data.startswith('delete_reminder:'))
+    async def on_callback(callback: CallbackQuery):
+        seen.append(('callback', callback.message.chat.id, callback.data))
+
+    async def scenario(client, workers):
+        bot = Bot(token=TOKEN)
+        workers.handle = lambda update: dp.feed_raw_update(bot, update)
+        for update in (message_update(1, 7, 'завтра в 9 спорт'), callback_update(2, 7, 'delete_reminder:5')):
+            response = await client.post('/webhook', json=update, headers={SECRET_HEADER: 's3cret'})
+            assert response.status == 200
+        await asyncio.gather(*(queue.join() for queue in workers._queues))
+        await bot.session.close()
+
+    run_webhook(None, scenario)
+    assert seen == [('message', 7, 'завтра в 9 спорт'), ('callback', 7, 'delete_reminder:5')]
@@ -0,0 +1,17 @@
+from datetime import datetime
+from zones import is_valid_timezone, to_utc
+
+def test_to_utc_handles_dst_transitions():
+    assert to_utc(datetime(2030, 6, 1, 9), 'Europe/Berlin') == datetime(2030, 6, 1, 7)
+    assert to_utc(datetime(2030, 1, 1, 9), 'Europe/Berlin') == datetime(2030, 1, 1, 8)
+    # Несуществующее время уезжает вперёд на час, неоднозначное — первое из двух
+    assert to_utc(datetime(2030, 3, 31, 2, 30), 'Europe/Berlin') == datetime(2030, 3, 31, 1, 30)
+    assert to_utc(datetime(2030, 10, 27, 2, 30), 'Europe/Berlin') == datetime(2030, 10, 27, 0, 30)
+    assert to_utc(None, 'Europe/Berlin') is None
+
+def test_default_zone_and_validation():
+    # Без DEFAULT_TIMEZONE в окружении зона по умолчанию — UTC
+    assert to_utc(datetime(2030, 6, 1, 9)) == datetime(2030, 6, 1, 9)
+    assert is_valid_timezone('Asia/Yekaterinburg')
+    assert not is_valid_timezone('Mars/Olympus')
+    assert not is_valid_timezone('../etc/passwd')
@@ -0,0 +1,52 @@
+import time
+from collections import OrderedDict
+
+
+class UserCache:
+    # telegram_id -> пользователь из API. Ограничен по размеру (LRU) и по времени жизни
+    # записи: удаление пользователя в API бот видит не позже чем через ttl секунд,
+    # а при ответе API «user not found» запись сбрасывается сразу.
+
+    def __init__(self, maxsize=10000, ttl=600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, telegram_id):
+        item = self._items.get(telegram_id)
+        if item is not None:
+            expires_at, user = item
+            if expires_at > self.clock():
+                self._items.move_to_end(telegram_id)
+                self.hits += 1
+                return user
+            del self._items[telegram_id]
+        self.misses += 1
+        return None
+
+    def put(self, telegram_id, user):
+        self._items[telegram_id] = (self.clock() + self.ttl, user)
+        self._items.move_to_end(telegram_id)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def invalidate(self, telegram_id):
+        self._items.pop(telegram_id, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,126 @@
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from models import db, Reminder, ReminderTag, Tag, User, Version
+
+# ETag для GET-ответов по счётчикам версий (модель Version). Записи через ORM
+# поднимают версии сами — слушателями flush; массовые пути на Core-запросах
+# вызывают touch(). Условный GET читает одну строку Version и при совпадении
+# If-None-Match отвечает 304, не выполняя ни основной запрос, ни сериализацию.
+
+
+def reminder_scopes(user_ids, chat_ids):
+    return {('owner', user_id) for user_id in user_ids} | {('chat', chat_id) for chat_id in chat_ids}
+
+
+def values(obj, name):
+    # Текущее и прежнее (если поменялось в этом flush) значение атрибута
+    history = inspect(obj).attrs[name].history
+    return {value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None}
+
+
+def bump_statement(dialect, pairs):
+    rows = [{'scope': scope, 'key': key, 'version': 1} for scope, key in sorted(pairs)]
+    if dialect in ('mysql', 'mariadb'):
+        statement = mysql.insert(Version)
+        return statement.on_duplicate_key_update(version=Version.version + 1), rows
+    if dialect == 'sqlite':
+        statement = sqlite.insert(Version)
+        return statement.on_conflict_do_update(index_elements=['scope', 'key'], set_={'version': Version.version + 1}), rows
+    return None, rows
+
+
+def touch(session, pairs):
+    # Поднимает версии областей [(scope, key)] в текущей транзакции сессии.
+    # Для AsyncSession — через await db_session.run_sync(touch, pairs).
+    pairs = {(scope, key) for scope, key in pairs if key is not None}
+    if not pairs:
+        return
+    connection = session.connection()
+    statement, rows = bump_statement(connection.dialect.name, pairs)
+    if statement is not None:
+        connection.execute(statement, rows)
+        return
+    # Базы без upsert: обновляем существующие, недостающие вставляем
+    for row in rows:
+        result = connection.execute(
+            update(Version).where(Version.scope == row['scope'], Version.key == row['key']).values(version=Version.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(Version.__table__.insert(), row)
+
+
+def flushed_scopes(session):
+    scopes = set()
+    for obj in (*session.new, *session.deleted, *(obj for obj in session.dirty if session.is_modified(obj))):
+        if isinstance(obj, Reminder):
+            scopes |= reminder_scopes(values(obj, 'user_id'), values(obj, 'chat_id'))
+        elif isinstance(obj, Tag):
+            scopes |= {('chat', chat_id) for chat_id in values(obj, 'chat_id')}
+        elif isinstance(obj, User):
+            scopes |= {('user', user_id) for user_id in values(obj, 'id')}
+            scopes |= {('telegram', telegram_id) for telegram_id in values(obj, 'telegram_id')}
+    return scopes
+
+
+def tag_scopes(session, tag_ids):
+    # Владельцы напоминаний с этими тегами: переименование или удаление тега
+    # меняет их списки
+    owners = session.connection().execute(
+        select(Reminder.user_id).join(ReminderTag, ReminderTag.reminder_id == Reminder.id)
+        .where(ReminderTag.tag_id.in_(tag_ids)).distinct()
+    ).scalars()
+    return {('owner', user_id) for user_id in owners}
+
+
+@event.listens_for(Session, 'before_flush')
+def collect_tag_owners(session, flush_context, instances):
+    # Связи читаем до flush — удаление тега снимет их вместе с ним
+    tag_ids = [
+        tag.id for tag in (*session.deleted, *(obj for obj in session.dirty if session.is_modified(obj)))
+        if isinstance(tag, Tag) and tag.id is not None
+    ]
+    if tag_ids:
+        session.info.setdefault('touched', set()).update(tag_scopes(session, tag_ids))
+
+
+@event.listens_for(Session, 'after_flush')
+def bump_flushed(session, flush_context):
+    touch(session, flushed_scopes(session) | session.info.pop('touched', set()))
+
+
+def current_version(session, scope, key):
+    return session.scalar(select(Version.version).where(Version.scope == scope, Version.key == key)) or 0
+
+
+def make_etag(version, path):
+    # Версия области и хэш адреса с параметрами: у разных страниц и фильтров
+    # одной области разные тела, а значит и разные ETag
+    return f"{version}-{hashlib.sha1(path.encode()).hexdigest()[:12]}"
+
+
+def conditional(scope):
+    # scope(request.args, **view_args) -> (scope, key) или None
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            target = scope(request.args, **kwargs)
+            if target is None:
+                return view(*args, **kwargs)
+            # Версию читаем до данных: запись между ними даст лишнюю перезагрузку,
+            # но не устаревшее тело под новым ETag
+            etag = make_etag(current_version(db.session, *target), request.full_path)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+import asyncio
+import hmac
+import logging
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+WORKERS_KEY = web.AppKey('workers', object)
+SECRET_KEY = web.AppKey('secret', object)
+
+
+def chat_key(update):
+    # Ключ упорядочивания: чат апдейта (для callback — чат исходного сообщения),
+    # иначе отправитель. Разбираем сырой JSON, чтобы не строить модели aiogram до воркера.
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        chat = value.get('chat') or (value.get('message') or {}).get('chat')
+        if chat:
+            return chat['id']
+        sender = value.get('from')
+        if sender:
+            return sender['id']
+    return update.get('update_id', 0)
+
+
+class UpdateWorkers:
+    # N воркеров, у каждого своя ограниченная очередь. Чат всегда попадает к одному
+    # и тому же воркеру — внутри чата апдейты обрабатываются по порядку, разные
+    # чаты идут параллельно.
+
+    def __init__(self, handle, workers=8, queue_size=1000):
+        self.handle = handle
+        self.workers = workers
+        self.processed = 0
+        self.rejected = 0
+        self._queues = [asyncio.Queue(maxsize=max(queue_size // workers, 1)) for _ in range(workers)]
+        self._tasks = []
+
+    @property
+    def depth(self):
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+
+    async def stop(self, drain=True):
+        if drain:
+            await asyncio.gather(*(queue.join() for queue in self._queues))
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, update):
+        # False — очередь воркера переполнена, апдейт не принят
+        queue = self._queues[hash(chat_key(update)) % self.workers]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        return True
+
+    async def _worker(self, queue):
+        while True:
+            update = await queue.get()
+            try:
+                await self.handle(update)
+            except Exception:
+                logger.exception("Ошибка обработки апдейта %s", update.get('update_id'))
+            finally:
+                self.processed += 1
+                queue.task_done()
+
+
+def encoded(value):
+    # compare_digest со строками падает на не-ASCII; aiohttp отдаёт такие байты
+    # заголовка суррогатами
+    return value.encode('utf-8', 'surrogateescape')
+
+
+async def receive_update(request):
+    if not hmac.compare_digest(encoded(request.headers.get(SECRET_HEADER, '')), request.app[SECRET_KEY]):
+        return web.Response(status=403)
+    try:
+        update = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+    if not isinstance(update, dict):
+        return web.Response(status=400)
+    # Отвечаем Telegram сразу, обработка идёт в воркерах. При переполнении
+    # отвечаем ошибкой — Telegram повторит доставку позже.
+    if not request.app[WORKERS_KEY].submit(update):
+        return web.Response(status=503)
+    return web.Response()
+
+
+def make_app(workers, secret, path='/webhook'):
+    # Без секрета апдейты мог бы прислать кто угодно
+    if not secret:
+        raise ValueError("WEBHOOK_SECRET is required in webhook mode")
+    app = web.Application()
+    app[WORKERS_KEY] = workers
+    app[SECRET_KEY] = encoded(secret)
+    app.router.add_post(path, receive_update)
+    return app
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from config import Config
+
+# Часовые пояса пользователей. event_time, notification_time и правила cron живут
+# в местном времени пользователя (как он их назвал), а next_fire_at — в UTC:
+# окно планировщика остаётся одним диапазоном по индексу, сколько бы ни было поясов.
+
+
+@lru_cache(maxsize=512)
+def zone(name=None):
+    return ZoneInfo(name or Config.DEFAULT_TIMEZONE)
+
+
+def is_valid_timezone(name):
+    try:
+        zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def local_now(name=None):
+    return datetime.now(zone(name)).replace(tzinfo=None)
+
+
+def to_utc(local, name=None):
+    # Местное время -> наивное UTC. При переводе часов вперёд несуществующее время
+    # (02:30 в ночь перехода) уезжает вперёд на величину перевода; при переводе назад
+    # из двух одинаковых местных времён берётся первое — ежедневное напоминание
+    # не сработает дважды.
+    if local is None:
+        return None
+    tz = zone(name)
+    if local.tzinfo is None:
+        # fold=0 даёт именно это: смещение до перехода в обоих случаях
+        local = local.replace(tzinfo=tz, fold=0)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+